@@ -0,0 +1,273 @@
+"""Offline benchmarks of the python-zamg hot paths.
+
+Runs every benchmark against a local stand-in of the dataset API serving
+synthetic payloads of the full station network, and writes the timings and
+peak memory as JSON, which can be compared to the results of another run:
+
+    python benchmarks/run.py --output new.json --compare old.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+# pylint: disable=wrong-import-position
+from zamg import ZamgData, __version__  # noqa: E402
+from zamg.standin import StandinServer  # noqa: E402
+
+
+async def measure(
+    func: Callable[[], Awaitable[object]],
+    repeat: int,
+    setup: Callable[[], object] | None = None,
+) -> dict:
+    """Return timing and peak memory of func, setup runs untimed before each call."""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "repeat": repeat,
+        "mean_s": statistics.fmean(timings),
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "peak_bytes": peak,
+    }
+
+
+IMPORT_CODE = """
+import time
+start = time.perf_counter()
+from zamg import ZamgData
+print(time.perf_counter() - start)
+"""
+
+
+IMPORT_BUDGET = 0.15
+"""Default upper limit in seconds of the median import time of ZamgData."""
+
+
+def import_time(repeat: int) -> dict:
+    """Return the time of importing ZamgData in fresh interpreters."""
+    timings = [
+        float(
+            subprocess.run(
+                [sys.executable, "-c", IMPORT_CODE],
+                cwd=SRC,
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(repeat)
+    ]
+    return {
+        "repeat": repeat,
+        "mean_s": statistics.fmean(timings),
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+        "max_s": max(timings),
+        "peak_bytes": 0,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run all benchmarks and return the results."""
+    results: dict[str, dict] = {"import": import_time(args.repeat)}
+    async with (
+        StandinServer(
+            stations=args.stations,
+            parameters=args.parameters,
+            forecast_steps=args.forecast_steps,
+        ) as server,
+        aiohttp.ClientSession() as session,
+    ):
+
+        def client() -> ZamgData:
+            zamg = ZamgData(session=session)
+            zamg.set_api_url(server.api_url)
+            return zamg
+
+        async def zamg_stations() -> None:
+            await client().zamg_stations()
+
+        results["zamg_stations"] = await measure(zamg_stations, args.repeat)
+
+        zamg = client()
+        await zamg.zamg_stations()
+        station_ids = list(zamg.station_registry.ids)
+        points = [
+            f"{zamg.station_registry.lat[idx]},{zamg.station_registry.lon[idx]}"
+            for idx in range(min(args.points, len(station_ids)))
+        ]
+
+        async def closest_station() -> None:
+            for lat, lon in zip(zamg.station_registry.lat, zamg.station_registry.lon):
+                await zamg.closest_station(lat, lon)
+
+        results["closest_station"] = await measure(closest_station, args.repeat)
+
+        # pylint: disable=protected-access
+        def reset_observations() -> None:
+            zamg._timestamp = None
+            zamg._payload_hashes.clear()
+            zamg._validators.clear()
+
+        def revalidate_observations() -> None:
+            zamg._timestamp = None
+
+        zamg.set_default_station(station_ids[0])
+        results["update"] = await measure(zamg.update, args.repeat, reset_observations)
+        results["update_revalidated"] = await measure(
+            zamg.update, args.repeat, revalidate_observations
+        )
+
+        async def update_stations() -> None:
+            await zamg.update_stations(station_ids)
+
+        results["update_stations"] = await measure(
+            update_stations, args.repeat, reset_observations
+        )
+
+        snapshot = await zamg.snapshot()
+
+        async def aggregate() -> None:
+            snapshot.aggregate("TL", by="state")
+            snapshot.top("FFX", 10)
+
+        results["snapshot_aggregate"] = await measure(aggregate, args.repeat)
+
+        def reset_forecast() -> None:
+            zamg._forecast_timestamps.clear()
+            zamg._forecast_urls.clear()
+            zamg._validators.clear()
+
+        def revalidate_forecast() -> None:
+            zamg._forecast_timestamps.clear()
+
+        async def get_forecast() -> None:
+            await zamg.get_forecast(points)
+
+        results["get_forecast_points"] = await measure(
+            get_forecast, args.repeat, reset_forecast
+        )
+        results["get_forecast_points_revalidated"] = await measure(
+            get_forecast, args.repeat, revalidate_forecast
+        )
+
+        await zamg.get_forecast(points[0])
+
+        def reset_series() -> None:
+            zamg._series_cache.clear()
+
+        async def get_forecast_current() -> None:
+            zamg.get_forecast_current()
+
+        results["get_forecast_current"] = await measure(
+            get_forecast_current, args.repeat, reset_series
+        )
+        results["get_forecast_current_cached"] = await measure(
+            get_forecast_current, args.repeat
+        )
+
+        async def get_forecast_from_now() -> None:
+            zamg._get_forecast_from_now()
+
+        results["get_forecast_from_now"] = await measure(
+            get_forecast_from_now, args.repeat, reset_series
+        )
+
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "stations": args.stations,
+            "parameters": args.parameters,
+            "forecast_steps": args.forecast_steps,
+            "points": args.points,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, previous: dict) -> str:
+    """Return a table of mean time and peak memory ratios current/previous."""
+    lines = [f"{'benchmark':<30} {'time':>8} {'memory':>8}"]
+    for name, result in current["results"].items():
+        old = previous["results"].get(name)
+        if old is None:
+            continue
+        lines.append(
+            f"{name:<30} {result['mean_s'] / old['mean_s']:>8.2f}"
+            f" {result['peak_bytes'] / max(old['peak_bytes'], 1):>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> int:
+    """Parse the arguments and run the benchmarks.
+
+    Return 1 if the median import time exceeds --import-budget.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=300)
+    parser.add_argument("--parameters", type=int, default=200)
+    parser.add_argument("--forecast-steps", type=int, default=73)
+    parser.add_argument("--points", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--compare", type=pathlib.Path)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    text = json.dumps(results, indent=2)
+    if args.output is not None:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    if args.compare is not None:
+        print(
+            compare(results, json.loads(args.compare.read_text(encoding="utf-8"))),
+            file=sys.stderr,
+        )
+    median = results["results"]["import"]["median_s"]
+    if median > args.import_budget:
+        print(
+            f"Importing ZamgData took {median:.3f} s,"
+            f" more than the budget of {args.import_budget} s",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,78 @@
-"""Asynchronous Python client for GeoSphere Austria weather data."""
+"""Asynchronous Python client for GeoSphere Austria weather data.
+
+The exports are imported on first access, so "import zamg" does not load
+aiohttp and the other dependencies of the network code.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
 
 __version__ = "0.4.1"
 
-from .exceptions import (
-    ZamgApiError,
-    ZamgError,
-    ZamgNoDataError,
-    ZamgStationNotFoundError,
-    ZamgStationUnknownError,
-)
-from .zamg import ZamgData
-
-__all__ = [
-    "ZamgApiError",
-    "ZamgError",
-    "ZamgNoDataError",
-    "ZamgStationNotFoundError",
-    "ZamgStationUnknownError",
-    "ZamgData",
-]
+if TYPE_CHECKING:
+    from .changes import ZamgChange
+    from .coalesce import UpdateCoalescer
+    from .datasets import INCA_NOWCAST, NWP_FORECAST, ZamgDataset
+    from .exceptions import (
+        ZamgApiError,
+        ZamgError,
+        ZamgNoDataError,
+        ZamgStationNotFoundError,
+        ZamgStationUnknownError,
+    )
+    from .interpolate import StationInterpolator
+    from .metrics import InMemoryMetrics, ZamgMetrics
+    from .planner import ParameterPlanner
+    from .ratelimit import RateLimiter
+    from .serve import ZamgProxy
+    from .sharded import ShardedForecaster
+    from .snapshot import StationSnapshot
+    from .stations import StationRegistry
+    from .sync import SyncZamgData
+    from .warming import CacheWarmer
+    from .zamg import ZamgData
+
+_EXPORTS = {
+    "CacheWarmer": "warming",
+    "ShardedForecaster": "sharded",
+    "StationInterpolator": "interpolate",
+    "StationRegistry": "stations",
+    "StationSnapshot": "snapshot",
+    "SyncZamgData": "sync",
+    "UpdateCoalescer": "coalesce",
+    "INCA_NOWCAST": "datasets",
+    "InMemoryMetrics": "metrics",
+    "NWP_FORECAST": "datasets",
+    "ParameterPlanner": "planner",
+    "RateLimiter": "ratelimit",
+    "ZamgApiError": "exceptions",
+    "ZamgChange": "changes",
+    "ZamgError": "exceptions",
+    "ZamgMetrics": "metrics",
+    "ZamgNoDataError": "exceptions",
+    "ZamgStationNotFoundError": "exceptions",
+    "ZamgStationUnknownError": "exceptions",
+    "ZamgData": "zamg",
+    "ZamgDataset": "datasets",
+    "ZamgProxy": "serve",
+}
+"""Exported name: submodule defining it."""
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    """Import an export on first access."""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """Return the module attributes including the lazy exports."""
+    return sorted({*globals(), *_EXPORTS})
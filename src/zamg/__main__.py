@@ -0,0 +1,5 @@
+"""Bulk export entry point, see zamg.export."""
+
+from .export import main
+
+main()
@@ -0,0 +1,44 @@
+"""Change detection between GeoSphere Austria observation snapshots."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ZamgChange:
+    """A changed observation value of a station parameter."""
+
+    station_id: str
+    parameter: str
+    value: float | None
+    previous: float | None
+    timestamp: str | None
+
+
+def diff_observations(
+    previous: dict[str, dict[str, float | None]],
+    current: dict[str, dict[str, float | None]],
+    timestamps: dict[str, str],
+) -> list[ZamgChange]:
+    """Return the changes between two {station_id: {parameter: value}} snapshots.
+
+    Parameters missing in previous are reported with previous=None.
+    """
+    changes = []
+    for station_id, values in current.items():
+        old_values = previous.get(station_id, {})
+        for parameter, value in values.items():
+            old_value = old_values.get(parameter)
+            if parameter in old_values and old_value == value:
+                continue
+            changes.append(
+                ZamgChange(
+                    station_id,
+                    parameter,
+                    value,
+                    old_value,
+                    timestamps.get(station_id),
+                )
+            )
+    return changes
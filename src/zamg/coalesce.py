@@ -0,0 +1,117 @@
+"""Micro-batching of single station updates into one request.
+
+Assign one UpdateCoalescer to many ZamgData instances: their update() calls
+arriving within window seconds are sent as one multi-station request and
+every caller gets the observations of its own station.
+
+    coalescer = UpdateCoalescer(window=0.02)
+    for zamg in clients:
+        zamg.coalescer = coalescer
+    await asyncio.gather(*(zamg.update() for zamg in clients))  # one request
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from .deadline import detached
+from .exceptions import ZamgApiError
+
+if TYPE_CHECKING:
+    from .zamg import ZamgData
+
+
+class _Batch:
+    """Stations waiting for the same request."""
+
+    def __init__(self, leader: ZamgData):
+        self.leader = leader
+        self.futures: dict[str, asyncio.Future] = {}
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class UpdateCoalescer:
+    """Collects single station requests into multi-station requests.
+
+    Requests of instances with the same data url and station parameters are
+    batched. A batch is sent window seconds after its first station, or as
+    soon as it holds max_stations stations. The request is sent by the
+    instance which opened the batch (with its session, rate limiter and
+    retries).
+    """
+
+    def __init__(self, window: float = 0.02, max_stations: int = 100):
+        """Initialize the coalescer."""
+        self.window = window
+        self.max_stations = max_stations
+        self.requests = 0
+        """Number of requests sent."""
+        self._batches: dict[tuple[str, str | None], _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def fetch(self, zamg: ZamgData, station_id: str) -> tuple[str, dict]:
+        """Return (timestamp, observations) of station_id.
+
+        Raises the errors of the batch request, KeyError if the station is
+        missing in the response.
+        """
+        key = (zamg.dataset_data_url, zamg.station_parameters)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(zamg)
+            batch.timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush, key, batch
+            )
+        future = batch.futures.get(station_id)
+        if future is None:
+            future = batch.futures[station_id] = (
+                asyncio.get_running_loop().create_future()
+            )
+            if len(batch.futures) >= self.max_stations:
+                self._flush(key, batch)
+        return await asyncio.shield(future)
+
+    def _flush(self, key: tuple[str, str | None], batch: _Batch) -> None:
+        """Send a batch, unless it was sent already."""
+        if self._batches.get(key) is not batch:
+            return
+        del self._batches[key]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: _Batch) -> None:
+        """Request the stations of a batch and resolve their futures."""
+        # pylint: disable=protected-access
+        station_ids = list(batch.futures)
+        leader = batch.leader
+        self.requests += 1
+        try:
+            url = leader._observations_url(station_ids)
+            # the batch serves all callers, each one waits within its own deadline
+            with detached():
+                status, contents = await leader._get(url)
+            if status not in (200, 301):
+                raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+            timestamp, stations = leader._parse_observations(
+                leader._decode(url, contents), station_ids
+            )
+        except asyncio.CancelledError:
+            for future in batch.futures.values():
+                future.cancel()
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            for future in batch.futures.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for station_id, future in batch.futures.items():
+            if future.done():
+                continue
+            if station_id in stations:
+                future.set_result((timestamp, stations[station_id]))
+            else:
+                future.set_exception(KeyError(station_id))
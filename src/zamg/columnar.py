@@ -0,0 +1,127 @@
+"""Export of series windows and snapshots to NumPy, Arrow and pandas.
+
+numpy, pyarrow and pandas are optional extras (zamg[numpy], zamg[arrow],
+zamg[pandas]) and only imported by the first export. The exports wrap the
+arrays of the client instead of copying them: NumPy arrays and Arrow
+buffers share the memory of the float columns and epochs, pandas frames
+are built from these NumPy arrays. Only station ids are copied. A series
+appended to while it is exported moves to new buffers, the exports keep
+the values they were created with.
+
+Missing values are NaN, as in the client.
+
+With numpy installed, snapshot queries reduce the columns with numpy
+kernels instead of Python loops, see optional_numpy().
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .series import SeriesWindow
+    from .snapshot import StationSnapshot
+
+
+def _require(module: str, extra: str) -> ModuleType:
+    """Import an optional dependency, raise ImportError naming its extra."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(
+            f"{module} is required for this export, install zamg[{extra}]"
+        ) from exc
+
+
+@functools.cache
+def optional_numpy() -> ModuleType | None:
+    """Return numpy if it is installed, None to fall back to Python loops."""
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+def _float64(numpy: ModuleType, buffer) -> Any:
+    return numpy.frombuffer(buffer, dtype=numpy.float64)
+
+
+def _arrow_column(pyarrow: ModuleType, buffer, arrow_type) -> Any:
+    return pyarrow.Array.from_buffers(
+        arrow_type, len(buffer), [None, pyarrow.py_buffer(buffer)]
+    )
+
+
+def window_to_numpy(window: SeriesWindow) -> dict[str, Any]:
+    """Return {"time": datetime64[s] array, parameter: float64 array}."""
+    numpy = _require("numpy", "numpy")
+    result = {
+        "time": numpy.frombuffer(window.epochs, dtype=numpy.int64).view("datetime64[s]")
+    }
+    for name, values in window.data.items():
+        result[name] = _float64(numpy, values)
+    return result
+
+
+def window_to_arrow(window: SeriesWindow) -> Any:
+    """Return a pyarrow Table with a UTC "time" column and one per parameter."""
+    pyarrow = _require("pyarrow", "arrow")
+    columns = {
+        "time": _arrow_column(pyarrow, window.epochs, pyarrow.timestamp("s", "UTC"))
+    }
+    for name, values in window.data.items():
+        columns[name] = _arrow_column(pyarrow, values, pyarrow.float64())
+    return pyarrow.table(columns)
+
+
+def window_to_pandas(window: SeriesWindow) -> Any:
+    """Return a pandas DataFrame indexed by the UTC timestamps."""
+    pandas = _require("pandas", "pandas")
+    arrays = window_to_numpy(window)
+    index = pandas.DatetimeIndex(arrays.pop("time"), name="time").tz_localize("UTC")
+    return pandas.DataFrame(arrays, index=index, copy=False)
+
+
+def snapshot_to_numpy(snapshot: StationSnapshot) -> dict[str, Any]:
+    """Return {"station", "lat", "lon", "altitude", parameter: array}.
+
+    All arrays are in the order of the station registry, the station ids
+    are a str array.
+    """
+    numpy = _require("numpy", "numpy")
+    registry = snapshot.registry
+    result = {
+        "station": numpy.array(registry.ids, dtype=str),
+        "lat": _float64(numpy, registry.lat),
+        "lon": _float64(numpy, registry.lon),
+        "altitude": _float64(numpy, registry.altitude),
+    }
+    for name, values in snapshot.columns.items():
+        result[name] = _float64(numpy, values)
+    return result
+
+
+def snapshot_to_arrow(snapshot: StationSnapshot) -> Any:
+    """Return a pyarrow Table with one row per station of the registry."""
+    pyarrow = _require("pyarrow", "arrow")
+    registry = snapshot.registry
+    columns = {"station": pyarrow.array(registry.ids, pyarrow.string())}
+    for name, values in (
+        ("lat", registry.lat),
+        ("lon", registry.lon),
+        ("altitude", registry.altitude),
+        *snapshot.columns.items(),
+    ):
+        columns[name] = _arrow_column(pyarrow, values, pyarrow.float64())
+    return pyarrow.table(columns)
+
+
+def snapshot_to_pandas(snapshot: StationSnapshot) -> Any:
+    """Return a pandas DataFrame indexed by station id."""
+    pandas = _require("pandas", "pandas")
+    arrays = snapshot_to_numpy(snapshot)
+    index = pandas.Index(arrays.pop("station"), name="station")
+    return pandas.DataFrame(arrays, index=index, copy=False)
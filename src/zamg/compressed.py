@@ -0,0 +1,428 @@
+"""Compressed time series for long observation histories.
+
+A CompressedSeries stores its timestamps in sealed blocks of block_size
+entries. Only the newest entries are held in plain arrays:
+
+- timestamps are delta-of-delta encoded, so a regular 10 minute series
+  needs one bit per timestamp
+- values are XOR encoded against the previous value of their column
+  (Gorilla), so a repeated value needs one bit; columns of short decimals,
+  like all observations, are XOR encoded as scaled integers
+- missing values are marked in a null bitmap per column and not encoded
+
+A block is decoded as a whole into arrays. Reading a window only decodes
+the blocks it overlaps.
+"""
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterable
+from datetime import datetime
+
+from .exceptions import ZamgNoDataError
+from .series import SeriesWindow, TimeSeries, _to_float, to_epoch
+
+_DOD_BUCKETS = (("10", 7), ("110", 9), ("1110", 12))
+"""Bit prefix and width of the delta-of-delta ranges, "1111" is 64 bits."""
+DEFAULT_BLOCK_SIZE = 256
+"""Block size of series without max_length, see CompressedSeries."""
+_NAN = math.nan
+_NAN_WORD = array("Q", array("d", [_NAN]).tobytes())[0]
+
+
+def _bits(data: bytes) -> str:
+    """Return data as a string of "0" and "1"."""
+    if not data:
+        return ""
+    return bin(int.from_bytes(data, "big"))[2:].zfill(len(data) * 8)
+
+
+def _pack(bits: list[str]) -> bytes:
+    """Return a list of "0"/"1" strings as bytes, zero padded."""
+    joined = "".join(bits)
+    if not joined:
+        return b""
+    joined += "0" * (-len(joined) % 8)
+    return int(joined, 2).to_bytes(len(joined) // 8, "big")
+
+
+def encode_epochs(epochs: array) -> bytes:
+    """Return the delta-of-delta encoding of epochs after the first one."""
+    bits = []
+    previous = epochs[0]
+    delta = 0
+    for epoch in epochs[1:]:
+        new_delta = epoch - previous
+        dod = new_delta - delta
+        if dod == 0:
+            bits.append("0")
+        else:
+            for prefix, width in _DOD_BUCKETS:
+                offset = (1 << (width - 1)) - 1
+                if -offset <= dod <= offset + 1:
+                    bits.append(prefix + format(dod + offset, f"0{width}b"))
+                    break
+            else:
+                bits.append("1111" + format(dod & (2**64 - 1), "064b"))
+        previous = epoch
+        delta = new_delta
+    return _pack(bits)
+
+
+def decode_epochs(first: int, data: bytes, count: int) -> array:
+    """Return count epochs out of the first one and encode_epochs() data."""
+    bits = _bits(data)
+    epochs = array("q", [first])
+    epoch = first
+    delta = 0
+    pos = 0
+    for _ in range(count - 1):
+        if bits[pos] == "0":
+            pos += 1
+        else:
+            for prefix, width in _DOD_BUCKETS:
+                if bits.startswith(prefix, pos):
+                    pos += len(prefix)
+                    delta += int(bits[pos : pos + width], 2) - (1 << (width - 1)) + 1
+                    break
+            else:
+                pos += 4
+                dod = int(bits[pos : pos + 64], 2)
+                width = 64
+                delta += dod - 2**64 if dod >= 2**63 else dod
+            pos += width
+        epoch += delta
+        epochs.append(epoch)
+    return epochs
+
+
+MAX_DECIMALS = 4
+"""Columns of decimals with up to this many digits are encoded as integers."""
+
+
+def _decimals(values: array) -> int | None:
+    """Return the number of decimals all values have, None if too many."""
+    for decimals in range(MAX_DECIMALS + 1):
+        scale = 10**decimals
+        if all(
+            value != value  # pylint: disable=comparison-with-itself
+            or (abs(value) < 2**52 and round(value * scale) / scale == value)
+            for value in values
+        ):
+            return decimals
+    return None
+
+
+def _xor_encode(words: array, nulls: array) -> str:
+    """Return the Gorilla XOR encoding of the words which are no nulls."""
+    bits = []
+    previous = None
+    # no window yet, the first XOR opens one
+    leading_window = trailing_window = 64
+    for word, null in zip(words, nulls):
+        if null:
+            continue
+        if previous is None:
+            bits.append(format(word, "064b"))
+        else:
+            xor = word ^ previous
+            if xor == 0:
+                bits.append("0")
+            else:
+                leading = 64 - xor.bit_length()
+                trailing = (xor & -xor).bit_length() - 1
+                if leading >= leading_window and trailing >= trailing_window:
+                    size = 64 - leading_window - trailing_window
+                    bits.append("10" + format(xor >> trailing_window, f"0{size}b"))
+                else:
+                    size = 64 - leading - trailing
+                    bits.append(
+                        f"11{leading:06b}{size - 1:06b}"
+                        + format(xor >> trailing, f"0{size}b")
+                    )
+                    leading_window, trailing_window = leading, trailing
+        previous = word
+    return "".join(bits)
+
+
+def encode_values(values: array) -> tuple[int, bytes, bytes]:
+    """Return (decimals, null bitmap, XOR encoding) of a float column.
+
+    NaN is null. If all values are decimals with up to MAX_DECIMALS digits,
+    the zigzag encoded integers value * 10**decimals are XOR encoded, which
+    differ in a few low bits only; otherwise the IEEE 754 bits are used and
+    decimals is -1.
+    """
+    bitmap = bytearray((len(values) + 7) // 8)
+    nulls = array("b", bytes(len(values)))
+    for idx, value in enumerate(values):
+        if value != value:  # pylint: disable=comparison-with-itself
+            bitmap[idx >> 3] |= 1 << (idx & 7)
+            nulls[idx] = 1
+    decimals = _decimals(values)
+    if decimals is None:
+        words = array("Q")
+        words.frombytes(values.tobytes())
+        decimals = -1
+    else:
+        scale = 10**decimals
+        words = array(
+            "Q",
+            (
+                0 if null else _zigzag(round(value * scale))
+                for value, null in zip(values, nulls)
+            ),
+        )
+    return decimals, bytes(bitmap), _pack([_xor_encode(words, nulls)])
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def decode_values(decimals: int, bitmap: bytes, data: bytes, count: int) -> array:
+    """Return count floats out of encode_values() data, nulls are NaN."""
+    bits = _bits(data)
+    words = []
+    previous = None
+    leading = trailing = 0
+    pos = 0
+    for idx in range(count):
+        if bitmap[idx >> 3] & (1 << (idx & 7)):
+            words.append(None)
+            continue
+        if previous is None:
+            word = int(bits[pos : pos + 64], 2)
+            pos += 64
+        elif bits[pos] == "0":
+            word = previous
+            pos += 1
+        else:
+            if bits[pos + 1] == "1":
+                leading = int(bits[pos + 2 : pos + 8], 2)
+                size = int(bits[pos + 8 : pos + 14], 2) + 1
+                trailing = 64 - leading - size
+                pos += 14
+            else:
+                size = 64 - leading - trailing
+                pos += 2
+            word = previous ^ (int(bits[pos : pos + size], 2) << trailing)
+            pos += size
+        words.append(word)
+        previous = word
+    if decimals < 0:
+        raw = array("Q", (_NAN_WORD if word is None else word for word in words))
+        values = array("d")
+        values.frombytes(raw.tobytes())
+        return values
+    scale = 10**decimals
+    return array(
+        "d",
+        (
+            (
+                _NAN
+                if word is None
+                else (word >> 1 if not word & 1 else -((word + 1) >> 1)) / scale
+            )
+            for word in words
+        ),
+    )
+
+
+class _Block:
+    """A sealed block of encoded timestamps and columns."""
+
+    __slots__ = ("count", "first", "last", "epochs", "columns")
+
+    def __init__(self, epochs: array, columns: dict[str, array]):
+        self.count = len(epochs)
+        self.first = epochs[0]
+        self.last = epochs[-1]
+        self.epochs = encode_epochs(epochs)
+        self.columns = {name: encode_values(column) for name, column in columns.items()}
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.epochs) + sum(
+            len(bitmap) + len(data) for _, bitmap, data in self.columns.values()
+        )
+
+
+class CompressedSeries:
+    """Compressed time series of float parameters, see the module docstring.
+
+    Offers append() and window() like TimeSeries, a window holds decoded
+    copies instead of views. Reading a block costs decoding it, so the
+    newest block_size entries are kept uncompressed. The default block size
+    is half of max_length, at most DEFAULT_BLOCK_SIZE, so at least half of
+    a full series is compressed.
+    """
+
+    def __init__(self, max_length: int | None = None, block_size: int | None = None):
+        """Initialize an empty series keeping at most max_length entries."""
+        if block_size is None:
+            block_size = DEFAULT_BLOCK_SIZE
+            if max_length is not None:
+                block_size = max(2, min(block_size, max_length // 2))
+        if block_size < 2:
+            raise ValueError("block_size must be at least 2")
+        self.max_length = max_length
+        self.block_size = block_size
+        self.blocks: list[_Block] = []
+        self.epochs = array("q")
+        """Timestamps of the open block."""
+        self.columns: dict[str, array] = {}
+        """Columns of the open block, every parameter of the series."""
+        self._skip = 0
+        """Entries of the first block dropped because of max_length."""
+        self._sealed = 0
+
+    @classmethod
+    def from_series(
+        cls, series: TimeSeries, block_size: int | None = None
+    ) -> CompressedSeries:
+        """Return a compressed copy of a TimeSeries."""
+        compressed = cls(series.max_length, block_size)
+        compressed.extend(
+            series.epochs,
+            {name: series.columns[name] for name in series.columns},
+        )
+        return compressed
+
+    def __len__(self) -> int:
+        """Return the number of timestamps."""
+        return self._sealed + len(self.epochs)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the stored data in bytes, without overhead."""
+        return sum(block.nbytes for block in self.blocks) + self.epochs.itemsize * (
+            len(self.epochs) * (1 + len(self.columns))
+        )
+
+    def _last_epoch(self) -> int | None:
+        if self.epochs:
+            return self.epochs[-1]
+        if self.blocks:
+            return self.blocks[-1].last
+        return None
+
+    def append(self, epoch: int, values: dict) -> None:
+        """Append the values of one timestamp.
+
+        Same as TimeSeries.append(): timestamps must be appended in
+        ascending order, an epoch equal to the last one is ignored.
+        Parameters not in values are stored as null.
+        """
+        last = self._last_epoch()
+        if last is not None and epoch <= last:
+            return
+        length = len(self.epochs)
+        for name in values:
+            if name not in self.columns:
+                self.columns[name] = array("d", [_NAN]) * length
+        self.epochs.append(epoch)
+        for name, column in self.columns.items():
+            column.append(_to_float(values.get(name)))
+        if len(self.epochs) >= self.block_size:
+            self._seal()
+        self._trim()
+
+    def extend(self, epochs: Iterable[int], columns: dict[str, Iterable]) -> None:
+        """Append many timestamps with their column values."""
+        columns = {name: list(values) for name, values in columns.items()}
+        for idx, epoch in enumerate(epochs):
+            self.append(epoch, {name: values[idx] for name, values in columns.items()})
+
+    def _seal(self) -> None:
+        """Encode the open block."""
+        self.blocks.append(_Block(self.epochs, self.columns))
+        self._sealed += len(self.epochs)
+        self.epochs = array("q")
+        self.columns = {name: array("d") for name in self.columns}
+
+    def _trim(self) -> None:
+        """Drop the oldest entries exceeding max_length."""
+        if self.max_length is None:
+            return
+        excess = len(self) - self.max_length
+        while excess > 0 and self.blocks:
+            available = self.blocks[0].count - self._skip
+            if excess < available:
+                self._skip += excess
+                self._sealed -= excess
+                return
+            del self.blocks[0]
+            self._skip = 0
+            self._sealed -= available
+            excess -= available
+        if excess > 0:
+            del self.epochs[:excess]
+            for column in self.columns.values():
+                del column[:excess]
+
+    def decode_block(self, index: int) -> tuple[array, dict[str, array]]:
+        """Return (epochs, columns) of a sealed block as arrays.
+
+        Columns the block has no values of are all NaN. Entries dropped
+        because of max_length are included.
+        """
+        block = self.blocks[index]
+        columns = {}
+        for name in self.columns:
+            encoded = block.columns.get(name)
+            if encoded is None:
+                columns[name] = array("d", [_NAN]) * block.count
+            else:
+                columns[name] = decode_values(*encoded, block.count)
+        return decode_epochs(block.first, block.epochs, block.count), columns
+
+    def window(
+        self,
+        start: datetime | int | None = None,
+        end: datetime | int | None = None,
+        parameters: list[str] | tuple[str, ...] | None = None,
+    ) -> SeriesWindow:
+        """Return the window of timestamps in [start, end).
+
+        start and end are datetimes or epoch seconds, None means unbounded.
+        Only the blocks overlapping the window are decoded.
+        """
+        if parameters is None:
+            parameters = tuple(self.columns)
+        for name in parameters:
+            if name not in self.columns:
+                raise ZamgNoDataError(KeyError(name))
+        start_epoch = to_epoch(start, -(2**63))
+        end_epoch = to_epoch(end, 2**63 - 1)
+        epochs = array("q")
+        data = {name: array("d") for name in parameters}
+
+        def _add(block_epochs: array, columns: dict[str, array], skip: int) -> None:
+            lo = max(bisect_left(block_epochs, start_epoch), skip)
+            hi = bisect_left(block_epochs, end_epoch)
+            if lo >= hi:
+                return
+            epochs.extend(block_epochs[lo:hi])
+            for name in parameters:
+                data[name].extend(columns[name][lo:hi])
+
+        for index, block in enumerate(self.blocks):
+            if block.last < start_epoch or block.first >= end_epoch:
+                continue
+            _add(*self.decode_block(index), self._skip if index == 0 else 0)
+        _add(self.epochs, self.columns, 0)
+        return SeriesWindow(
+            memoryview(epochs), {name: memoryview(data[name]) for name in parameters}
+        )
+
+    def to_series(self) -> TimeSeries:
+        """Return the decoded series as TimeSeries."""
+        window = self.window()
+        series = TimeSeries(self.max_length)
+        series.epochs = window.epochs.obj
+        series.columns = {name: view.obj for name, view in window.data.items()}
+        return series
@@ -0,0 +1,105 @@
+"""Dataset descriptors for GeoSphere Austria forecast products."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+API_URL = "https://dataset.api.hub.geosphere.at/v1"
+"""Base url of the GeoSphere Austria dataset API."""
+
+
+@dataclass(frozen=True)
+class ZamgDataset:
+    """Describe a GeoSphere Austria timeseries forecast dataset.
+
+    The forecast fetch, parsing and caching in ZamgData is driven entirely
+    by this description, so new products only need a new descriptor.
+    """
+
+    name: str
+    """Dataset name as used by the dataset API, e.g. nwp-v1-1h-2500m."""
+    cadence: timedelta
+    """Time step between two forecast timestamps."""
+    resolution_m: int
+    """Grid resolution in meters."""
+    default_parameters: tuple[str, ...]
+    """Parameters to request if no parameter list is configured."""
+    current_parameters: tuple[str, ...]
+    """Parameters returned by default for the current forecast step."""
+    rain_parameter: str
+    """Precipitation parameter the derived rain series is computed from."""
+    rain_accumulated: bool
+    """True if the precipitation parameter is accumulated since model start."""
+    wind_parameters: tuple[str, str]
+    """Eastward and northward wind components in m/s."""
+    refresh_interval: timedelta = timedelta(minutes=5)
+    """Minimum age of a cached payload before it is fetched again."""
+    api_url: str = API_URL
+    """Base url of the dataset API serving this dataset."""
+    custom_metadata_url: str | None = None
+    """Metadata url to use instead of the one derived from api_url."""
+    custom_data_url: str | None = None
+    """Timeseries url to use instead of the one derived from api_url."""
+
+    @property
+    def metadata_url(self) -> str:
+        """Return the API url to fetch the dataset metadata."""
+        if self.custom_metadata_url is not None:
+            return self.custom_metadata_url
+        return f"{self.api_url}/grid/forecast/{self.name}/metadata"
+
+    @property
+    def data_url(self) -> str:
+        """Return the API url to fetch timeseries of this dataset."""
+        if self.custom_data_url is not None:
+            return self.custom_data_url
+        return f"{self.api_url}/timeseries/forecast/{self.name}?parameters="
+
+    @property
+    def rain_name(self) -> str:
+        """Return the name of the derived rain series."""
+        minutes = int(self.cadence.total_seconds() // 60)
+        if minutes == 60:
+            return "hourly rain"
+        return f"{minutes} minute rain"
+
+    def rain(self, rain_data: list, index: int) -> float:
+        """Return the rain amount of a single forecast step."""
+        value = rain_data[index]
+        if not self.rain_accumulated:
+            return value
+        rain = round(value - rain_data[max(index - 1, 0)], 3)
+        return rain if rain >= 0 else value
+
+    def wind_speed(self, u_data: list, v_data: list, index: int) -> float:
+        """Return the wind speed in km/h of a single forecast step."""
+        return round((u_data[index] ** 2 + v_data[index] ** 2) ** 0.5 * 3.6, 1)
+
+
+NWP_FORECAST = ZamgDataset(
+    name="nwp-v1-1h-2500m",
+    cadence=timedelta(hours=1),
+    resolution_m=2500,
+    default_parameters=("t2m", "rr_acc", "u10m", "v10m", "tcc", "sy", "rh2m"),
+    current_parameters=("t2m", "rh2m", "u10m", "v10m", "tcc", "sy", "rr_acc"),
+    rain_parameter="rr_acc",
+    rain_accumulated=True,
+    wind_parameters=("u10m", "v10m"),
+)
+"""Hourly numerical weather prediction on a 2.5 km grid."""
+
+INCA_NOWCAST = ZamgDataset(
+    name="nowcast-v1-15min-1km",
+    cadence=timedelta(minutes=15),
+    resolution_m=1000,
+    default_parameters=("t2m", "rr", "ugrd", "vgrd", "rh2m"),
+    current_parameters=("t2m", "rh2m", "ugrd", "vgrd", "rr"),
+    rain_parameter="rr",
+    rain_accumulated=False,
+    wind_parameters=("ugrd", "vgrd"),
+)
+"""INCA nowcast in 15 minute steps on a 1 km grid."""
+
+DATASETS = {dataset.name: dataset for dataset in (NWP_FORECAST, INCA_NOWCAST)}
+"""All known forecast datasets by name."""
@@ -0,0 +1,96 @@
+"""Deadlines of client calls.
+
+Every public coroutine of ZamgData takes a keyword-only timeout in seconds
+which bounds the whole call, including metadata loading, retries, rate
+limit waits and batch chunks. Calls can also inherit a deadline from the
+context:
+
+    with deadline(2.0):
+        await zamg.zamg_stations()
+        await zamg.update()  # both together take at most 2 seconds
+
+Deadlines only get shorter when nested. A call exceeding its deadline is
+cancelled, releases its connections and raises asyncio.TimeoutError.
+"""
+
+from __future__ import annotations
+
+import functools
+import time
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+_DEADLINE: ContextVar[float | None] = ContextVar("zamg_deadline", default=None)
+"""time.monotonic() the current calls have to finish by, None for no limit."""
+
+
+def remaining() -> float | None:
+    """Return the seconds left until the current deadline, None without one."""
+    until = _DEADLINE.get()
+    return None if until is None else until - time.monotonic()
+
+
+@contextmanager
+def _limit(until: float | None) -> Iterator[None]:
+    token = _DEADLINE.set(until)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+@contextmanager
+def deadline(timeout: float | None) -> Iterator[None]:
+    """Limit the enclosed calls to timeout seconds, None keeps the current limit."""
+    if timeout is None:
+        yield
+        return
+    until = time.monotonic() + timeout
+    current = _DEADLINE.get()
+    with _limit(until if current is None else min(until, current)):
+        yield
+
+
+@contextmanager
+def share(fraction: float) -> Iterator[None]:
+    """Limit the enclosed calls to a fraction of the remaining time.
+
+    Used for steps followed by others, e.g. metadata loading before the
+    observations request.
+    """
+    left = remaining()
+    with deadline(None if left is None else max(left, 0.0) * fraction):
+        yield
+
+
+@contextmanager
+def detached() -> Iterator[None]:
+    """Lift the deadline for work shared by several callers.
+
+    Every caller waiting for the work is still bounded by its own deadline.
+    """
+    with _limit(None):
+        yield
+
+
+def bounded(
+    method: Callable[..., Awaitable[T]],
+) -> Callable[..., Awaitable[T]]:
+    """Add the keyword-only timeout argument to a coroutine method."""
+
+    @functools.wraps(method)
+    async def wrapper(*args: Any, timeout: float | None = None, **kwargs: Any) -> T:
+        with deadline(timeout):
+            left = remaining()
+            if left is None:
+                return await method(*args, **kwargs)
+            import async_timeout  # pylint: disable=import-outside-toplevel
+
+            async with async_timeout.timeout(max(left, 0.0)):
+                return await method(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,411 @@
+"""Bulk export of GeoSphere Austria data as NDJSON or CSV.
+
+    python -m zamg current --output current.ndjson
+    python -m zamg --format csv forecast --points-file points.txt
+    python -m zamg history --stations 11240,11035 --parameters tl,rr \\
+        --start 2024-01-01 --end 2024-02-01
+
+Requests are batched and sent concurrently (--concurrency), rows are
+written as soon as the batches arrive, in request order.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Iterable
+from datetime import datetime, timedelta, timezone
+from typing import IO
+
+import aiohttp
+
+from .datasets import DATASETS, ZamgDataset
+from .exceptions import ZamgError, ZamgStationUnknownError
+from .ratelimit import RateLimiter
+from .series import parse_epoch
+from .serve import add_arguments as serve_arguments
+from .serve import run as run_proxy
+from .zamg import HISTORICAL_RESOURCE, ZamgData
+
+FORMATS = ("ndjson", "csv")
+"""Possible output formats."""
+
+
+class RowWriter:
+    """Writes rows (dicts) incrementally as NDJSON or CSV.
+
+    CSV columns are taken from the first row, later keys are ignored.
+    """
+
+    def __init__(self, stream: IO[str], output_format: str = "ndjson"):
+        """Initialize the writer."""
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown format {output_format}")
+        self.stream = stream
+        self.format = output_format
+        self.rows = 0
+        self._csv: csv.DictWriter | None = None
+
+    def write(self, rows: Iterable[dict]) -> None:
+        """Write rows and flush the stream."""
+        for row in rows:
+            if self.format == "ndjson":
+                self.stream.write(json.dumps(row, separators=(",", ":")) + "\n")
+            else:
+                if self._csv is None:
+                    self._csv = csv.DictWriter(
+                        self.stream, fieldnames=list(row), extrasaction="ignore"
+                    )
+                    self._csv.writeheader()
+                self._csv.writerow(row)
+            self.rows += 1
+        self.stream.flush()
+
+
+async def ordered(
+    requests: Iterable[Awaitable[list[dict]]], concurrency: int
+) -> AsyncIterator[list[dict]]:
+    """Run requests with at most concurrency at once, yield results in order.
+
+    requests is consumed lazily: at most 2 * concurrency requests are
+    scheduled ahead of the one yielded next, so finished results queued
+    behind a slow request stay bounded.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _limited(request: Awaitable[list[dict]]) -> list[dict]:
+        async with semaphore:
+            return await request
+
+    pending: deque[asyncio.Future] = deque()
+    requests = iter(requests)
+
+    def _schedule() -> None:
+        while len(pending) < 2 * concurrency:
+            request = next(requests, None)
+            if request is None:
+                return
+            pending.append(asyncio.ensure_future(_limited(request)))
+
+    try:
+        _schedule()
+        while pending:
+            result = await pending[0]
+            pending.popleft()
+            _schedule()
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def observation_rows(zamg: ZamgData, station_ids: list[str]) -> list[dict]:
+    """Return one row per station out of the current observations."""
+    # pylint: disable=protected-access
+    rows = []
+    for station_id in station_ids:
+        observations = zamg.data.get(station_id)
+        if observations is None:
+            continue
+        row = {"station": station_id, "timestamp": zamg._timestamps.get(station_id)}
+        for parameter, values in observations.items():
+            row[parameter] = values["data"]
+        rows.append(row)
+    return rows
+
+
+def forecast_rows(dataset: ZamgDataset, points: list[str], payload: dict) -> list[dict]:
+    """Return one row per location and forecast step, with rain and wind_speed."""
+    rows = []
+    timestamps = payload["timestamps"]
+    u_name, v_name = dataset.wind_parameters
+    for point, feature in zip(points, payload["features"]):
+        parameters = feature["properties"]["parameters"]
+        rain_data = parameters.get(dataset.rain_parameter, {}).get("data")
+        u_data = parameters.get(u_name, {}).get("data")
+        v_data = parameters.get(v_name, {}).get("data")
+        for idx, timestamp in enumerate(timestamps):
+            row = {"lat_lon": point, "timestamp": timestamp}
+            for parameter, values in parameters.items():
+                row[parameter] = values["data"][idx]
+            if rain_data is not None:
+                row["rain"] = dataset.rain(rain_data, idx)
+            if u_data is not None and v_data is not None:
+                row["wind_speed"] = dataset.wind_speed(u_data, v_data, idx)
+            rows.append(row)
+    return rows
+
+
+def historical_rows(payload: dict, before: datetime | None = None) -> list[dict]:
+    """Return one row per station and timestamp, only timestamps before before."""
+    rows = []
+    timestamps = payload["timestamps"]
+    if before is not None:
+        limit = before.timestamp()
+        timestamps = [
+            timestamp for timestamp in timestamps if parse_epoch(timestamp) < limit
+        ]
+    for feature in payload["features"]:
+        properties = feature["properties"]
+        parameters = properties["parameters"]
+        for idx, timestamp in enumerate(timestamps):
+            row = {"station": properties.get("station"), "timestamp": timestamp}
+            for parameter, values in parameters.items():
+                row[parameter] = values["data"][idx]
+            rows.append(row)
+    return rows
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[idx : idx + size] for idx in range(0, len(items), size)]
+
+
+async def export_current(
+    zamg: ZamgData,
+    writer: RowWriter,
+    station_ids: list[str] | None = None,
+    concurrency: int = 4,
+) -> None:
+    """Export the current observations of stations, default all."""
+    if station_ids is None:
+        if await zamg.zamg_stations() is None:
+            raise ZamgStationUnknownError("Failed to load station metadata")
+        station_ids = list(zamg.station_registry.ids)
+    elif zamg.station_parameters is None:
+        await zamg.zamg_stations()
+
+    async def _fetch(chunk: list[str]) -> list[dict]:
+        await zamg.update_stations(chunk)
+        return observation_rows(zamg, chunk)
+
+    async for rows in ordered(
+        (
+            _fetch(chunk)
+            for chunk in _chunks(station_ids, zamg.max_stations_per_request)
+        ),
+        concurrency,
+    ):
+        writer.write(rows)
+
+
+async def export_forecast(
+    zamg: ZamgData,
+    writer: RowWriter,
+    points: list[str],
+    dataset: ZamgDataset | None = None,
+    points_per_request: int = 20,
+    concurrency: int = 4,
+) -> None:
+    """Export the complete forecast of "lat,lon" points."""
+    dataset = dataset or zamg.forecast_dataset
+
+    async def _fetch(batch: list[str]) -> list[dict]:
+        return forecast_rows(
+            dataset, batch, await zamg.fetch_forecast(batch, dataset=dataset)
+        )
+
+    async for rows in ordered(
+        (_fetch(batch) for batch in _chunks(points, points_per_request)),
+        concurrency,
+    ):
+        writer.write(rows)
+
+
+async def export_history(
+    zamg: ZamgData,
+    writer: RowWriter,
+    station_ids: list[str],
+    parameters: list[str],
+    start: datetime,
+    end: datetime,
+    resource: str = HISTORICAL_RESOURCE,
+    chunk: timedelta = timedelta(days=1),
+    concurrency: int = 4,
+) -> None:
+    """Export historical observations between start (incl.) and end (excl.).
+
+    The range is split into chunks which are requested concurrently, every
+    request covers max_stations_per_request stations. Raise ValueError if
+    chunk is not positive.
+    """
+    if chunk <= timedelta(0):
+        raise ValueError("chunk must be positive")
+
+    async def _fetch(batch: list[str], chunk_start: datetime) -> list[dict]:
+        chunk_end = min(chunk_start + chunk, end)
+        payload = await zamg.get_historical(
+            batch, chunk_start, chunk_end, parameters, resource
+        )
+        return historical_rows(payload, before=chunk_end)
+
+    ranges = []
+    chunk_start = start
+    while chunk_start < end:
+        ranges.append(chunk_start)
+        chunk_start += chunk
+    async for rows in ordered(
+        (
+            _fetch(batch, chunk_start)
+            for chunk_start in ranges
+            for batch in _chunks(station_ids, zamg.max_stations_per_request)
+        ),
+        concurrency,
+    ):
+        writer.write(rows)
+
+
+def _split(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _datetime(value: str) -> datetime:
+    result = datetime.fromisoformat(value)
+    if result.tzinfo is None:
+        result = result.replace(tzinfo=timezone.utc)
+    return result
+
+
+def _positive(value: str) -> float:
+    result = float(value)
+    if not result > 0:
+        raise argparse.ArgumentTypeError(f"{value} is not positive")
+    return result
+
+
+def _read_points(path: str) -> list[str]:
+    """Return the "lat,lon" lines of a file, "-" is stdin."""
+    if path == "-":
+        # stdin belongs to the process, it is read but not closed
+        return _parse_points(sys.stdin)
+    with open(path, encoding="utf-8") as stream:
+        return _parse_points(stream)
+
+
+def _parse_points(lines: Iterable[str]) -> list[str]:
+    return [
+        ",".join(part.strip() for part in line.split(",")[:2])
+        for line in lines
+        if line.strip() and not line.startswith("#")
+    ]
+
+
+def _client(
+    args: argparse.Namespace, session: aiohttp.ClientSession | None = None
+) -> ZamgData:
+    """Return a ZamgData configured by the common arguments."""
+    zamg = ZamgData(session=session)
+    if args.api_url:
+        zamg.set_api_url(args.api_url)
+    zamg.max_retries = args.max_retries
+    if args.rate_limit:
+        zamg.rate_limiter = RateLimiter(args.rate_limit, burst=args.concurrency)
+    return zamg
+
+
+async def _main(args: argparse.Namespace, stream: IO[str]) -> int:
+    writer = RowWriter(stream, args.format)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        zamg = _client(args, session)
+        if args.command == "current":
+            if args.parameters:
+                zamg.set_parameters(_split(args.parameters))
+            await export_current(
+                zamg,
+                writer,
+                _split(args.stations) if args.stations else None,
+                args.concurrency,
+            )
+        elif args.command == "forecast":
+            points = list(args.points or [])
+            if args.points_file:
+                points.extend(_read_points(args.points_file))
+            if args.parameters:
+                zamg.set_forecast_parameters(_split(args.parameters))
+            datasets = {
+                dataset.name: dataset
+                for dataset in (zamg.forecast_dataset, zamg.nowcast_dataset)
+            }
+            await export_forecast(
+                zamg,
+                writer,
+                points,
+                datasets[args.dataset],
+                args.points_per_request,
+                args.concurrency,
+            )
+        else:
+            await export_history(
+                zamg,
+                writer,
+                _split(args.stations),
+                _split(args.parameters),
+                args.start,
+                args.end,
+                args.resource,
+                timedelta(days=args.chunk_days),
+                args.concurrency,
+            )
+    return writer.rows
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Parse the arguments and run the export."""
+    parser = argparse.ArgumentParser(
+        prog="python -m zamg", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--output", "-o", help="default: stdout")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--rate-limit", type=float, help="requests per second")
+    parser.add_argument("--api-url", help="upstream dataset API url")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    current = commands.add_parser("current", help="current observations")
+    current.add_argument("--stations", help="comma separated ids, default: all")
+    current.add_argument("--parameters", help="comma separated, default: all")
+
+    forecast = commands.add_parser("forecast", help="forecasts of locations")
+    forecast.add_argument("--points", nargs="*", metavar="LAT,LON")
+    forecast.add_argument("--points-file", help='"lat,lon" lines, "-" for stdin')
+    forecast.add_argument(
+        "--dataset", choices=sorted(DATASETS), default=ZamgData.forecast_dataset.name
+    )
+    forecast.add_argument("--parameters", help="comma separated")
+    forecast.add_argument("--points-per-request", type=int, default=20)
+
+    history = commands.add_parser("history", help="historical observations")
+    history.add_argument("--stations", required=True, help="comma separated ids")
+    history.add_argument("--parameters", required=True, help="comma separated")
+    history.add_argument("--start", type=_datetime, required=True)
+    history.add_argument("--end", type=_datetime, required=True)
+    history.add_argument("--resource", default=HISTORICAL_RESOURCE)
+    history.add_argument("--chunk-days", type=_positive, default=1.0)
+
+    serve = commands.add_parser("serve", help="local caching proxy of the API")
+    serve_arguments(serve)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        run_proxy(_client(args), args)
+        return
+    if args.command == "forecast" and not (args.points or args.points_file):
+        parser.error("forecast needs --points or --points-file")
+    try:
+        if args.output is None:
+            asyncio.run(_main(args, sys.stdout))
+        else:
+            with open(args.output, "w", encoding="utf-8", newline="") as stream:
+                asyncio.run(_main(args, stream))
+    except ZamgError as exc:
+        parser.exit(1, f"Export failed: {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
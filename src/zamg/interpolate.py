@@ -0,0 +1,250 @@
+"""Inverse distance weighting of station observations at arbitrary points.
+
+A StationInterpolator is built once for the target points. It finds the
+nearest stations of every point with a grid index over the registry and
+stores their indices and normalized weights in flat arrays. Evaluating a
+parameter is then a gather and a weighted sum per point:
+
+    interpolator = StationInterpolator(registry, points, altitudes)
+    temperatures = interpolator.interpolate(snapshot, "TL", lapse_rate=-0.0065)
+
+Neighbours are only chosen among stations with a value, the weights are
+computed once per set of available stations and reused by all snapshots
+and parameters with the same availability.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from collections.abc import Sequence
+from operator import mul
+from typing import TYPE_CHECKING
+
+from .stations import StationRegistry
+
+if TYPE_CHECKING:
+    from .snapshot import StationSnapshot
+
+KM_PER_DEGREE = 111.2
+"""Length of one degree of latitude in km."""
+CELL_KM = 25.0
+"""Edge length of the grid cells of the neighbour search."""
+PLAN_CACHE_SIZE = 16
+"""Number of station availabilities the weights are kept for."""
+
+
+class _Plan:
+    """Neighbours and weights of all points for one station availability."""
+
+    __slots__ = ("count", "indices", "weights", "offsets")
+
+    def __init__(self, count: int, indices: array, weights: array, offsets: array):
+        self.count = count
+        self.indices = indices
+        """count station indices per point."""
+        self.weights = weights
+        """count normalized weights per point."""
+        self.offsets = offsets
+        """Altitude of the point minus the weighted altitude of its neighbours."""
+
+
+class StationInterpolator:
+    """Interpolates station values at fixed (lat, lon) points.
+
+    Every point gets the weighted mean of its neighbours closest stations
+    with a value, weighted by 1 / distance ** power. A station at the point
+    itself gets all the weight. With altitudes of the points, values can be
+    corrected by a lapse rate (change per meter of altitude) using the
+    station altitudes of the registry.
+    """
+
+    def __init__(
+        self,
+        registry: StationRegistry,
+        points: Sequence[tuple[float, float]],
+        altitudes: Sequence[float] | None = None,
+        neighbours: int = 4,
+        power: float = 2.0,
+    ):
+        """Initialize the interpolator and the station grid."""
+        if neighbours < 1:
+            raise ValueError("neighbours must be at least 1")
+        if altitudes is not None and len(altitudes) != len(points):
+            raise ValueError("altitudes must have one value per point")
+        self.registry = registry
+        self.neighbours = neighbours
+        self.power = power
+        lats = [lat for lat in registry.lat if lat == lat]
+        self._lon_scale = KM_PER_DEGREE * math.cos(
+            math.radians(sum(lats) / len(lats) if lats else 0.0)
+        )
+        self._x = array("d", (lon * self._lon_scale for lon in registry.lon))
+        self._y = array("d", (lat * KM_PER_DEGREE for lat in registry.lat))
+        self._points_x = array("d", (lon * self._lon_scale for _, lon in points))
+        self._points_y = array("d", (lat * KM_PER_DEGREE for lat, _ in points))
+        self.altitudes = (
+            array("d", (math.nan if value is None else value for value in altitudes))
+            if altitudes is not None
+            else None
+        )
+        self._cells: dict[tuple[int, int], list[int]] = {}
+        self._located = 0
+        """Bitmap of the stations with coordinates, the ones in the grid."""
+        for idx, (x, y) in enumerate(zip(self._x, self._y)):
+            if x == x and y == y:
+                self._cells.setdefault(self._cell(x, y), []).append(idx)
+                self._located |= 1 << idx
+        self._bounds = (0, 0, 0, 0)
+        if self._cells:
+            self._bounds = (
+                min(cell[0] for cell in self._cells),
+                max(cell[0] for cell in self._cells),
+                min(cell[1] for cell in self._cells),
+                max(cell[1] for cell in self._cells),
+            )
+        self._plans: dict[int, _Plan] = {}
+
+    def __len__(self) -> int:
+        """Return the number of points."""
+        return len(self._points_x)
+
+    @staticmethod
+    def _cell(x: float, y: float) -> tuple[int, int]:
+        return int(x // CELL_KM), int(y // CELL_KM)
+
+    def _nearest(
+        self, x: float, y: float, bitmap: int, count: int
+    ) -> list[tuple[float, int]]:
+        """Return (squared distance, index) of the count nearest stations.
+
+        Only stations with their bit set in bitmap are considered. The grid
+        is searched in rings around the cell of the point until no closer
+        station can follow.
+        """
+        cell_x, cell_y = self._cell(x, y)
+        min_x, max_x, min_y, max_y = self._bounds
+        last_ring = max(
+            abs(cell_x - min_x),
+            abs(cell_x - max_x),
+            abs(cell_y - min_y),
+            abs(cell_y - max_y),
+        )
+        station_x = self._x
+        station_y = self._y
+        best: list[tuple[float, int]] = []
+        ring = 0
+        while ring <= last_ring:
+            for cx in range(cell_x - ring, cell_x + ring + 1):
+                edge = cx in (cell_x - ring, cell_x + ring)
+                for cy in (
+                    range(cell_y - ring, cell_y + ring + 1)
+                    if edge
+                    else (cell_y - ring, cell_y + ring)
+                ):
+                    for idx in self._cells.get((cx, cy), ()):
+                        if not bitmap >> idx & 1:
+                            continue
+                        distance = (station_x[idx] - x) ** 2 + (station_y[idx] - y) ** 2
+                        if len(best) < count:
+                            heapq.heappush(best, (-distance, idx))
+                        elif -best[0][0] > distance:
+                            heapq.heapreplace(best, (-distance, idx))
+            # stations in further rings are at least ring cells away
+            if len(best) == count and -best[0][0] <= (ring * CELL_KM) ** 2:
+                break
+            ring += 1
+        return sorted((-distance, idx) for distance, idx in best)
+
+    def plan(self, bitmap: int) -> _Plan:
+        """Return the neighbours and weights for the stations in bitmap.
+
+        Bit n of bitmap is set if the station at registry index n has a
+        value, see StationSnapshot.availability().
+        """
+        plan = self._plans.get(bitmap)
+        if plan is not None:
+            return plan
+        # stations without coordinates can't be neighbours
+        count = min(self.neighbours, bin(bitmap & self._located).count("1"))
+        indices = array("i")
+        weights = array("d")
+        offsets = array("d")
+        station_altitudes = self.registry.altitude
+        exponent = -self.power / 2
+        for point, (x, y) in enumerate(zip(self._points_x, self._points_y)):
+            nearest = self._nearest(x, y, bitmap, count) if count else []
+            if nearest and nearest[0][0] == 0.0:
+                point_weights = [1.0] + [0.0] * (count - 1)
+            else:
+                point_weights = [distance**exponent for distance, _ in nearest]
+            total = sum(point_weights)
+            point_weights = [weight / total for weight in point_weights]
+            indices.extend(idx for _, idx in nearest)
+            weights.extend(point_weights)
+            if self.altitudes is not None:
+                altitude = self.altitudes[point]
+                offsets.append(
+                    altitude
+                    - sum(
+                        weight
+                        * (
+                            station_altitudes[idx]
+                            if station_altitudes[idx] == station_altitudes[idx]
+                            else altitude
+                        )
+                        for weight, (_, idx) in zip(point_weights, nearest)
+                    )
+                )
+        plan = _Plan(count, indices, weights, offsets)
+        if len(self._plans) >= PLAN_CACHE_SIZE:
+            del self._plans[next(iter(self._plans))]
+        self._plans[bitmap] = plan
+        return plan
+
+    def interpolate_column(
+        self, column: array, bitmap: int, lapse_rate: float | None = None
+    ) -> array:
+        """Return the interpolated values of a registry ordered column.
+
+        bitmap marks the stations with a value. The result has one value
+        per point, NaN if no station has a value.
+        """
+        if lapse_rate is not None and self.altitudes is None:
+            raise ValueError("A lapse rate needs the altitudes of the points")
+        plan = self.plan(bitmap)
+        if not plan.count:
+            return array("d", [math.nan]) * len(self)
+        products = map(mul, plan.weights, map(column.__getitem__, plan.indices))
+        if plan.count == 1:
+            result = array("d", products)
+        else:
+            result = array("d", map(sum, zip(*[products] * plan.count)))
+        if lapse_rate is not None:
+            result = array(
+                "d",
+                (
+                    value + lapse_rate * offset
+                    for value, offset in zip(result, plan.offsets)
+                ),
+            )
+        return result
+
+    def interpolate(
+        self,
+        snapshot: StationSnapshot,
+        parameter: str,
+        lapse_rate: float | None = None,
+    ) -> array:
+        """Return the interpolated values of a snapshot parameter per point.
+
+        snapshot has to be of the registry of the interpolator.
+        lapse_rate is the change per meter of altitude, e.g. -0.0065 for
+        the temperature in °C.
+        """
+        if snapshot.registry is not self.registry:
+            raise ValueError("The snapshot has another station registry")
+        return self.interpolate_column(
+            snapshot.values(parameter), snapshot.availability(parameter), lapse_rate
+        )
@@ -0,0 +1,300 @@
+"""Load driver running many concurrent ZamgData clients.
+
+Without an api url a local StandinServer is started in the same process:
+
+    python -m zamg.loadtest --clients 50 --duration 10 --latency 0.05
+
+The responses of a run can be recorded and replayed without network access,
+see zamg.replay:
+
+    python -m zamg.loadtest --api-url https://... --record traffic.zreplay
+    python -m zamg.loadtest --replay traffic.zreplay --latency-scale 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import pathlib
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from .datasets import API_URL
+from .exceptions import ZamgError
+from .replay import RecordingSession, ReplaySession
+from .standin import StandinServer
+from .zamg import ZamgData
+
+SCENARIOS = ("update", "forecast", "mixed", "revalidate")
+"""Possible request mixes of a load test.
+
+update, forecast and mixed fetch and parse full responses; revalidate is
+mixed with the validators kept, so most responses are 304 Not Modified.
+"""
+
+
+def max_rss() -> int | None:
+    """Return the peak resident set size of this process in bytes."""
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def percentile(values: list[float], percent: float) -> float | None:
+    """Return the percentile of values, None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@dataclass
+class LoadReport:
+    """Result of a load test run."""
+
+    clients: int
+    duration: float
+    latencies: list[float] = field(default_factory=list)
+    """Latency of every successful request in seconds."""
+    errors: Counter[str] = field(default_factory=Counter)
+    """Number of failed requests by exception type."""
+    loop_lag: list[float] = field(default_factory=list)
+    """Measured event loop delays in seconds."""
+    max_rss: int | None = None
+
+    @property
+    def requests(self) -> int:
+        """Return the number of finished requests."""
+        return len(self.latencies) + sum(self.errors.values())
+
+    @property
+    def throughput(self) -> float:
+        """Return the finished requests per second."""
+        return self.requests / self.duration if self.duration else 0.0
+
+    def as_dict(self) -> dict:
+        """Return the report as a JSON serializable dict."""
+        return {
+            "clients": self.clients,
+            "duration_s": self.duration,
+            "requests": self.requests,
+            "throughput_rps": self.throughput,
+            "errors": dict(self.errors),
+            "latency_s": {
+                "mean": statistics.fmean(self.latencies) if self.latencies else None,
+                "p50": percentile(self.latencies, 50),
+                "p90": percentile(self.latencies, 90),
+                "p99": percentile(self.latencies, 99),
+                "max": max(self.latencies, default=None),
+            },
+            "loop_lag_s": {
+                "mean": statistics.fmean(self.loop_lag) if self.loop_lag else None,
+                "p99": percentile(self.loop_lag, 99),
+                "max": max(self.loop_lag, default=None),
+            },
+            "max_rss_bytes": self.max_rss,
+        }
+
+
+async def _monitor_loop_lag(
+    report: LoadReport, stop: asyncio.Event, interval: float = 0.01
+) -> None:
+    """Record how late the event loop wakes up a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        report.loop_lag.append(max(0.0, loop.time() - start - interval))
+
+
+async def _run_client(
+    zamg: ZamgData,
+    scenario: str,
+    deadline: float,
+    report: LoadReport,
+    rnd: random.Random,
+) -> None:
+    """Send requests of a scenario until the deadline."""
+    loop = asyncio.get_running_loop()
+    stations = None
+    while stations is None:
+        if loop.time() >= deadline:
+            return
+        try:
+            stations = await zamg.zamg_stations()
+        except ZamgError as exc:
+            report.errors[type(exc).__name__] += 1
+        else:
+            if stations is None:
+                report.errors["metadata"] += 1
+    station_ids = list(stations)
+    revalidate = scenario == "revalidate"
+    mixed = scenario in ("mixed", "revalidate")
+    while loop.time() < deadline:
+        station_id = rnd.choice(station_ids)
+        _expire(zamg, revalidate)
+        start = time.perf_counter()
+        try:
+            if scenario == "update" or (mixed and rnd.random() < 0.5):
+                zamg.set_default_station(station_id)
+                await zamg.update()
+            else:
+                lat, lon, _ = stations[station_id]
+                await zamg.get_forecast(f"{lat},{lon}")
+        except ZamgError as exc:
+            report.errors[type(exc).__name__] += 1
+        else:
+            report.latencies.append(time.perf_counter() - start)
+
+
+def _expire(zamg: ZamgData, revalidate: bool) -> None:
+    """Expire the cached data of a client, so its next call sends a request.
+
+    Unless revalidate, the validators and payload hashes are dropped too,
+    so the request gets a full response which is parsed.
+    """
+    # pylint: disable=protected-access
+    zamg._timestamp = None  # bypass the 5 minute guard
+    zamg._forecast_timestamps.clear()
+    if not revalidate:
+        zamg._validators.clear()
+        zamg._forecast_urls.clear()
+        zamg._payload_hashes.clear()
+
+
+async def run_load(
+    api_url: str,
+    clients: int = 10,
+    duration: float = 10.0,
+    scenario: str = "update",
+    shared_session: bool = True,
+    seed: int = 0,
+    session: aiohttp.ClientSession | RecordingSession | ReplaySession | None = None,
+) -> LoadReport:
+    """Run clients concurrent ZamgData instances against api_url for duration.
+
+    With shared_session all clients use one ClientSession (and so one
+    connection pool), otherwise every client creates its own session.
+    A given session is used by all clients and not closed.
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario}")
+    report = LoadReport(clients, duration)
+    own_session = None
+    if session is None and shared_session:
+        session = own_session = aiohttp.ClientSession()
+    instances = []
+    for _ in range(clients):
+        zamg = ZamgData(session=session)
+        zamg.set_api_url(api_url)
+        instances.append(zamg)
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_monitor_loop_lag(report, stop))
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        await asyncio.gather(
+            *(
+                _run_client(
+                    zamg, scenario, start + duration, report, random.Random(seed + idx)
+                )
+                for idx, zamg in enumerate(instances)
+            )
+        )
+    finally:
+        report.duration = loop.time() - start
+        stop.set()
+        await monitor
+        for zamg in instances:
+            await zamg.__aexit__()
+        if own_session is not None:
+            await own_session.close()
+    report.max_rss = max_rss()
+    return report
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    server = None
+    session = None
+    api_url = args.api_url
+    if args.replay is not None:
+        session = ReplaySession(args.replay.read_bytes(), args.latency_scale)
+        api_url = api_url or API_URL
+    elif args.record is not None:
+        session = RecordingSession(aiohttp.ClientSession())
+    if api_url is None:
+        server = StandinServer(
+            stations=args.stations,
+            parameters=args.parameters,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            rate_limit=args.rate_limit,
+        )
+        api_url = await server.start()
+    try:
+        report = await run_load(
+            api_url,
+            clients=args.clients,
+            duration=args.duration,
+            scenario=args.scenario,
+            shared_session=not args.session_per_client,
+            session=session,
+        )
+    finally:
+        if args.record is not None:
+            args.record.write_bytes(session.dump())
+        if session is not None:
+            await session.close()
+        if server is not None:
+            await server.stop()
+    result = report.as_dict()
+    if server is not None:
+        result["server_statuses"] = dict(server.statuses)
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Parse the arguments, run the load test and print the report as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--api-url", help="default: start a local stand-in")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="update")
+    parser.add_argument("--session-per-client", action="store_true")
+    replay = parser.add_argument_group("record and replay")
+    mode = replay.add_mutually_exclusive_group()
+    mode.add_argument("--record", type=pathlib.Path, help="write the responses")
+    mode.add_argument("--replay", type=pathlib.Path, help="serve recorded responses")
+    replay.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="factor of the replayed latency, 0 for none",
+    )
+    stand_in = parser.add_argument_group("stand-in server")
+    stand_in.add_argument("--stations", type=int, default=300)
+    stand_in.add_argument("--parameters", type=int, default=50)
+    stand_in.add_argument("--latency", type=float, default=0.0)
+    stand_in.add_argument("--jitter", type=float, default=0.0)
+    stand_in.add_argument("--error-rate", type=float, default=0.0)
+    stand_in.add_argument("--rate-limit", type=float)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
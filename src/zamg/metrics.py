@@ -0,0 +1,312 @@
+"""Metrics and tracing hooks for GeoSphere Austria clients.
+
+Assign an instance to ZamgData.metrics to record request timings, sizes,
+decode and processing times, cache hits, retries and rate limit waits.
+Without metrics (the default) no timing is done at all.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+    from yarl import URL
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""Upper bounds in seconds of the latency histogram buckets."""
+
+
+def endpoint_name(url: str | URL) -> str:
+    """Return the endpoint of an API url, the path without the version."""
+    import yarl  # pylint: disable=import-outside-toplevel
+
+    path = yarl.URL(url).path.strip("/")
+    return path.split("/", 1)[1] if path.startswith("v1/") else path
+
+
+class ZamgMetrics:
+    """Metrics hook, all methods do nothing.
+
+    Subclass it and override the methods of interest.
+    """
+
+    def request(self, endpoint: str, status: int, seconds: float, size: int) -> None:
+        """Record a finished request with its status, duration and body size."""
+
+    def decode(self, endpoint: str, seconds: float) -> None:
+        """Record the time to decode a JSON body."""
+
+    def process(self, endpoint: str, seconds: float) -> None:
+        """Record the time to post-process decoded data."""
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Record a cache lookup, hit is False if data had to be fetched."""
+
+    def retry(self, endpoint: str, attempt: int, reason: str) -> None:
+        """Record a retried request."""
+
+    def rate_limit_wait(self, seconds: float) -> None:
+        """Record the time a request waited for the rate limiter."""
+
+    def connection(self, event: str, seconds: float = 0.0) -> None:
+        """Record a connection event of the aiohttp trace config."""
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return an aiohttp TraceConfig reporting connection events.
+
+        It is added to sessions created by ZamgData; add it to the
+        trace_configs of own sessions to get the connection events.
+        """
+        import aiohttp  # pylint: disable=import-outside-toplevel
+
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(_session, context: SimpleNamespace, _params):
+            context.start = time.perf_counter()
+
+        async def on_connection_create_end(_session, context: SimpleNamespace, _params):
+            self.connection(
+                "create", time.perf_counter() - getattr(context, "start", 0.0)
+            )
+
+        async def on_connection_reuseconn(_session, _context, _params):
+            self.connection("reuse")
+
+        async def on_connection_queued_end(_session, _context, _params):
+            self.connection("queued")
+
+        async def on_dns_resolvehost_end(_session, _context, _params):
+            self.connection("dns")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_end.append(on_connection_queued_end)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        return trace_config
+
+
+class Histogram:
+    """Cumulative histogram over fixed bucket bounds."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        """Initialize an empty histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> dict:
+        """Return count, sum and the count per bucket upper bound."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class InMemoryMetrics(ZamgMetrics):
+    """Metrics kept in memory, e.g. for logging or tests."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.latency: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.decode_time: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.process_time: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.bytes_received: Counter[str] = Counter()
+        self.statuses: Counter[tuple[str, int]] = Counter()
+        self.cache_hits: Counter[str] = Counter()
+        self.cache_misses: Counter[str] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.rate_limit_waits = Histogram()
+        self.connections: Counter[str] = Counter()
+
+    def request(self, endpoint: str, status: int, seconds: float, size: int) -> None:
+        """Record a finished request with its status, duration and body size."""
+        self.latency[endpoint].observe(seconds)
+        self.bytes_received[endpoint] += size
+        self.statuses[(endpoint, status)] += 1
+
+    def decode(self, endpoint: str, seconds: float) -> None:
+        """Record the time to decode a JSON body."""
+        self.decode_time[endpoint].observe(seconds)
+
+    def process(self, endpoint: str, seconds: float) -> None:
+        """Record the time to post-process decoded data."""
+        self.process_time[endpoint].observe(seconds)
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Record a cache lookup."""
+        if hit:
+            self.cache_hits[name] += 1
+        else:
+            self.cache_misses[name] += 1
+
+    def retry(self, endpoint: str, attempt: int, reason: str) -> None:
+        """Record a retried request."""
+        self.retries[endpoint] += 1
+
+    def rate_limit_wait(self, seconds: float) -> None:
+        """Record the time a request waited for the rate limiter."""
+        self.rate_limit_waits.observe(seconds)
+
+    def connection(self, event: str, seconds: float = 0.0) -> None:
+        """Record a connection event."""
+        self.connections[event] += 1
+
+    def as_dict(self) -> dict:
+        """Return all metrics as a JSON serializable dict."""
+        return {
+            "latency": {key: value.as_dict() for key, value in self.latency.items()},
+            "decode_time": {
+                key: value.as_dict() for key, value in self.decode_time.items()
+            },
+            "process_time": {
+                key: value.as_dict() for key, value in self.process_time.items()
+            },
+            "bytes_received": dict(self.bytes_received),
+            "statuses": {
+                f"{endpoint} {status}": count
+                for (endpoint, status), count in self.statuses.items()
+            },
+            "cache_hits": dict(self.cache_hits),
+            "cache_misses": dict(self.cache_misses),
+            "retries": dict(self.retries),
+            "rate_limit_waits": self.rate_limit_waits.as_dict(),
+            "connections": dict(self.connections),
+        }
+
+
+class PrometheusMetrics(ZamgMetrics):
+    """Metrics exported with prometheus_client (optional dependency)."""
+
+    def __init__(self, registry=None, prefix: str = "zamg"):
+        """Create the metric families in registry (default registry if None)."""
+        # pylint: disable=import-outside-toplevel
+        try:
+            import prometheus_client
+        except ImportError as exc:
+            raise ImportError(
+                "PrometheusMetrics requires the prometheus_client package"
+            ) from exc
+        kwargs = {} if registry is None else {"registry": registry}
+        self._latency = prometheus_client.Histogram(
+            f"{prefix}_request_seconds",
+            "Request latency",
+            ["endpoint", "status"],
+            buckets=LATENCY_BUCKETS,
+            **kwargs,
+        )
+        self._bytes = prometheus_client.Counter(
+            f"{prefix}_received_bytes", "Bytes received", ["endpoint"], **kwargs
+        )
+        self._decode = prometheus_client.Histogram(
+            f"{prefix}_decode_seconds", "JSON decode time", ["endpoint"], **kwargs
+        )
+        self._process = prometheus_client.Histogram(
+            f"{prefix}_process_seconds", "Post-processing time", ["endpoint"], **kwargs
+        )
+        self._cache = prometheus_client.Counter(
+            f"{prefix}_cache_lookups", "Cache lookups", ["cache", "result"], **kwargs
+        )
+        self._retries = prometheus_client.Counter(
+            f"{prefix}_retries", "Retried requests", ["endpoint", "reason"], **kwargs
+        )
+        self._waits = prometheus_client.Histogram(
+            f"{prefix}_rate_limit_wait_seconds", "Rate limit waits", **kwargs
+        )
+        self._connections = prometheus_client.Counter(
+            f"{prefix}_connection_events", "Connection events", ["event"], **kwargs
+        )
+
+    def request(self, endpoint: str, status: int, seconds: float, size: int) -> None:
+        """Record a finished request with its status, duration and body size."""
+        self._latency.labels(endpoint, str(status)).observe(seconds)
+        self._bytes.labels(endpoint).inc(size)
+
+    def decode(self, endpoint: str, seconds: float) -> None:
+        """Record the time to decode a JSON body."""
+        self._decode.labels(endpoint).observe(seconds)
+
+    def process(self, endpoint: str, seconds: float) -> None:
+        """Record the time to post-process decoded data."""
+        self._process.labels(endpoint).observe(seconds)
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Record a cache lookup."""
+        self._cache.labels(name, "hit" if hit else "miss").inc()
+
+    def retry(self, endpoint: str, attempt: int, reason: str) -> None:
+        """Record a retried request."""
+        self._retries.labels(endpoint, reason).inc()
+
+    def rate_limit_wait(self, seconds: float) -> None:
+        """Record the time a request waited for the rate limiter."""
+        self._waits.observe(seconds)
+
+    def connection(self, event: str, seconds: float = 0.0) -> None:
+        """Record a connection event."""
+        self._connections.labels(event).inc()
+
+
+class OpenTelemetryMetrics(ZamgMetrics):
+    """Metrics recorded with the OpenTelemetry API (optional dependency)."""
+
+    def __init__(self, meter=None):
+        """Create the instruments on meter (meter of this package if None)."""
+        # pylint: disable=import-outside-toplevel
+        try:
+            from opentelemetry import metrics
+        except ImportError as exc:
+            raise ImportError(
+                "OpenTelemetryMetrics requires the opentelemetry-api package"
+            ) from exc
+        meter = meter or metrics.get_meter("zamg")
+        self._latency = meter.create_histogram("zamg.request.duration", unit="s")
+        self._bytes = meter.create_counter("zamg.received", unit="By")
+        self._decode = meter.create_histogram("zamg.decode.duration", unit="s")
+        self._process = meter.create_histogram("zamg.process.duration", unit="s")
+        self._cache = meter.create_counter("zamg.cache.lookups")
+        self._retries = meter.create_counter("zamg.retries")
+        self._waits = meter.create_histogram("zamg.rate_limit.wait", unit="s")
+        self._connections = meter.create_counter("zamg.connection.events")
+
+    def request(self, endpoint: str, status: int, seconds: float, size: int) -> None:
+        """Record a finished request with its status, duration and body size."""
+        self._latency.record(seconds, {"endpoint": endpoint, "status": status})
+        self._bytes.add(size, {"endpoint": endpoint})
+
+    def decode(self, endpoint: str, seconds: float) -> None:
+        """Record the time to decode a JSON body."""
+        self._decode.record(seconds, {"endpoint": endpoint})
+
+    def process(self, endpoint: str, seconds: float) -> None:
+        """Record the time to post-process decoded data."""
+        self._process.record(seconds, {"endpoint": endpoint})
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Record a cache lookup."""
+        self._cache.add(1, {"cache": name, "result": "hit" if hit else "miss"})
+
+    def retry(self, endpoint: str, attempt: int, reason: str) -> None:
+        """Record a retried request."""
+        self._retries.add(1, {"endpoint": endpoint, "reason": reason})
+
+    def rate_limit_wait(self, seconds: float) -> None:
+        """Record the time a request waited for the rate limiter."""
+        self._waits.record(seconds)
+
+    def connection(self, event: str, seconds: float = 0.0) -> None:
+        """Record a connection event."""
+        self._connections.add(1, {"event": event})
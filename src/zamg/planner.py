@@ -0,0 +1,195 @@
+"""Shared planning of the parameters requested by many consumers.
+
+Assign one ParameterPlanner to ZamgData instances reading the same stations
+or forecast locations. It learns which parameters every instance reads with
+get_data(), requests the union of them once per station or location, and
+gives every instance its projection of the response:
+
+    planner = ParameterPlanner()
+    for zamg in consumers:
+        zamg.planner = planner
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import weakref
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from .exceptions import ZamgApiError
+
+if TYPE_CHECKING:
+    from .datasets import ZamgDataset
+    from .zamg import ZamgData
+
+
+class ParameterPlanner:
+    """Merges the parameters of consumers into as few requests as possible.
+
+    The parameters of a consumer are the ones it has read with get_data()
+    since its first update, limited to its station_parameters; before the
+    first read all of its station_parameters are used. A parameter read for
+    the first time is requested by the next update(). A response is reused
+    by all consumers for max_age seconds if it holds all their parameters.
+    Consumers requesting the same station or location while a request is
+    pending wait for it.
+    """
+
+    def __init__(self, max_age: float = 60.0, window: float = 0.0):
+        """Initialize the planner.
+
+        A request is delayed by window seconds to collect the parameters of
+        concurrent consumers.
+        """
+        self.max_age = max_age
+        self.window = window
+        self.requests = 0
+        """Number of requests sent."""
+        self._reads: weakref.WeakKeyDictionary[ZamgData, dict[str, set[str]]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._consumers: dict[object, weakref.WeakSet[ZamgData]] = {}
+        self._responses: dict[object, tuple[float, frozenset[str], object]] = {}
+        self._pending: dict[object, asyncio.Future] = {}
+
+    def record(self, zamg: ZamgData, station_id: str, parameter: str) -> None:
+        """Record that zamg read parameter of station_id."""
+        self._reads.setdefault(zamg, {}).setdefault(station_id, set()).add(parameter)
+
+    def station_parameters(self, zamg: ZamgData, station_id: str) -> set[str]:
+        """Return the observation parameters a consumer needs of a station."""
+        declared = set(zamg.get_parameters())
+        reads = self._reads.get(zamg, {}).get(station_id)
+        if reads:
+            return reads & declared or declared
+        return declared
+
+    @staticmethod
+    def forecast_parameters(zamg: ZamgData, dataset: ZamgDataset) -> set[str]:
+        """Return the forecast parameters a consumer needs of dataset.
+
+        Besides the configured parameters this are the parameters the
+        derived rain and wind speed are calculated of.
+        """
+        # pylint: disable=protected-access
+        parameters = set(zamg._forecast_parameters_for(dataset).split(","))
+        parameters.add(dataset.rain_parameter)
+        parameters.update(dataset.wind_parameters)
+        return parameters
+
+    def plan(self, key: object) -> frozenset[str]:
+        """Return the union of the parameters of all consumers of key."""
+        parameters: set[str] = set()
+        for zamg in self._consumers.get(key, ()):
+            if key[0] == "station":
+                parameters |= self.station_parameters(zamg, key[1])
+            else:
+                parameters |= self.forecast_parameters(zamg, key[1])
+        return frozenset(parameters)
+
+    async def _fetch(self, zamg: ZamgData, key: tuple, url_of, parse) -> object:
+        """Return the response of key, request the planned parameters if needed.
+
+        url_of(parameters) returns the url, parse(contents) the response.
+        """
+        self._consumers.setdefault(key, weakref.WeakSet()).add(zamg)
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            await asyncio.shield(pending)
+        needed = self.plan(key)
+        cached = self._responses.get(key)
+        if (
+            cached is not None
+            and time.monotonic() - cached[0] < self.max_age
+            and needed <= cached[1]
+        ):
+            return cached[2]
+
+        future = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            # consumers arriving meanwhile wait for this request, so include them
+            await asyncio.sleep(self.window)
+            needed = self.plan(key)
+            url = url_of(sorted(needed))
+            self.requests += 1
+            # pylint: disable=protected-access
+            status, contents = await zamg._get(url)
+            if status not in (200, 301):
+                raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+            response = parse(zamg._decode(url, contents))
+            self._responses[key] = (time.monotonic(), needed, response)
+            return response
+        finally:
+            del self._pending[key]
+            future.set_result(None)
+
+    async def fetch_observations(
+        self, zamg: ZamgData, station_id: str
+    ) -> tuple[str, dict]:
+        """Return (timestamp, observations) of the planned parameters of a station."""
+        # pylint: disable=protected-access
+        return await self._fetch(
+            zamg,
+            ("station", station_id, zamg.dataset_data_url),
+            lambda parameters: zamg.dataset_data_url
+            + ",".join(parameters)
+            + "&station_ids="
+            + station_id,
+            lambda payload: self._station_observations(zamg, payload, station_id),
+        )
+
+    @staticmethod
+    def _station_observations(
+        zamg: ZamgData, payload: dict, station_id: str
+    ) -> tuple[str, dict]:
+        # pylint: disable=protected-access
+        timestamp, stations = zamg._parse_observations(payload, [station_id])
+        return timestamp, stations[station_id]
+
+    async def fetch_forecast(
+        self, zamg: ZamgData, points: list[str], dataset: ZamgDataset
+    ) -> dict:
+        """Return the forecast payload of the planned parameters of points."""
+        return await self._fetch(
+            zamg,
+            ("forecast", dataset, tuple(points)),
+            lambda parameters: dataset.data_url
+            + ",".join(parameters)
+            + "".join(f"&lat_lon={point}" for point in points),
+            lambda payload: payload,
+        )
+
+    @staticmethod
+    def project(observations: dict, parameters: Iterable[str]) -> dict:
+        """Return the observations of parameters."""
+        return {
+            parameter: observations[parameter]
+            for parameter in parameters
+            if parameter in observations
+        }
+
+    @staticmethod
+    def project_forecast(payload: dict, parameters: Iterable[str]) -> dict:
+        """Return the forecast payload with the features limited to parameters."""
+        parameters = set(parameters)
+        features = []
+        for feature in payload.get("features", ()):
+            properties = feature["properties"]
+            features.append(
+                dict(
+                    feature,
+                    properties=dict(
+                        properties,
+                        parameters={
+                            name: values
+                            for name, values in properties["parameters"].items()
+                            if name in parameters
+                        },
+                    ),
+                )
+            )
+        return dict(payload, features=features)
@@ -0,0 +1,48 @@
+"""Request rate limiting for GeoSphere Austria clients."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token bucket allowing rate requests per second with bursts of burst.
+
+    One limiter can be shared by several ZamgData instances running in the
+    same event loop to keep their combined request rate below the limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """Initialize the limiter with a full bucket."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+
+    async def acquire(self) -> float:
+        """Wait for a token and return the seconds waited.
+
+        The wait includes the time queued behind other callers of the
+        limiter, it is 0.0 if a token was available right away.
+        """
+        start = time.monotonic()
+        waited = self._lock.locked()
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1.0:
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+                waited = True
+                self._refill()
+            self._tokens -= 1.0
+        return time.monotonic() - start if waited else 0.0
@@ -0,0 +1,303 @@
+"""Recording and replay of API responses for reproducible offline runs.
+
+A RecordingSession wraps the aiohttp session of ZamgData instances and
+keeps every response with its headers, body and timing. Its archive is
+served by a ReplaySession without any network access, with the recorded
+latency scaled by latency_scale (0 for no delay):
+
+    recorder = RecordingSession(aiohttp.ClientSession())
+    zamg = ZamgData(session=recorder)
+    ...
+    pathlib.Path("traffic.zreplay").write_bytes(recorder.dump())
+
+    replay = ReplaySession(pathlib.Path("traffic.zreplay").read_bytes())
+    zamg = ZamgData(session=replay)
+
+Responses are matched by path and query, so the api url may differ, and
+by whether the request was conditional. Several responses of a request
+are replayed in the recorded order, the last one is repeated.
+
+Format (little endian), version REPLAY_VERSION:
+
+    magic      8 bytes  b"ZAMGREPL"
+    version    uint16
+    index      uint32 length + zlib compressed JSON
+    bodies     zlib compressed, the distinct bodies concatenated
+
+The JSON index lists the responses as [request, conditional, status,
+headers, body, latency, read_time] with body the index of the body (-1 if
+it was not read), and the lengths of the bodies.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import struct
+import time
+import zlib
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit
+
+from multidict import CIMultiDict
+
+from .exceptions import ZamgApiError
+
+REPLAY_MAGIC = b"ZAMGREPL"
+REPLAY_VERSION = 1
+_HEADER = struct.Struct("<8sHI")
+_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+def request_key(url: str) -> str:
+    """Return the path and query of url, the key responses are matched by."""
+    parts = urlsplit(str(url))
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _is_conditional(headers: dict | None) -> bool:
+    return bool(headers) and any(name in headers for name in _CONDITIONAL_HEADERS)
+
+
+class RecordedResponse(NamedTuple):
+    """A recorded response."""
+
+    request: str
+    """Path and query of the request."""
+    conditional: bool
+    """True if the request carried validators."""
+    status: int
+    headers: list[tuple[str, str]]
+    body: int
+    """Index of the body in the archive, -1 if the body was not read."""
+    latency: float
+    """Seconds until the response headers arrived."""
+    read_time: float
+    """Seconds to read the body."""
+
+
+class _RecordingResponse:
+    """Response passing through to the recorded aiohttp response."""
+
+    def __init__(self, recorder: RecordingSession, response, key, latency: float):
+        self._recorder = recorder
+        self._response = response
+        self._key = key
+        self._latency = latency
+        self._body: bytes | None = None
+        self._read_time = 0.0
+        self._failed = False
+        self._recorded = False
+        self.status = response.status
+        self.headers = response.headers
+
+    async def read(self) -> bytes:
+        start = time.monotonic()
+        try:
+            self._body = await self._response.read()
+        except BaseException:
+            self._failed = True
+            raise
+        self._read_time = time.monotonic() - start
+        return self._body
+
+    def close(self) -> None:
+        if not self._recorded and not self._failed:
+            self._recorded = True
+            self._recorder.add(
+                *self._key,
+                self.status,
+                list(self.headers.items()),
+                self._body,
+                self._latency,
+                self._read_time,
+            )
+        self._response.close()
+
+
+class RecordingSession:
+    """Wraps a ClientSession and records all responses read through it."""
+
+    def __init__(self, session):
+        """Initialize the recorder, session is closed by close()."""
+        self.session = session
+        self.responses: list[RecordedResponse] = []
+        self._bodies: list[bytes] = []
+        self._body_indices: dict[bytes, int] = {}
+
+    @property
+    def closed(self) -> bool:
+        """Return True if the wrapped session is closed."""
+        return self.session.closed
+
+    async def get(self, url: str, headers: dict | None = None, **kwargs: Any):
+        """Send a GET request with the wrapped session and record its response."""
+        start = time.monotonic()
+        response = await self.session.get(url, headers=headers, **kwargs)
+        return _RecordingResponse(
+            self,
+            response,
+            (request_key(url), _is_conditional(headers)),
+            time.monotonic() - start,
+        )
+
+    def add(
+        self,
+        request: str,
+        conditional: bool,
+        status: int,
+        headers: list[tuple[str, str]],
+        body: bytes | None,
+        latency: float,
+        read_time: float,
+    ) -> None:
+        """Record a response, identical bodies are stored once."""
+        index = -1
+        if body is not None:
+            digest = hashlib.blake2b(body, digest_size=16).digest()
+            index = self._body_indices.get(digest, -1)
+            if index < 0:
+                index = self._body_indices[digest] = len(self._bodies)
+                self._bodies.append(body)
+        self.responses.append(
+            RecordedResponse(
+                request, conditional, status, headers, index, latency, read_time
+            )
+        )
+
+    def dump(self) -> bytes:
+        """Return the recorded responses in the archive format."""
+        index = {
+            "responses": [list(response) for response in self.responses],
+            "bodies": [len(body) for body in self._bodies],
+        }
+        encoded = zlib.compress(json.dumps(index, separators=(",", ":")).encode())
+        return b"".join(
+            [
+                _HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, len(encoded)),
+                encoded,
+                zlib.compress(b"".join(self._bodies)),
+            ]
+        )
+
+    async def close(self) -> None:
+        """Close the wrapped session."""
+        await self.session.close()
+
+
+def load_archive(archive: bytes) -> tuple[list[RecordedResponse], list[bytes]]:
+    """Return the responses and bodies of an archive.
+
+    Raise ValueError if archive is no archive of a supported version.
+    """
+    data = memoryview(archive)
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated archive")
+    magic, version, index_size = _HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC:
+        raise ValueError("No zamg replay archive")
+    if version != REPLAY_VERSION:
+        raise ValueError(f"Unsupported archive version {version}")
+    try:
+        index = json.loads(
+            zlib.decompress(data[_HEADER.size : _HEADER.size + index_size])
+        )
+        blob = zlib.decompress(data[_HEADER.size + index_size :])
+    except zlib.error as exc:
+        raise ValueError(f"Corrupt archive: {exc}") from exc
+    bodies = []
+    offset = 0
+    for length in index["bodies"]:
+        bodies.append(blob[offset : offset + length])
+        offset += length
+    if offset != len(blob):
+        raise ValueError("Corrupt archive: body lengths do not match")
+    responses = [
+        RecordedResponse(
+            request,
+            conditional,
+            status,
+            [tuple(header) for header in headers],
+            body,
+            latency,
+            read_time,
+        )
+        for request, conditional, status, headers, body, latency, read_time in index[
+            "responses"
+        ]
+    ]
+    return responses, bodies
+
+
+class _ReplayResponse:
+    """Response served out of an archive."""
+
+    def __init__(self, response: RecordedResponse, body: bytes, delay: float):
+        self.status = response.status
+        self.headers = CIMultiDict(response.headers)
+        self._body = body
+        self._delay = delay
+
+    async def read(self) -> bytes:
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+        return self._body
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class ReplaySession:
+    """Serves the responses of an archive in place of a ClientSession.
+
+    Requests without a recorded response raise ZamgApiError.
+    """
+
+    def __init__(self, archive: bytes, latency_scale: float = 1.0):
+        """Initialize the session out of a RecordingSession.dump() archive."""
+        self.latency_scale = latency_scale
+        self.requests = 0
+        """Number of requests served."""
+        responses, self._bodies = load_archive(archive)
+        self._responses: dict[tuple[str, bool], list[RecordedResponse]] = {}
+        for response in responses:
+            self._responses.setdefault(
+                (response.request, response.conditional), []
+            ).append(response)
+        self._positions: dict[tuple[str, bool], int] = {}
+        self.closed = False
+
+    def _next(self, request: str, conditional: bool) -> RecordedResponse | None:
+        """Return the next recorded response of a request."""
+        for key in ((request, conditional), (request, not conditional)):
+            responses = self._responses.get(key)
+            if not responses:
+                continue
+            position = self._positions.get(key, 0)
+            response = responses[min(position, len(responses) - 1)]
+            if response.status == 304 and not conditional:
+                # not modified is no answer to an unconditional request
+                continue
+            self._positions[key] = position + 1
+            return response
+        return None
+
+    async def get(self, url: str, headers: dict | None = None, **_kwargs: Any):
+        """Return the next recorded response of url after its recorded latency."""
+        request = request_key(url)
+        response = self._next(request, _is_conditional(headers))
+        if response is None:
+            raise ZamgApiError(f"No recorded response for {request}")
+        self.requests += 1
+        if response.latency * self.latency_scale > 0:
+            await asyncio.sleep(response.latency * self.latency_scale)
+        return _ReplayResponse(
+            response,
+            self._bodies[response.body] if response.body >= 0 else b"",
+            response.read_time * self.latency_scale,
+        )
+
+    async def close(self) -> None:
+        """Close the session."""
+        self.closed = True
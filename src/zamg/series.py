@@ -0,0 +1,236 @@
+"""Columnar time series with an epoch index for GeoSphere Austria data."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+
+from . import columnar
+from .exceptions import ZamgNoDataError
+
+UTC = timezone.utc
+"""The UTC tzinfo, shared instead of creating a ZoneInfo("UTC") per call."""
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M%z"
+"""Timestamp format used by the dataset API."""
+
+RESAMPLE_METHODS = ("mean", "sum", "min", "max")
+"""Possible reductions for SeriesWindow.resample()."""
+
+
+def parse_epoch(timestamp: str) -> int:
+    """Return the epoch seconds of an API timestamp."""
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+
+
+def to_epoch(value: datetime | int | float | None, default: int) -> int:
+    """Return epoch seconds of a datetime or number, default for None."""
+    if value is None:
+        return default
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _to_float(value) -> float:
+    """Return value as float, None is stored as NaN."""
+    return math.nan if value is None else float(value)
+
+
+class SeriesWindow:
+    """A window of a TimeSeries.
+
+    epochs and the entries of data are memoryviews into the buffers of the
+    series, so creating a window does not copy any values. Missing values
+    are NaN. Use tolist() on a view to get a plain list.
+    """
+
+    def __init__(self, epochs: memoryview, data: dict[str, memoryview]):
+        """Initialize the window."""
+        self.epochs = epochs
+        self.data = data
+
+    def __len__(self) -> int:
+        """Return the number of timestamps in the window."""
+        return len(self.epochs)
+
+    @property
+    def timestamps(self) -> list[datetime]:
+        """Return the timestamps of the window as UTC datetimes."""
+        return [datetime.fromtimestamp(epoch, UTC) for epoch in self.epochs]
+
+    def resample(
+        self, step: timedelta, how: str | dict[str, str] = "mean"
+    ) -> SeriesWindow:
+        """Return a new window aggregated into buckets of step.
+
+        Buckets are aligned to multiples of step since the epoch and labeled
+        with their start. how is one of RESAMPLE_METHODS, or a dict of
+        {parameter: method} (unlisted parameters use "mean").
+        NaN values are skipped; a bucket without values is NaN.
+        """
+        seconds = int(step.total_seconds())
+        if seconds <= 0:
+            raise ValueError("step must be positive")
+        methods = {
+            name: how.get(name, "mean") if isinstance(how, dict) else how
+            for name in self.data
+        }
+        for method in methods.values():
+            if method not in RESAMPLE_METHODS:
+                raise ValueError(f"Unknown resample method {method}")
+
+        bucket_epochs = array("q")
+        bounds = []
+        for idx, epoch in enumerate(self.epochs):
+            bucket = epoch - epoch % seconds
+            if not bucket_epochs or bucket_epochs[-1] != bucket:
+                bucket_epochs.append(bucket)
+                bounds.append(idx)
+        bounds.append(len(self.epochs))
+
+        data = {}
+        for name, values in self.data.items():
+            method = methods[name]
+            column = array("d")
+            for start, end in zip(bounds, bounds[1:]):
+                bucket_values = [
+                    value for value in values[start:end] if not math.isnan(value)
+                ]
+                if not bucket_values:
+                    column.append(math.nan)
+                elif method == "sum":
+                    column.append(math.fsum(bucket_values))
+                elif method == "mean":
+                    column.append(math.fsum(bucket_values) / len(bucket_values))
+                elif method == "min":
+                    column.append(min(bucket_values))
+                else:
+                    column.append(max(bucket_values))
+            data[name] = memoryview(column)
+        return SeriesWindow(memoryview(bucket_epochs), data)
+
+    def to_numpy(self) -> dict:
+        """Return NumPy arrays sharing the buffers, see zamg.columnar."""
+        return columnar.window_to_numpy(self)
+
+    def to_arrow(self):
+        """Return a pyarrow Table sharing the buffers, see zamg.columnar."""
+        return columnar.window_to_arrow(self)
+
+    def to_pandas(self):
+        """Return a pandas DataFrame, see zamg.columnar."""
+        return columnar.window_to_pandas(self)
+
+
+class TimeSeries:
+    """Columnar time series of float parameters over a sorted epoch index.
+
+    Timestamps are stored as epoch seconds in an array("q") and every
+    parameter as an array("d") of the same length.
+    """
+
+    def __init__(self, max_length: int | None = None):
+        """Initialize an empty series keeping at most max_length entries."""
+        self.max_length = max_length
+        self.epochs = array("q")
+        self.columns: dict[str, array] = {}
+
+    @classmethod
+    def from_forecast(cls, forecast_data: dict, feature: int = 0) -> TimeSeries:
+        """Build a series out of one feature of a forecast payload."""
+        try:
+            series = cls()
+            series.epochs = array(
+                "q",
+                (parse_epoch(timestamp) for timestamp in forecast_data["timestamps"]),
+            )
+            parameters = forecast_data["features"][feature]["properties"]["parameters"]
+            for name, values in parameters.items():
+                series.columns[name] = array("d", map(_to_float, values["data"]))
+            return series
+        except (TypeError, ValueError, KeyError, IndexError) as exc:
+            raise ZamgNoDataError(exc) from exc
+
+    def __len__(self) -> int:
+        """Return the number of timestamps."""
+        return len(self.epochs)
+
+    def _unshare(self) -> None:
+        """Copy all buffers, so exported window views stay valid."""
+        self.epochs = array("q", self.epochs)
+        self.columns = {
+            name: array("d", column) for name, column in self.columns.items()
+        }
+
+    def append(self, epoch: int, values: dict) -> None:
+        """Append the values of one timestamp.
+
+        Timestamps must be appended in ascending order, an epoch equal to the
+        last one is ignored. Parameters not in values are stored as NaN.
+        """
+        if self.epochs and epoch <= self.epochs[-1]:
+            return
+        try:
+            self._append(epoch, values)
+        except BufferError:
+            # a window still references the buffers, leave them to it
+            self._unshare()
+            self._append(epoch, values)
+
+    def _append(self, epoch: int, values: dict) -> None:
+        # an exported view may hold any of the buffers, not just the epochs,
+        # so on a BufferError the arrays appended to already are restored
+        added = [name for name in values if name not in self.columns]
+        length = len(self.epochs)
+        for name in added:
+            self.columns[name] = array("d", [math.nan]) * length
+        appended: list[array] = []
+        try:
+            self.epochs.append(epoch)
+            appended.append(self.epochs)
+            for name, column in self.columns.items():
+                column.append(_to_float(values.get(name)))
+                appended.append(column)
+        except BufferError:
+            for buffer in appended:
+                buffer.pop()
+            for name in added:
+                del self.columns[name]
+            raise
+        # every buffer was resized, none is exported
+        if self.max_length is not None and len(self.epochs) > self.max_length:
+            excess = len(self.epochs) - self.max_length
+            del self.epochs[:excess]
+            for column in self.columns.values():
+                del column[:excess]
+
+    def bounds(
+        self,
+        start: datetime | int | None = None,
+        end: datetime | int | None = None,
+    ) -> tuple[int, int]:
+        """Return the index range [lo, hi) of timestamps in [start, end)."""
+        lo = bisect_left(self.epochs, to_epoch(start, -(2**63)))
+        hi = bisect_left(self.epochs, to_epoch(end, 2**63 - 1))
+        return lo, max(lo, hi)
+
+    def window(
+        self,
+        start: datetime | int | None = None,
+        end: datetime | int | None = None,
+        parameters: list[str] | tuple[str, ...] | None = None,
+    ) -> SeriesWindow:
+        """Return the window of timestamps in [start, end) as views.
+
+        start and end are datetimes or epoch seconds, None means unbounded.
+        """
+        lo, hi = self.bounds(start, end)
+        if parameters is None:
+            parameters = tuple(self.columns)
+        try:
+            data = {name: memoryview(self.columns[name])[lo:hi] for name in parameters}
+        except KeyError as exc:
+            raise ZamgNoDataError(exc) from exc
+        return SeriesWindow(memoryview(self.epochs)[lo:hi], data)
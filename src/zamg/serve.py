@@ -0,0 +1,479 @@
+"""Local caching proxy of the GeoSphere Austria dataset API.
+
+    python -m zamg --rate-limit 5 serve --port 8080
+
+Services use the proxy instead of GeoSphere Austria, e.g. with
+ZamgData.set_api_url("http://localhost:8080/v1"). It serves the station
+metadata, current observation and forecast endpoints with the same paths and
+payloads out of one shared ZamgData, so all services together send a single
+rate limited stream of upstream requests:
+
+- metadata is passed through and revalidated after metadata_max_age seconds
+- current observations are cached per station for observation_max_age
+  seconds, missing stations of concurrent requests are batched into
+  multi-station requests by an UpdateCoalescer; stations without
+  observations are remembered as well
+- forecasts are cached per dataset and location for the refresh interval of
+  the dataset, the missing locations of a request are fetched in one request;
+  at most max_forecast_points locations are kept, the least recently used
+  ones are dropped first
+
+Expired entries are swept every SWEEP_INTERVAL seconds.
+
+GET /v1/station/closest?lat=..&lon=..&count=.. returns the closest stations.
+All responses carry an ETag and conditional requests are answered with 304.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections.abc import Awaitable, Callable
+from http import HTTPStatus
+
+from aiohttp import ClientError, web
+
+from .coalesce import UpdateCoalescer
+from .datasets import ZamgDataset
+from .exceptions import ZamgApiError, ZamgError
+from .zamg import ZamgData
+
+POINT_PRECISION = 3
+"""Decimals "lat,lon" locations are rounded to, 3 decimals are about 100 m."""
+SWEEP_INTERVAL = 60.0
+"""Seconds between two sweeps of the expired cache entries."""
+
+
+def normalize_point(point: str) -> str:
+    """Return a "lat,lon" location rounded to POINT_PRECISION decimals.
+
+    Raises ValueError if point is no "lat,lon" location.
+    """
+    lat, lon = (float(value) for value in point.split(","))
+    return f"{round(lat, POINT_PRECISION)},{round(lon, POINT_PRECISION)}"
+
+
+class ZamgProxy:
+    """aiohttp server caching and batching the requests of many clients.
+
+    Upstream requests are sent by zamg, so its api url, session, rate
+    limiter, retries and metrics apply:
+
+        zamg = ZamgData()
+        zamg.rate_limiter = RateLimiter(5)
+        async with ZamgProxy(zamg) as proxy:
+            client.set_api_url(proxy.api_url)
+    """
+
+    def __init__(
+        self,
+        zamg: ZamgData | None = None,
+        observation_max_age: float = 60.0,
+        metadata_max_age: float = 3600.0,
+        coalesce_window: float = 0.02,
+        max_forecast_points: int = 10000,
+    ):
+        """Initialize the proxy, zamg defaults to a new ZamgData."""
+        self.zamg = zamg or ZamgData()
+        if self.zamg.coalescer is None:
+            self.zamg.coalescer = UpdateCoalescer(
+                coalesce_window, self.zamg.max_stations_per_request
+            )
+        self.observation_max_age = observation_max_age
+        self.metadata_max_age = metadata_max_age
+        self.max_forecast_points = max_forecast_points
+        self.api_url = ""
+        self._metadata: dict[str, tuple[float, bytes]] = {}
+        self._observed: dict[str, float] = {}
+        self._forecasts: dict[tuple[str, str], tuple[float, frozenset, dict, dict]] = {}
+        self._forecast_parameters: dict[str, set[str]] = {}
+        self._pending: dict[object, asyncio.Future] = {}
+        self._swept = time.monotonic()
+        self._runner: web.AppRunner | None = None
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application with all routes."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get(
+            "/v1/station/current/tawes-v1-10min/metadata", self._station_metadata
+        )
+        app.router.add_get("/v1/station/current/tawes-v1-10min", self._station_data)
+        app.router.add_get("/v1/station/closest", self._closest_stations)
+        app.router.add_get(
+            "/v1/grid/forecast/{dataset}/metadata", self._forecast_metadata
+        )
+        app.router.add_get("/v1/timeseries/forecast/{dataset}", self._forecast_data)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the api url to use with set_api_url()."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.api_url = f"http://{host}:{self._runner.addresses[0][1]}/v1"
+        return self.api_url
+
+    async def stop(self) -> None:
+        """Stop serving and close the upstream session."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        await self.zamg.__aexit__(None, None, None)
+
+    async def __aenter__(self) -> ZamgProxy:
+        """Async enter, starts the server on a free port."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        """Async exit, stops the server."""
+        await self.stop()
+
+    async def _shared(self, key: object, request: Callable[[], Awaitable]):
+        """Run request, concurrent callers of the same key share the result."""
+        future = self._pending.get(key)
+        if future is None:
+            future = self._pending[key] = asyncio.ensure_future(request())
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def metadata(self, url: str) -> bytes:
+        """Return the metadata payload of url, as sent by the upstream."""
+        cached = self._metadata.get(url)
+        if cached is not None and time.monotonic() - cached[0] < self.metadata_max_age:
+            return cached[1]
+        return await self._shared(("metadata", url), lambda: self._fetch_metadata(url))
+
+    async def _fetch_metadata(self, url: str) -> bytes:
+        # pylint: disable=protected-access
+        status, contents = await self.zamg._get(url, revalidate=True)
+        cached = self._metadata.get(url)
+        if status == HTTPStatus.NOT_MODIFIED and cached is not None:
+            contents = cached[1]
+        elif status not in (200, 301):
+            raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+        elif url == self.zamg.dataset_metadata_url:
+            self.zamg._store_station_metadata(self.zamg._decode(url, contents))
+        self._metadata[url] = (time.monotonic(), contents)
+        return contents
+
+    def _sweep(self, now: float) -> None:
+        """Drop the expired observation and forecast entries."""
+        if now - self._swept < SWEEP_INTERVAL:
+            return
+        self._swept = now
+        self._observed = {
+            station_id: observed
+            for station_id, observed in self._observed.items()
+            if now - observed < self.observation_max_age
+        }
+        max_ages = {
+            name: dataset.refresh_interval.total_seconds()
+            for name, dataset in self.datasets().items()
+        }
+        self._forecasts = {
+            key: entry
+            for key, entry in self._forecasts.items()
+            if now - entry[0] < max_ages.get(key[0], 0.0)
+        }
+
+    async def observations(
+        self, station_ids: list[str], parameters: list[str] | None = None
+    ) -> dict:
+        """Return the current observations payload of stations.
+
+        Stations unknown to the metadata raise KeyError.
+        """
+        zamg = self.zamg
+        await self.metadata(zamg.dataset_metadata_url)
+        # pylint: disable=protected-access
+        unknown = [
+            station_id for station_id in station_ids if station_id not in zamg._stations
+        ]
+        if unknown:
+            raise KeyError(",".join(unknown))
+        now = time.monotonic()
+        self._sweep(now)
+        stale = [
+            station_id
+            for station_id in dict.fromkeys(station_ids)
+            if station_id not in self._observed
+            or now - self._observed[station_id] >= self.observation_max_age
+        ]
+        await asyncio.gather(
+            *(
+                self._shared(
+                    ("station", station_id),
+                    lambda station_id=station_id: self._fetch_station(station_id),
+                )
+                for station_id in stale
+            )
+        )
+
+        features = []
+        timestamps = []
+        for station_id in station_ids:
+            observations = zamg.data.get(station_id)
+            if observations is None:
+                continue
+            timestamps.append(zamg._timestamps[station_id])
+            lat, lon, _ = zamg._stations[station_id]
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                    "properties": {
+                        "parameters": {
+                            parameter: dict(values, data=[values["data"]])
+                            for parameter, values in observations.items()
+                            if parameters is None or parameter in parameters
+                        },
+                        "station": station_id,
+                    },
+                }
+            )
+        return {
+            "media_type": "application/json",
+            "type": "FeatureCollection",
+            "version": "v1",
+            "timestamps": [max(timestamps)] if timestamps else [],
+            "features": features,
+        }
+
+    async def _fetch_station(self, station_id: str) -> None:
+        # pylint: disable=protected-access
+        zamg = self.zamg
+        try:
+            timestamp, observations = await zamg.coalescer.fetch(zamg, station_id)
+        except KeyError:
+            # the station sent no observations, ask again after the max age
+            pass
+        else:
+            zamg._store_observations(station_id, timestamp, observations)
+        self._observed[station_id] = time.monotonic()
+
+    def datasets(self) -> dict[str, ZamgDataset]:
+        """Return the forecast datasets served, by name."""
+        return {
+            dataset.name: dataset
+            for dataset in (self.zamg.forecast_dataset, self.zamg.nowcast_dataset)
+        }
+
+    async def forecast(
+        self, dataset: ZamgDataset, points: list[str], parameters: list[str]
+    ) -> dict:
+        """Return the forecast payload of "lat,lon" points.
+
+        The proxy requests the union of all parameters requested of a
+        dataset, so the cached locations serve every client.
+        """
+        wanted = frozenset(parameters or dataset.default_parameters)
+        self._forecast_parameters.setdefault(dataset.name, set()).update(wanted)
+        max_age = dataset.refresh_interval.total_seconds()
+        now = time.monotonic()
+        self._sweep(now)
+        found = {}
+        missing = []
+        for point in dict.fromkeys(points):
+            cached = self._forecasts.pop((dataset.name, point), None)
+            if cached is None or now - cached[0] >= max_age or not wanted <= cached[1]:
+                missing.append(point)
+            else:
+                # reinserted as the most recently used entry
+                self._forecasts[(dataset.name, point)] = found[point] = cached
+        if missing:
+            found.update(
+                await self._shared(
+                    ("forecast", dataset.name, tuple(missing)),
+                    lambda: self._fetch_forecast(dataset, missing),
+                )
+            )
+        entries = [found[point] for point in points]
+        if len({id(entry[2]) for entry in entries}) > 1:
+            # all points of a payload share the timestamps of one model run
+            unique = list(dict.fromkeys(points))
+            found = await self._shared(
+                ("forecast", dataset.name, tuple(unique)),
+                lambda: self._fetch_forecast(dataset, unique),
+            )
+            entries = [found[point] for point in points]
+
+        payload = entries[0][2] if entries else {}
+        return {
+            "media_type": "application/json",
+            "type": "FeatureCollection",
+            "version": "v1",
+            "reference_time": payload.get("reference_time"),
+            "timestamps": payload.get("timestamps", []),
+            "features": [
+                dict(
+                    feature,
+                    properties=dict(
+                        feature["properties"],
+                        parameters={
+                            name: values
+                            for name, values in feature["properties"][
+                                "parameters"
+                            ].items()
+                            if name in wanted
+                        },
+                    ),
+                )
+                for _, _, _, feature in entries
+            ],
+        }
+
+    async def _fetch_forecast(
+        self, dataset: ZamgDataset, points: list[str]
+    ) -> dict[str, tuple[float, frozenset, dict, dict]]:
+        """Fetch and cache the forecast of points, return their entries.
+
+        The entries are returned as they may be evicted by other requests
+        before the caller reads them.
+        """
+        # pylint: disable=protected-access
+        parameters = sorted(self._forecast_parameters[dataset.name])
+        url = (
+            dataset.data_url
+            + ",".join(parameters)
+            + "".join(f"&lat_lon={point}" for point in points)
+        )
+        status, contents = await self.zamg._get(url)
+        if status not in (200, 301):
+            raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+        payload = self.zamg._decode(url, contents)
+        run = {
+            "reference_time": payload.get("reference_time"),
+            "timestamps": payload["timestamps"],
+        }
+        fetched = time.monotonic()
+        entries = {}
+        for point, feature in zip(points, payload["features"]):
+            key = (dataset.name, point)
+            self._forecasts.pop(key, None)
+            self._forecasts[key] = entries[point] = (
+                fetched,
+                frozenset(parameters),
+                run,
+                feature,
+            )
+        while len(self._forecasts) > self.max_forecast_points:
+            del self._forecasts[next(iter(self._forecasts))]
+        return entries
+
+    async def closest_stations(
+        self, lat: float, lon: float, count: int = 1
+    ) -> list[dict]:
+        """Return the count closest stations to (lat, lon)."""
+        await self.metadata(self.zamg.dataset_metadata_url)
+        registry = self.zamg.station_registry
+        return [
+            {
+                "id": registry.ids[idx],
+                "name": registry.names[idx],
+                "state": registry.states[idx],
+                "lat": registry.lat[idx],
+                "lon": registry.lon[idx],
+                "altitude": registry.altitude[idx],
+            }
+            for idx in registry.nearest_order(lat, lon)[:count]
+        ]
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        try:
+            response = await handler(request)
+        except (ValueError, KeyError) as exc:
+            return web.json_response({"error": str(exc)}, status=400)
+        except (ZamgError, ClientError, asyncio.TimeoutError) as exc:
+            return web.json_response({"error": str(exc)}, status=502)
+        etag = f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return response
+
+    @staticmethod
+    def _respond(payload: dict | bytes) -> web.Response:
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        return web.Response(body=payload, content_type="application/json")
+
+    @staticmethod
+    def _list(request: web.Request, name: str) -> list[str]:
+        return [item for item in request.query.get(name, "").split(",") if item]
+
+    def _dataset(self, request: web.Request) -> ZamgDataset:
+        dataset = self.datasets().get(request.match_info["dataset"])
+        if dataset is None:
+            raise web.HTTPNotFound()
+        return dataset
+
+    async def _station_metadata(self, _request: web.Request) -> web.Response:
+        return self._respond(await self.metadata(self.zamg.dataset_metadata_url))
+
+    async def _station_data(self, request: web.Request) -> web.Response:
+        station_ids = self._list(request, "station_ids")
+        if not station_ids:
+            raise ValueError("station_ids is missing")
+        return self._respond(
+            await self.observations(
+                station_ids, self._list(request, "parameters") or None
+            )
+        )
+
+    async def _closest_stations(self, request: web.Request) -> web.Response:
+        return self._respond(
+            {
+                "stations": await self.closest_stations(
+                    float(request.query["lat"]),
+                    float(request.query["lon"]),
+                    int(request.query.get("count", 1)),
+                )
+            }
+        )
+
+    async def _forecast_metadata(self, request: web.Request) -> web.Response:
+        return self._respond(await self.metadata(self._dataset(request).metadata_url))
+
+    async def _forecast_data(self, request: web.Request) -> web.Response:
+        points = [
+            normalize_point(point) for point in request.query.getall("lat_lon", [])
+        ]
+        if not points:
+            raise ValueError("lat_lon is missing")
+        return self._respond(
+            await self.forecast(
+                self._dataset(request), points, self._list(request, "parameters")
+            )
+        )
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the serve arguments to parser."""
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--observation-max-age", type=float, default=60.0)
+    parser.add_argument("--metadata-max-age", type=float, default=3600.0)
+    parser.add_argument("--max-forecast-points", type=int, default=10000)
+
+
+def run(zamg: ZamgData, args: argparse.Namespace) -> None:
+    """Serve a ZamgProxy sending its upstream requests with zamg until stopped."""
+    proxy = ZamgProxy(
+        zamg,
+        args.observation_max_age,
+        args.metadata_max_age,
+        max_forecast_points=args.max_forecast_points,
+    )
+
+    async def _cleanup(_app: web.Application) -> None:
+        await zamg.__aexit__(None, None, None)
+
+    app = proxy.app()
+    app.on_cleanup.append(_cleanup)
+    web.run_app(app, host=args.host, port=args.port)
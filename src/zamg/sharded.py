@@ -0,0 +1,357 @@
+"""Forecasts of very large point sets fetched by a pool of worker processes.
+
+Parsing forecast payloads and deriving rain and wind speed is CPU bound,
+so one event loop is saturated long before the network. A
+ShardedForecaster partitions the points into shards, which worker
+processes fetch with their own session and their share of the rate
+limit. The workers return raw array buffers, which are merged into one
+column wise ShardedForecast:
+
+    with ShardedForecaster(workers=8, rate=20.0) as forecaster:
+        forecast = await forecaster.forecast(points)
+    temperatures = forecast.window(0).data["t2m"]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import multiprocessing
+import multiprocessing.util
+import os
+import time
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+
+from .datasets import NWP_FORECAST, ZamgDataset
+from .exceptions import ZamgApiError, ZamgError
+from .ratelimit import RateLimiter
+from .series import SeriesWindow
+from .zamg import ZamgData
+
+SHARDS_PER_WORKER = 4
+"""Shards per worker, smaller shards balance the load of the workers."""
+
+_worker: _Worker | None = None
+"""State of a worker process, created by its initializer."""
+
+
+class ShardedForecast:
+    """Forecasts of many points from now onward, stored column wise.
+
+    values[parameter] holds len(epochs) values per point in the order of
+    points, the forecast of point n starts at n * len(epochs). Values of
+    points whose request failed are NaN, these points are listed in failed.
+    """
+
+    def __init__(
+        self,
+        points: list[str],
+        epochs: array,
+        values: dict[str, array],
+        failed: list[str],
+    ):
+        """Initialize the forecast."""
+        self.points = points
+        self.epochs = epochs
+        self.values = values
+        self.failed = failed
+
+    def __len__(self) -> int:
+        """Return the number of points."""
+        return len(self.points)
+
+    def window(self, index: int) -> SeriesWindow:
+        """Return the forecast of the point at index, without copying."""
+        steps = len(self.epochs)
+        start = index * steps
+        return SeriesWindow(
+            memoryview(self.epochs),
+            {
+                name: memoryview(values)[start : start + steps]
+                for name, values in self.values.items()
+            },
+        )
+
+
+class _Worker:
+    """Event loop and client of a worker process."""
+
+    def __init__(self, rate: float | None, max_retries: int, request_timeout: float):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.zamg = ZamgData()
+        self.zamg.max_retries = max_retries
+        self.zamg.request_timeout = request_timeout
+        if rate is not None:
+            self.zamg.rate_limiter = RateLimiter(rate, burst=max(1, math.ceil(rate)))
+
+    async def _fetch(
+        self,
+        points: list[str],
+        dataset: ZamgDataset,
+        parameters: str,
+        start: int,
+    ) -> tuple[bytes, dict[str, bytes]]:
+        """Return the epochs and value buffers of points from start onward."""
+        # pylint: disable=protected-access
+        zamg = self.zamg
+        url = (
+            dataset.data_url
+            + parameters
+            + "".join(f"&lat_lon={point}" for point in points)
+        )
+        status, contents = await zamg._get(url)
+        if status not in (200, 301):
+            raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+        payload = zamg._decode(url, contents)
+        if len(payload.get("features", ())) != len(points):
+            raise ZamgApiError("Got a forecast of other points")
+        epochs = None
+        columns: dict[str, array] = {}
+        try:
+            for feature in range(len(points)):
+                series = zamg._forecast_series(dataset, payload, feature)
+                index, _ = series.bounds(start)
+                if epochs is None:
+                    epochs = series.epochs[index:]
+                    columns = {name: array("d") for name in series.columns}
+                # the values of all points are stored with one stride
+                if series.columns.keys() != columns.keys() or any(
+                    len(column) - index != len(epochs)
+                    for column in series.columns.values()
+                ):
+                    raise ZamgApiError("Got forecasts of different layouts")
+                for name, column in series.columns.items():
+                    columns[name].extend(column[index:])
+        finally:
+            zamg._series_cache.clear()
+        return epochs.tobytes(), {
+            name: column.tobytes() for name, column in columns.items()
+        }
+
+    async def shard(
+        self,
+        points: list[str],
+        dataset: ZamgDataset,
+        parameters: str,
+        start: int,
+        points_per_request: int,
+        concurrency: int,
+    ) -> tuple[list[tuple], list[str]]:
+        """Fetch a shard in requests of points_per_request points.
+
+        Return the blocks (offset, count, epochs, columns) of the successful
+        requests and the points of the failed ones.
+        """
+        from aiohttp import ClientError  # pylint: disable=import-outside-toplevel
+
+        semaphore = asyncio.Semaphore(concurrency)
+        blocks: list[tuple] = []
+        failed: list[str] = []
+
+        async def _request(offset: int) -> None:
+            chunk = points[offset : offset + points_per_request]
+            async with semaphore:
+                try:
+                    epochs, columns = await self._fetch(
+                        chunk, dataset, parameters, start
+                    )
+                except (
+                    ZamgError,
+                    ClientError,
+                    OSError,
+                    asyncio.TimeoutError,
+                    ValueError,
+                ):
+                    failed.extend(chunk)
+                    return
+            blocks.append((offset, len(chunk), epochs, columns))
+
+        await asyncio.gather(
+            *(_request(offset) for offset in range(0, len(points), points_per_request))
+        )
+        return blocks, failed
+
+    def close(self) -> None:
+        """Close the session and the event loop."""
+        try:
+            self.loop.run_until_complete(self.zamg.__aexit__(None, None, None))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+
+
+def _init_worker(rate: float | None, max_retries: int, request_timeout: float) -> None:
+    global _worker  # pylint: disable=global-statement
+    _worker = _Worker(rate, max_retries, request_timeout)
+    # pool workers leave with os._exit(), which skips atexit handlers
+    multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker() -> None:
+    global _worker  # pylint: disable=global-statement
+    worker, _worker = _worker, None
+    if worker is not None:
+        worker.close()
+
+
+def _run_shard(*args) -> tuple[list[tuple], list[str]]:
+    return _worker.loop.run_until_complete(_worker.shard(*args))
+
+
+class ShardedForecaster:
+    """Fetches the forecasts of many points with a pool of worker processes.
+
+    Every worker has its own session and a rate limiter of rate / workers
+    requests per second, so together they stay within rate. Each request
+    asks for points_per_request points, a worker runs up to concurrency
+    requests at a time. Default workers is the number of CPUs.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        rate: float | None = None,
+        api_url: str | None = None,
+        points_per_request: int = 50,
+        concurrency: int = 4,
+        max_retries: int = 2,
+        request_timeout: float = ZamgData.request_timeout,
+        start_method: str = "spawn",
+    ):
+        """Initialize the forecaster, the workers are started on first use."""
+        if points_per_request < 1:
+            raise ValueError("points_per_request must be at least 1")
+        self.workers = workers or os.cpu_count() or 1
+        self.rate = rate
+        self.api_url = api_url
+        self.points_per_request = points_per_request
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.start_method = start_method
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker,
+                initargs=(
+                    None if self.rate is None else self.rate / self.workers,
+                    self.max_retries,
+                    self.request_timeout,
+                ),
+            )
+        return self._pool
+
+    def _shards(self, count: int) -> list[tuple[int, int]]:
+        """Return (start, end) of the shards of count points."""
+        size = math.ceil(count / (self.workers * SHARDS_PER_WORKER))
+        size = math.ceil(max(size, 1) / self.points_per_request) * (
+            self.points_per_request
+        )
+        return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+    async def forecast(
+        self,
+        points: Sequence[str],
+        dataset: ZamgDataset | None = None,
+        parameters: Sequence[str] | None = None,
+    ) -> ShardedForecast:
+        """Return the forecasts of "lat,lon" points from now onward.
+
+        Default dataset is NWP_FORECAST, default parameters are the ones of
+        the dataset. Duplicate points are fetched once.
+        """
+        dataset = dataset or NWP_FORECAST
+        if self.api_url is not None:
+            dataset = replace(dataset, api_url=self.api_url)
+        parameter_list = ",".join(parameters or dataset.default_parameters)
+        points = list(points)
+        unique = list(dict.fromkeys(points))
+        start = int(time.time()) // 60 * 60
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        shards = self._shards(len(unique))
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool,
+                    _run_shard,
+                    unique[first:last],
+                    dataset,
+                    parameter_list,
+                    start,
+                    self.points_per_request,
+                    self.concurrency,
+                )
+                for first, last in shards
+            )
+        )
+        return self._merge(points, unique, shards, results)
+
+    @staticmethod
+    def _merge(
+        points: list[str],
+        unique: list[str],
+        shards: list[tuple[int, int]],
+        results: list[tuple[list[tuple], list[str]]],
+    ) -> ShardedForecast:
+        """Merge the blocks of the shards into one forecast of points."""
+        blocks = [
+            (first + offset, count, array("q", epochs), columns)
+            for (first, _), (shard_blocks, _) in zip(shards, results)
+            for offset, count, epochs, columns in shard_blocks
+        ]
+        failed = [point for _, shard_failed in results for point in shard_failed]
+        # the blocks differ only if a model run was published meanwhile
+        epochs = array("q", sorted({epoch for block in blocks for epoch in block[2]}))
+        steps = len(epochs)
+        names = list(dict.fromkeys(name for block in blocks for name in block[3]))
+        values = {
+            name: array("d", [math.nan]) * (len(unique) * steps) for name in names
+        }
+        positions = {epoch: idx for idx, epoch in enumerate(epochs)}
+        for offset, count, block_epochs, columns in blocks:
+            for name, buffer in columns.items():
+                column = array("d")
+                column.frombytes(buffer)
+                target = values[name]
+                if block_epochs == epochs:
+                    target[offset * steps : (offset + count) * steps] = column
+                    continue
+                block_steps = len(block_epochs)
+                for row in range(count):
+                    base = (offset + row) * steps
+                    for step, epoch in enumerate(block_epochs):
+                        target[base + positions[epoch]] = column[
+                            row * block_steps + step
+                        ]
+        if len(unique) != len(points):
+            rows = {point: idx for idx, point in enumerate(unique)}
+            for name, column in values.items():
+                ordered = array("d")
+                for point in points:
+                    row = rows[point] * steps
+                    ordered.extend(column[row : row + steps])
+                values[name] = ordered
+        return ShardedForecast(points, epochs, values, failed)
+
+    def close(self) -> None:
+        """Stop the worker processes, they close their sessions on exit."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> ShardedForecaster:
+        """Enter the context, the workers are stopped on exit."""
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        """Stop the worker processes."""
+        self.close()
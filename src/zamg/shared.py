@@ -0,0 +1,496 @@
+"""Observation and forecast snapshots shared between processes.
+
+One process fetches and publishes its ZamgData state into a shared memory
+segment, any number of other processes read it through SharedZamgData
+without network I/O of their own:
+
+    publisher = SharedSnapshotPublisher(zamg, "zamg")
+    await zamg.update_stations(station_ids)
+    publisher.publish()
+
+    reader = SharedZamgData("zamg", "11240")
+    await reader.update()
+    reader.get_data("TL")
+
+Segment layout (little endian), version LAYOUT_VERSION:
+
+    header  HEADER_SIZE bytes: magic, layout version, active slot,
+            sequence, slot size
+    slot 0  slot size bytes
+    slot 1  slot size bytes
+
+A slot holds the JSON length and the float64 value count (two uint64),
+the JSON index (stations, station registry, parameters, timestamps,
+forecast axes), padding to 8 bytes and the float64 values. Observations
+are a stations x parameters matrix, every forecast a points x parameters
+x steps block; missing values are NaN.
+
+The sequence (native uint64, written with a single 8 byte store instead of
+struct, which clears the bytes first) is a seqlock: publishing generation
+n sets it to 2n - 1, writes slot n % 2 and sets it to 2n. Readers copy
+the slot of the last complete generation out of the segment and check the
+sequence again. The copy is only discarded if the publisher has meanwhile
+started to write the same slot again, i.e. after two further publishes.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Iterator, Mapping
+from multiprocessing import shared_memory
+
+from .datasets import ZamgDataset
+from .deadline import bounded
+from .exceptions import ZamgApiError, ZamgNoDataError
+from .stations import StationRegistry
+from .zamg import ZamgData
+
+MAGIC = b"ZAMGSNAP"
+LAYOUT_VERSION = 3
+HEADER = struct.Struct("<8sHHxxxxQQ")
+"""magic, layout version, active slot, sequence, slot size."""
+SEQUENCE_OFFSET = 16
+"""Offset of the sequence in the header."""
+ACTIVE_SLOT = struct.Struct("<H")
+ACTIVE_SLOT_OFFSET = 10
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct("<QQ")
+"""JSON index length, number of float64 values."""
+DEFAULT_SIZE = 16 * 1024 * 1024
+"""Default segment size in bytes, holds two snapshots."""
+READ_ATTEMPTS = 100
+"""Reads of a snapshot before a reader gives up on a too busy publisher."""
+
+_published: set[str] = set()
+"""Names of the segments created by publishers of this process."""
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _sequence(buf: memoryview) -> memoryview:
+    """Return the sequence of a segment as a one element uint64 view."""
+    return buf[SEQUENCE_OFFSET : SEQUENCE_OFFSET + 8].cast("Q")
+
+
+def _to_float(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+
+def _to_value(value: float) -> float | None:
+    return None if value != value else value
+
+
+class SharedSnapshotPublisher:
+    """Publishes the state of a ZamgData instance to shared memory.
+
+    Publishes the current observations of all stations in zamg.data, the
+    station metadata and the last fetched payload of every forecast dataset.
+    """
+
+    def __init__(
+        self, zamg: ZamgData, name: str | None = None, size: int = DEFAULT_SIZE
+    ):
+        """Create the shared memory segment, name is chosen if None."""
+        self.zamg = zamg
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.slot_size = (self._shm.size - HEADER_SIZE) // 2 & ~7
+        self.generation = 0
+        _published.add(self._shm.name)
+        HEADER.pack_into(self._shm.buf, 0, MAGIC, LAYOUT_VERSION, 0, 0, self.slot_size)
+        self._sequence = _sequence(self._shm.buf)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the segment to pass to readers."""
+        return self._shm.name
+
+    def _encode(self) -> tuple[bytes, array]:
+        """Return the JSON index and values of the current state."""
+        # pylint: disable=protected-access
+        zamg = self.zamg
+        station_ids = list(zamg.data)
+        parameters: dict[str, tuple[str, str]] = {}
+        for observations in zamg.data.values():
+            for parameter, values in observations.items():
+                if parameter not in parameters:
+                    parameters[parameter] = (
+                        values.get("name", parameter),
+                        values.get("unit", ""),
+                    )
+        values = array("d")
+        for station_id in station_ids:
+            observations = zamg.data[station_id]
+            values.extend(
+                _to_float(observations.get(parameter, {}).get("data"))
+                for parameter in parameters
+            )
+
+        forecasts = {}
+        for dataset_name, payload in zamg._forecasts.items():
+            if not payload:
+                continue
+            features = payload["features"]
+            forecast_parameters: dict[str, tuple[str, str]] = {}
+            for feature in features:
+                for parameter, data in feature["properties"]["parameters"].items():
+                    forecast_parameters.setdefault(
+                        parameter, (data.get("name", parameter), data.get("unit", ""))
+                    )
+            steps = len(payload["timestamps"])
+            forecasts[dataset_name] = {
+                "offset": len(values),
+                "reference_time": payload.get("reference_time"),
+                "fetched": zamg._forecast_timestamps.get(dataset_name),
+                "timestamps": payload["timestamps"],
+                "coordinates": [
+                    feature.get("geometry", {}).get("coordinates")
+                    for feature in features
+                ],
+                "parameters": [
+                    [key, *meta] for key, meta in forecast_parameters.items()
+                ],
+            }
+            for feature in features:
+                feature_parameters = feature["properties"]["parameters"]
+                for parameter in forecast_parameters:
+                    data = feature_parameters.get(parameter, {}).get("data", ())
+                    values.extend(_to_float(value) for value in data[:steps])
+                    values.extend([math.nan] * (steps - min(len(data), steps)))
+
+        registry = zamg._registry
+        index = {
+            "published": time.time(),
+            "timestamp": zamg._timestamp,
+            "station_parameters": zamg.station_parameters,
+            "all_station_parameters": zamg._all_station_parameters,
+            "stations": zamg._stations,
+            "registry": (
+                None
+                if registry is None
+                else {
+                    "ids": registry.ids,
+                    "names": registry.names,
+                    "states": registry.states,
+                    **{
+                        key: [_to_value(value) for value in getattr(registry, key)]
+                        for key in ("lat", "lon", "altitude")
+                    },
+                }
+            ),
+            "station_ids": station_ids,
+            "timestamps": [
+                zamg._timestamps.get(station_id) for station_id in station_ids
+            ],
+            "parameters": [[key, *meta] for key, meta in parameters.items()],
+            "forecasts": forecasts,
+        }
+        return json.dumps(index, separators=(",", ":")).encode(), values
+
+    def publish(self) -> int:
+        """Write the current state into the inactive slot and activate it.
+
+        Return the new generation. Raise ValueError if the snapshot does
+        not fit into a slot.
+        """
+        encoded, values = self._encode()
+        values_offset = _align(SLOT_HEADER.size + len(encoded))
+        needed = values_offset + len(values) * values.itemsize
+        if needed > self.slot_size:
+            raise ValueError(
+                f"Snapshot needs {needed} bytes, slot size is {self.slot_size}"
+            )
+        buf = self._shm.buf
+        generation = self.generation + 1
+        slot = generation % 2
+        self._sequence[0] = 2 * generation - 1
+        start = HEADER_SIZE + slot * self.slot_size
+        SLOT_HEADER.pack_into(buf, start, len(encoded), len(values))
+        buf[start + SLOT_HEADER.size : start + SLOT_HEADER.size + len(encoded)] = (
+            encoded
+        )
+        buf[start + values_offset : start + needed] = values.tobytes()
+        ACTIVE_SLOT.pack_into(buf, ACTIVE_SLOT_OFFSET, slot)
+        self._sequence[0] = 2 * generation
+        self.generation = generation
+        return generation
+
+    def close(self, unlink: bool = True) -> None:
+        """Close the segment and remove it if unlink is set."""
+        self._sequence.release()
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+            _published.discard(self._shm.name)
+
+    def __enter__(self) -> SharedSnapshotPublisher:
+        """Enter, returns the publisher."""
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        """Exit, closes and removes the segment."""
+        self.close()
+
+
+class _Observations(Mapping):
+    """Read-only {station_id: {parameter: {name, unit, data}}} view."""
+
+    def __init__(self, reader: SharedZamgData):
+        self._reader = reader
+
+    def __getitem__(self, station_id: str) -> Mapping:
+        reader = self._reader
+        row = reader._rows[station_id]  # pylint: disable=protected-access
+        width = len(reader._parameters)  # pylint: disable=protected-access
+        values = reader._values  # pylint: disable=protected-access
+        return {
+            parameter: {
+                "name": name,
+                "unit": unit,
+                "data": _to_value(values[row * width + col]),
+            }
+            for col, (parameter, name, unit) in enumerate(
+                reader._parameters  # pylint: disable=protected-access
+            )
+        }
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._reader._rows)  # pylint: disable=protected-access
+
+    def __len__(self) -> int:
+        return len(self._reader._rows)  # pylint: disable=protected-access
+
+
+class SharedZamgData(ZamgData):
+    """ZamgData reading a snapshot published by SharedSnapshotPublisher.
+
+    Every accessor serves the latest published snapshot. Each new snapshot
+    is copied out of the shared memory once, so the values and forecast
+    views handed out stay unchanged by later publishes. No request is ever
+    sent.
+    """
+
+    def __init__(self, name: str, default_station_id: str = ""):
+        """Attach to the segment of a publisher."""
+        super().__init__(default_station_id)
+        self._shm = shared_memory.SharedMemory(name=name)
+        if sys.version_info < (3, 13) and self._shm.name not in _published:
+            # attaching registers the segment, which would remove it at exit
+            from multiprocessing import (  # pylint: disable=import-outside-toplevel
+                resource_tracker,
+            )
+
+            resource_tracker.unregister(
+                self._shm._name, "shared_memory"  # pylint: disable=protected-access
+            )
+        magic, version, *_ = HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION:
+            self._shm.close()
+            raise ZamgNoDataError(
+                f"{name} is no zamg snapshot of version {LAYOUT_VERSION}"
+            )
+        self._sequence = _sequence(self._shm.buf)
+        self.generation = 0
+        self.published: float | None = None
+        self._values = array("d")
+        self._rows: dict[str, int] = {}
+        self._parameters: list[tuple[str, str, str]] = []
+        self._published_registry: dict | None = None
+        """Registry of the current snapshot as published, to detect changes."""
+        self.data = _Observations(self)
+
+    def _read(self) -> tuple[int, bytes, array] | None:
+        """Copy the last complete snapshot out of the segment.
+
+        Return (generation, JSON index, values), None if the generation is
+        the current one. Raise ZamgNoDataError if nothing is published yet
+        or the publisher rewrote the slot during every read attempt.
+        """
+        buf = self._shm.buf
+        slot_size = HEADER.unpack_from(buf, 0)[4]
+        for _ in range(READ_ATTEMPTS):
+            sequence = self._sequence[0]
+            generation = sequence // 2
+            if generation == 0:
+                raise ZamgNoDataError("Nothing published yet")
+            if generation == self.generation:
+                return None
+            start = HEADER_SIZE + generation % 2 * slot_size
+            index_size, count = SLOT_HEADER.unpack_from(buf, start)
+            values_start = start + _align(SLOT_HEADER.size + index_size)
+            values_end = values_start + count * 8
+            if values_end <= start + slot_size:
+                index_start = start + SLOT_HEADER.size
+                encoded = bytes(buf[index_start : index_start + index_size])
+                values = array("d")
+                values.frombytes(buf[values_start:values_end])
+                # the slot is written again from sequence 2 * generation + 3 on
+                sequence = self._sequence[0]
+                if sequence < 2 * generation + 3:
+                    return generation, encoded, values
+            time.sleep(0)
+        raise ZamgNoDataError("Snapshot was rewritten during every read")
+
+    def refresh(self) -> bool:
+        """Switch to the latest published snapshot, return True if it changed."""
+        snapshot = self._read()
+        if snapshot is None:
+            return False
+        generation, encoded, self._values = snapshot
+        index = json.loads(encoded)
+
+        self.generation = generation
+        self.published = index["published"]
+        self._timestamp = index["timestamp"]
+        self.station_parameters = index["station_parameters"]
+        self._all_station_parameters = index["all_station_parameters"]
+        if index["stations"] is not None:
+            self._stations = {
+                station_id: tuple(station)
+                for station_id, station in index["stations"].items()
+            }
+        if index["registry"] != self._published_registry:
+            self._published_registry = index["registry"]
+            self._registry = self._restore_registry(index["registry"])
+        self._rows = {
+            station_id: row for row, station_id in enumerate(index["station_ids"])
+        }
+        self._parameters = [tuple(parameter) for parameter in index["parameters"]]
+        self._timestamps = {
+            station_id: timestamp
+            for station_id, timestamp in zip(index["station_ids"], index["timestamps"])
+            if timestamp is not None
+        }
+        self._forecasts = {}
+        self._forecast_timestamps = {}
+        for dataset_name, forecast in index["forecasts"].items():
+            self._forecasts[dataset_name] = self._forecast_payload(forecast)
+            self._forecast_timestamps[dataset_name] = forecast["fetched"]
+        self._series_cache.clear()
+        return True
+
+    @staticmethod
+    def _restore_registry(stored: dict | None) -> StationRegistry | None:
+        """Return the registry of a snapshot, None if it has none."""
+        if stored is None:
+            return None
+        return StationRegistry(
+            [
+                {
+                    "id": station_id,
+                    "name": name,
+                    "state": state,
+                    "lat": lat,
+                    "lon": lon,
+                    "altitude": altitude,
+                }
+                for station_id, name, state, lat, lon, altitude in zip(
+                    stored["ids"],
+                    stored["names"],
+                    stored["states"],
+                    stored["lat"],
+                    stored["lon"],
+                    stored["altitude"],
+                )
+            ]
+        )
+
+    def _forecast_payload(self, forecast: dict) -> dict:
+        """Return a forecast payload whose data are views on the values."""
+        steps = len(forecast["timestamps"])
+        offset = forecast["offset"]
+        values = memoryview(self._values)
+        features = []
+        for coordinates in forecast["coordinates"]:
+            parameters = {}
+            for parameter, name, unit in forecast["parameters"]:
+                parameters[parameter] = {
+                    "name": name,
+                    "unit": unit,
+                    "data": values[offset : offset + steps],
+                }
+                offset += steps
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": coordinates},
+                    "properties": {"parameters": parameters},
+                }
+            )
+        return {
+            "reference_time": forecast["reference_time"],
+            "timestamps": forecast["timestamps"],
+            "features": features,
+        }
+
+    async def _get(self, url: str, revalidate: bool = False) -> tuple[int, bytes]:
+        raise ZamgApiError(f"Shared snapshot readers do not fetch {url}")
+
+    @bounded
+    async def zamg_stations(self) -> dict[str:(float, float, str)]:
+        """Return the published station metadata."""
+        self.refresh()
+        return self._stations
+
+    def get_data(self, parameter: str, data_type: str = "data") -> str | None:
+        """Get a specific data entry of the latest snapshot, see ZamgData."""
+        self.refresh()
+        return super().get_data(parameter, data_type)
+
+    @bounded
+    async def update(self) -> Mapping:
+        """Switch to the latest snapshot and return the observations."""
+        self.refresh()
+        return self.data
+
+    @bounded
+    async def update_stations(self, station_ids: list[str]) -> Mapping:
+        """Switch to the latest snapshot and return the observations."""
+        self.refresh()
+        return self.data
+
+    @bounded
+    async def get_forecast(
+        self,
+        lat_lon: str | list[str] | None = None,
+        current_only: bool = False,
+        dataset: ZamgDataset | None = None,
+    ) -> dict | None:
+        """Return the published forecast from now onward.
+
+        Only the published locations are available, lat_lon is ignored.
+        Values are floats, missing values are None.
+        """
+        self.refresh()
+        dataset = dataset or self.forecast_dataset
+        if not self._forecasts.get(dataset.name):
+            raise ZamgNoDataError(f"No forecast of {dataset.name} published")
+        if current_only:
+            result = self.get_forecast_current(dataset=dataset)
+            return {
+                key: _to_value(value) if isinstance(value, float) else value
+                for key, value in result.items()
+            }
+        result = self._get_forecast_from_now(dataset=dataset)
+        for feature in result["features"]:
+            for values in feature["properties"]["parameters"].values():
+                values["data"] = [_to_value(value) for value in values["data"]]
+        return result
+
+    def close(self) -> None:
+        """Detach from the segment."""
+        self._forecasts = {}
+        self._series_cache.clear()
+        self._values = array("d")
+        self._sequence.release()
+        self._shm.close()
+
+    async def __aexit__(self, *_exc_info) -> None:
+        """Async exit, detaches from the segment."""
+        self.close()
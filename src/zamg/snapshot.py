@@ -0,0 +1,304 @@
+"""Multi-station observation snapshot with aggregate queries."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
+
+from . import columnar
+from .exceptions import ZamgNoDataError
+from .interpolate import StationInterpolator
+from .stations import Polygon, StationRegistry
+
+REDUCTIONS = ("min", "max", "mean", "sum", "count")
+"""Possible reductions for StationSnapshot.aggregate()."""
+
+
+class StationSnapshot:
+    """Current observations of many stations stored column wise.
+
+    Every parameter is an array("d") in the order of the station registry,
+    stations without a value are NaN. With numpy installed the queries run
+    as numpy kernels over these buffers, otherwise as one Python loop over
+    the column.
+    """
+
+    def __init__(
+        self,
+        registry: StationRegistry,
+        columns: dict[str, array],
+        timestamps: dict[str, str] | None = None,
+    ):
+        """Initialize the snapshot."""
+        self.registry = registry
+        self.columns = columns
+        self.timestamps = timestamps or {}
+        self._availability: dict[str, int] = {}
+
+    @classmethod
+    def from_data(
+        cls,
+        registry: StationRegistry,
+        data: Mapping[str, Mapping[str, Mapping]],
+        parameters: Iterable[str] | None = None,
+        timestamps: dict[str, str] | None = None,
+    ) -> StationSnapshot:
+        """Build a snapshot out of ZamgData.data.
+
+        Stations which are not part of the registry are ignored.
+        """
+        if parameters is None:
+            parameters = dict.fromkeys(
+                parameter for values in data.values() for parameter in values
+            )
+        columns = {
+            parameter: array("d", [math.nan]) * len(registry)
+            for parameter in parameters
+        }
+        for station_id, values in data.items():
+            idx = registry.index.get(station_id)
+            if idx is None:
+                continue
+            for parameter, column in columns.items():
+                value = values.get(parameter, {}).get("data")
+                if isinstance(value, (int, float)):
+                    column[idx] = value
+        return cls(registry, columns, timestamps)
+
+    def values(self, parameter: str) -> array:
+        """Return the column of a parameter."""
+        try:
+            return self.columns[parameter]
+        except KeyError as exc:
+            raise ZamgNoDataError(exc) from exc
+
+    def aggregate(
+        self,
+        parameter: str,
+        by: str | Mapping[str, Polygon] | None = None,
+        reductions: Iterable[str] = REDUCTIONS,
+    ) -> dict[str, dict[str, float | int | None]]:
+        """Return {group: {reduction: value}} of a parameter.
+
+        All groups and reductions are computed in one pass over the column.
+        by is None for all stations, "state" or {name: polygon}, see
+        StationRegistry.groups(). Groups without any value are omitted.
+        """
+        reductions = tuple(reductions)
+        for reduction in reductions:
+            if reduction not in REDUCTIONS:
+                raise ValueError(f"Unknown reduction {reduction}")
+        column = self.values(parameter)
+        names, codes = self.registry.groups(by)
+        size = len(names)
+        numpy = columnar.optional_numpy()
+        if numpy is not None:
+            counts, sums, minima, maxima = _reduce_numpy(numpy, codes, column, size)
+        else:
+            counts, sums, minima, maxima = _reduce(codes, column, size)
+
+        result = {}
+        for code, name in enumerate(names):
+            count = counts[code]
+            if not count:
+                continue
+            values = {
+                "min": minima[code],
+                "max": maxima[code],
+                "mean": sums[code] / count,
+                "sum": sums[code],
+                "count": count,
+            }
+            result[name] = {reduction: values[reduction] for reduction in reductions}
+        return result
+
+    def count_above(
+        self,
+        parameter: str,
+        threshold: float,
+        by: str | Mapping[str, Polygon] | None = None,
+    ) -> dict[str, int]:
+        """Return {group: number of stations with a value above threshold}."""
+        column = self.values(parameter)
+        names, codes = self.registry.groups(by)
+        numpy = columnar.optional_numpy()
+        if numpy is not None:
+            group = _codes(numpy, codes)
+            above = group[(group >= 0) & (_float64(numpy, column) > threshold)]
+            counts = numpy.bincount(above, minlength=len(names)).tolist()
+        else:
+            counts = array("q", [0]) * len(names)
+            for code, value in zip(codes, column):
+                if code >= 0 and value > threshold:
+                    counts[code] += 1
+        return dict(zip(names, counts))
+
+    def top(
+        self, parameter: str, k: int = 10, largest: bool = True
+    ) -> list[tuple[str, float]]:
+        """Return the k stations with the largest (or smallest) values.
+
+        Result is a list of (station_id, value), stations without value are
+        skipped.
+        """
+        column = self.values(parameter)
+        select = heapq.nlargest if largest else heapq.nsmallest
+        numpy = columnar.optional_numpy()
+        if numpy is not None:
+            values = _float64(numpy, column)
+            indices = numpy.flatnonzero(values == values)
+            if 0 < k < len(indices):
+                # only values up to the k-th one (and its ties) are candidates
+                valid = values[indices]
+                if largest:
+                    kth = numpy.partition(valid, len(valid) - k)[len(valid) - k]
+                    indices = indices[valid >= kth]
+                else:
+                    kth = numpy.partition(valid, k - 1)[k - 1]
+                    indices = indices[valid <= kth]
+            candidates = zip(values[indices].tolist(), indices.tolist())
+        else:
+            candidates = (
+                (value, idx) for idx, value in enumerate(column) if value == value
+            )
+        return [(self.registry.ids[idx], value) for value, idx in select(k, candidates)]
+
+    def availability(self, parameter: str) -> int:
+        """Return a bitmap of stations with a value for parameter.
+
+        Bit n is set if the station at registry index n has a value.
+        """
+        bitmap = self._availability.get(parameter)
+        if bitmap is None:
+            column = self.values(parameter)
+            numpy = columnar.optional_numpy()
+            if numpy is not None:
+                values = _float64(numpy, column)
+                bits = numpy.packbits(values == values, bitorder="little")
+                bitmap = int.from_bytes(bits.tobytes(), "little")
+            else:
+                bitmap = 0
+                for idx, value in enumerate(column):
+                    if value == value:
+                        bitmap |= 1 << idx
+            self._availability[parameter] = bitmap
+        return bitmap
+
+    def resolve(
+        self, lat: float, lon: float, parameters: Iterable[str]
+    ) -> dict[str, tuple[str, float] | None]:
+        """Return the closest station with a value for every parameter.
+
+        Result is {parameter: (station_id, value)}, None if no station has a
+        value. All parameters share one distance ordering of the stations.
+        """
+        order = self.registry.nearest_order(lat, lon)
+        numpy = columnar.optional_numpy()
+        result: dict[str, tuple[str, float] | None] = {}
+        for parameter in parameters:
+            if numpy is not None:
+                result[parameter] = self._resolve_numpy(numpy, order, parameter)
+                continue
+            bitmap = self.availability(parameter) if parameter in self.columns else 0
+            result[parameter] = None
+            if not bitmap:
+                continue
+            for idx in order:
+                if bitmap >> idx & 1:
+                    result[parameter] = (
+                        self.registry.ids[idx],
+                        self.columns[parameter][idx],
+                    )
+                    break
+        return result
+
+    def _resolve_numpy(
+        self, numpy, order: array, parameter: str
+    ) -> tuple[str, float] | None:
+        """Return the first station in order with a value for parameter."""
+        column = self.columns.get(parameter)
+        if column is None:
+            return None
+        ordered = _float64(numpy, column)[_codes(numpy, order)]
+        hits = numpy.flatnonzero(ordered == ordered)
+        if not hits.size:
+            return None
+        idx = order[int(hits[0])]
+        return self.registry.ids[idx], column[idx]
+
+    def interpolate(
+        self,
+        parameter: str,
+        points: Sequence[tuple[float, float]],
+        altitudes: Sequence[float] | None = None,
+        neighbours: int = 4,
+        lapse_rate: float | None = None,
+    ) -> array:
+        """Return the inverse distance weighted values of parameter at points.
+
+        points are (lat, lon) tuples, see StationInterpolator. To evaluate
+        the same points repeatedly, keep a StationInterpolator instead; it
+        keeps the neighbours and weights.
+        """
+        return StationInterpolator(
+            self.registry, points, altitudes, neighbours
+        ).interpolate(self, parameter, lapse_rate)
+
+    def to_numpy(self) -> dict:
+        """Return NumPy arrays sharing the columns, see zamg.columnar."""
+        return columnar.snapshot_to_numpy(self)
+
+    def to_arrow(self):
+        """Return a pyarrow Table sharing the columns, see zamg.columnar."""
+        return columnar.snapshot_to_arrow(self)
+
+    def to_pandas(self):
+        """Return a pandas DataFrame, see zamg.columnar."""
+        return columnar.snapshot_to_pandas(self)
+
+
+def _float64(numpy, column: array):
+    return numpy.frombuffer(column, dtype=numpy.float64)
+
+
+def _codes(numpy, codes: array):
+    return numpy.frombuffer(codes, dtype=f"i{codes.itemsize}")
+
+
+def _reduce(codes: array, column: array, size: int) -> tuple[array, ...]:
+    """Return counts, sums, minima and maxima per group in one Python loop."""
+    counts = array("q", [0]) * size
+    sums = array("d", [0.0]) * size
+    minima = array("d", [math.inf]) * size
+    maxima = array("d", [-math.inf]) * size
+    for code, value in zip(codes, column):
+        if code < 0 or value != value:  # NaN
+            continue
+        counts[code] += 1
+        sums[code] += value
+        if value < minima[code]:
+            minima[code] = value
+        if value > maxima[code]:
+            maxima[code] = value
+    return counts, sums, minima, maxima
+
+
+def _reduce_numpy(numpy, codes: array, column: array, size: int) -> tuple[list, ...]:
+    """Return counts, sums, minima and maxima per group with numpy kernels."""
+    group = _codes(numpy, codes)
+    values = _float64(numpy, column)
+    valid = (group >= 0) & (values == values)
+    group = group[valid]
+    values = values[valid]
+    minima = numpy.full(size, math.inf)
+    maxima = numpy.full(size, -math.inf)
+    numpy.minimum.at(minima, group, values)
+    numpy.maximum.at(maxima, group, values)
+    return (
+        numpy.bincount(group, minlength=size).tolist(),
+        numpy.bincount(group, weights=values, minlength=size).tolist(),
+        minima.tolist(),
+        maxima.tolist(),
+    )
@@ -0,0 +1,429 @@
+"""Local stand-in for the GeoSphere Austria dataset API.
+
+Serves synthetic but realistically sized payloads for the station metadata,
+current station and forecast endpoints, so the client can be benchmarked
+and tested without network access.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+from .datasets import DATASETS, ZamgDataset
+
+STATES = (
+    "Burgenland",
+    "Kärnten",
+    "Niederösterreich",
+    "Oberösterreich",
+    "Salzburg",
+    "Steiermark",
+    "Tirol",
+    "Vorarlberg",
+    "Wien",
+)
+STATION_PARAMETERS = (
+    "TL",
+    "P",
+    "PRED",
+    "RFAM",
+    "FFAM",
+    "DD",
+    "FFX",
+    "DDX",
+    "SO",
+    "TLAM",
+    "RR",
+    "SCHNEE",
+    "TP",
+    "TPAM",
+)
+"""Real TAWES parameters, synthetic ones are appended to reach the count."""
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M+00:00"
+
+
+def _parameter_names(known: tuple[str, ...], count: int, prefix: str) -> list[str]:
+    names = list(known[:count])
+    names.extend(f"{prefix}{idx:03d}" for idx in range(count - len(names)))
+    return names
+
+
+def synthetic_metadata(
+    stations: int = 300, parameters: int = 200, seed: int = 0
+) -> dict:
+    """Return a tawes metadata payload with stations and parameters."""
+    rnd = random.Random(seed)
+    return {
+        "title": "TAWES",
+        "frequency": "10T",
+        "type": "station",
+        "mode": "current",
+        "parameters": [
+            {"name": name, "long_name": name, "desc": name, "unit": "1"}
+            for name in _parameter_names(STATION_PARAMETERS, parameters, "X")
+        ],
+        "stations": [
+            {
+                "type": "INDIVIDUAL",
+                "id": str(11000 + idx),
+                "name": f"STATION {idx}",
+                "state": rnd.choice(STATES),
+                "lat": round(rnd.uniform(46.4, 49.0), 5),
+                "lon": round(rnd.uniform(9.5, 17.1), 5),
+                "altitude": round(rnd.uniform(115.0, 3100.0)),
+                "is_active": True,
+            }
+            for idx in range(stations)
+        ],
+    }
+
+
+def synthetic_forecast_metadata(dataset: ZamgDataset, parameters: int = 20) -> dict:
+    """Return a grid forecast metadata payload of dataset."""
+    return {
+        "title": dataset.name,
+        "parameters": [
+            {"name": name, "long_name": name, "desc": name, "unit": "1"}
+            for name in _parameter_names(dataset.default_parameters, parameters, "f")
+        ],
+    }
+
+
+def current_timestamp(cadence: timedelta = timedelta(minutes=10)) -> datetime:
+    """Return now truncated to the cadence."""
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    step = int(cadence.total_seconds())
+    return datetime.fromtimestamp(int(now.timestamp()) // step * step, timezone.utc)
+
+
+def synthetic_observations(
+    station_ids: list[str],
+    parameters: list[str],
+    timestamp: datetime | None = None,
+    null_ratio: float = 0.1,
+    seed: int = 0,
+) -> dict:
+    """Return a tawes current payload with one feature per station."""
+    timestamp = timestamp or current_timestamp()
+    features = []
+    for station_id in station_ids:
+        rnd = random.Random(f"{seed}-{station_id}-{timestamp.timestamp()}")
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [0.0, 0.0]},
+                "properties": {
+                    "parameters": {
+                        name: {
+                            "name": name,
+                            "unit": "1",
+                            "data": [
+                                (
+                                    None
+                                    if rnd.random() < null_ratio
+                                    else round(rnd.uniform(-10.0, 40.0), 1)
+                                )
+                            ],
+                        }
+                        for name in parameters
+                    },
+                    "station": station_id,
+                },
+            }
+        )
+    return {
+        "media_type": "application/json",
+        "type": "FeatureCollection",
+        "version": "v1",
+        "timestamps": [timestamp.strftime(TIMESTAMP_FORMAT)],
+        "features": features,
+    }
+
+
+def synthetic_forecast(
+    dataset: ZamgDataset,
+    points: list[str],
+    parameters: list[str],
+    steps: int = 73,
+    reference_time: datetime | None = None,
+    seed: int = 0,
+) -> dict:
+    """Return a timeseries forecast payload with one feature per point."""
+    reference_time = reference_time or current_timestamp(dataset.cadence)
+    timestamps = [
+        (reference_time + dataset.cadence * idx).strftime(TIMESTAMP_FORMAT)
+        for idx in range(steps)
+    ]
+    features = []
+    for point in points:
+        rnd = random.Random(f"{seed}-{point}")
+        values = {}
+        for name in parameters:
+            if name == dataset.rain_parameter and dataset.rain_accumulated:
+                total = 0.0
+                data = []
+                for _ in range(steps):
+                    total += max(0.0, rnd.gauss(0.0, 0.5))
+                    data.append(round(total, 2))
+            else:
+                data = [round(rnd.uniform(-10.0, 30.0), 2) for _ in range(steps)]
+            values[name] = {"name": name, "unit": "1", "data": data}
+        lat, _, lon = point.partition(",")
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lon, lat]},
+                "properties": {"parameters": values},
+            }
+        )
+    return {
+        "media_type": "application/json",
+        "type": "FeatureCollection",
+        "version": "v1",
+        "reference_time": reference_time.strftime(TIMESTAMP_FORMAT),
+        "timestamps": timestamps,
+        "features": features,
+    }
+
+
+def synthetic_historical(
+    station_ids: list[str],
+    parameters: list[str],
+    start: datetime,
+    end: datetime,
+    step: timedelta = timedelta(minutes=10),
+    seed: int = 0,
+) -> dict:
+    """Return a historical station payload between start and end (incl.)."""
+    timestamps = []
+    timestamp = start
+    while timestamp <= end:
+        timestamps.append(timestamp)
+        timestamp += step
+    features = []
+    for station_id in station_ids:
+        values = {}
+        for name in parameters:
+            rnd = random.Random(f"{seed}-{station_id}-{name}-{start.timestamp()}")
+            values[name] = {
+                "name": name,
+                "unit": "1",
+                "data": [round(rnd.uniform(-10.0, 40.0), 1) for _ in timestamps],
+            }
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [0.0, 0.0]},
+                "properties": {"parameters": values, "station": station_id},
+            }
+        )
+    return {
+        "media_type": "application/json",
+        "type": "FeatureCollection",
+        "version": "v1",
+        "timestamps": [
+            timestamp.strftime(TIMESTAMP_FORMAT) for timestamp in timestamps
+        ],
+        "features": features,
+    }
+
+
+class StandinServer:
+    """aiohttp server imitating the GeoSphere Austria dataset API.
+
+    Every response can be delayed by latency (plus a random jitter), failed
+    with one of error_statuses at error_rate, and limited to rate_limit
+    requests per second (token bucket of burst size, answered with 429).
+    With etags, responses carry an ETag and conditional requests of an
+    unchanged resource are answered with 304.
+
+        async with StandinServer(stations=300, latency=0.05) as server:
+            zamg.set_api_url(server.api_url)
+    """
+
+    def __init__(
+        self,
+        stations: int = 300,
+        parameters: int = 200,
+        forecast_steps: int = 73,
+        seed: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses: tuple[int, ...] = (500, 502, 503),
+        rate_limit: float | None = None,
+        burst: int = 10,
+        etags: bool = True,
+    ):
+        """Initialize the server and its synthetic metadata."""
+        self.metadata = synthetic_metadata(stations, parameters, seed)
+        self.forecast_steps = forecast_steps
+        self.seed = seed
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.etags = etags
+        self.api_url = ""
+        self.requests = 0
+        self.statuses: Counter[int] = Counter()
+        self._random = random.Random(seed)
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._runner: web.AppRunner | None = None
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application with all routes."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get(
+            "/v1/station/current/tawes-v1-10min/metadata", self._station_metadata
+        )
+        app.router.add_get("/v1/station/current/tawes-v1-10min", self._station_data)
+        app.router.add_get("/v1/station/historical/{resource}", self._historical_data)
+        app.router.add_get(
+            "/v1/grid/forecast/{dataset}/metadata", self._forecast_metadata
+        )
+        app.router.add_get("/v1/timeseries/forecast/{dataset}", self._forecast_data)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the api url to use with set_api_url()."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.api_url = f"http://{host}:{self._runner.addresses[0][1]}/v1"
+        return self.api_url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> StandinServer:
+        """Async enter, starts the server on a free port."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        """Async exit, stops the server."""
+        await self.stop()
+
+    def _take_token(self) -> bool:
+        """Return False if the rate limit is exceeded."""
+        if self.rate_limit is None:
+            return True
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._refilled) * self.rate_limit
+        )
+        self._refilled = now
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler) -> web.StreamResponse:
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._random.uniform(0.0, self.jitter))
+        if not self._take_token():
+            response: web.StreamResponse = web.Response(
+                status=429,
+                text="rate limit exceeded",
+                headers={"Retry-After": str(max(1, round(1 / self.rate_limit)))},
+            )
+        elif self.error_rate and self._random.random() < self.error_rate:
+            response = web.Response(
+                status=self._random.choice(self.error_statuses), text="error"
+            )
+        else:
+            try:
+                response = await handler(request)
+            except web.HTTPException as exc:
+                response = exc
+            if self.etags and response.status == 200:
+                response = self._conditional(request, response)
+        self.statuses[response.status] += 1
+        return response
+
+    @staticmethod
+    def _conditional(
+        request: web.Request, response: web.StreamResponse
+    ) -> web.StreamResponse:
+        """Add an ETag and answer a matching If-None-Match with 304."""
+        body = getattr(response, "body", None)
+        if not isinstance(body, bytes):
+            return response
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return response
+
+    def _respond(self, payload: dict) -> web.Response:
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+
+    def _dataset(self, request: web.Request) -> ZamgDataset:
+        dataset = DATASETS.get(request.match_info["dataset"])
+        if dataset is None:
+            raise web.HTTPNotFound()
+        return dataset
+
+    async def _station_metadata(self, _request: web.Request) -> web.Response:
+        return self._respond(self.metadata)
+
+    async def _station_data(self, request: web.Request) -> web.Response:
+        station_ids = request.query.get("station_ids", "").split(",")
+        parameters = request.query.get("parameters", "").split(",")
+        return self._respond(
+            synthetic_observations(station_ids, parameters, seed=self.seed)
+        )
+
+    async def _historical_data(self, request: web.Request) -> web.Response:
+        try:
+            start, end = (
+                datetime.fromisoformat(request.query[key]).replace(tzinfo=timezone.utc)
+                for key in ("start", "end")
+            )
+        except (KeyError, ValueError) as exc:
+            raise web.HTTPBadRequest() from exc
+        return self._respond(
+            synthetic_historical(
+                request.query.get("station_ids", "").split(","),
+                request.query.get("parameters", "").split(","),
+                start,
+                end,
+                seed=self.seed,
+            )
+        )
+
+    async def _forecast_metadata(self, request: web.Request) -> web.Response:
+        return self._respond(synthetic_forecast_metadata(self._dataset(request)))
+
+    async def _forecast_data(self, request: web.Request) -> web.Response:
+        dataset = self._dataset(request)
+        parameters = request.query.get("parameters", "").split(",")
+        if parameters == [""]:
+            parameters = list(dataset.default_parameters)
+        return self._respond(
+            synthetic_forecast(
+                dataset,
+                request.query.getall("lat_lon", []),
+                parameters,
+                self.forecast_steps,
+                seed=self.seed,
+            )
+        )
@@ -0,0 +1,234 @@
+"""Compact binary snapshots of the ZamgData state for warm restarts.
+
+Format (little endian), version STATE_VERSION:
+
+    magic      8 bytes  b"ZAMGSTAT"
+    version    uint16
+    index      uint32 length + zlib compressed JSON
+    arrays     the array buffers, in the order listed by the index
+
+The JSON index holds the metadata, parameter lists, observations and
+forecast payloads with the requests they answer. Parsed series (forecast
+epochs, derived rain and wind speed, observation history) are stored as
+raw arrays, which are referenced in the index as [typecode, length] and
+read back without parsing. A compressed history is stored decoded.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from array import array
+from typing import TYPE_CHECKING
+
+from .compressed import CompressedSeries
+from .series import TimeSeries
+from .stations import StationRegistry
+
+if TYPE_CHECKING:
+    from .zamg import ZamgData
+
+STATE_MAGIC = b"ZAMGSTAT"
+STATE_VERSION = 1
+_HEADER = struct.Struct("<8sHI")
+
+
+class _ArrayWriter:
+    """Collects arrays and returns their references for the index."""
+
+    def __init__(self):
+        self.buffers: list[bytes] = []
+
+    def add(self, values: array) -> list:
+        self.buffers.append(values.tobytes())
+        return [values.typecode, len(values)]
+
+    def series(self, series: TimeSeries) -> dict:
+        return {
+            "max_length": series.max_length,
+            "epochs": self.add(series.epochs),
+            "columns": {
+                name: self.add(column) for name, column in series.columns.items()
+            },
+        }
+
+
+class _ArrayReader:
+    """Reads the arrays referenced by the index in order."""
+
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.offset = 0
+
+    def get(self, reference: list) -> array:
+        typecode, length = reference
+        values = array(typecode)
+        size = values.itemsize * length
+        if self.offset + size > len(self.data):
+            raise ValueError("Truncated state")
+        values.frombytes(self.data[self.offset : self.offset + size])
+        self.offset += size
+        return values
+
+    def series(self, stored: dict) -> TimeSeries:
+        series = TimeSeries(stored["max_length"])
+        series.epochs = self.get(stored["epochs"])
+        series.columns = {
+            name: self.get(reference) for name, reference in stored["columns"].items()
+        }
+        return series
+
+
+def dump_state(zamg: ZamgData) -> bytes:
+    """Return the state of zamg in the binary state format."""
+    # pylint: disable=protected-access
+    arrays = _ArrayWriter()
+    registry = zamg._registry
+    index = {
+        "station_parameters": zamg.station_parameters,
+        "forecast_parameters": zamg.forecast_parameters,
+        "all_station_parameters": zamg._all_station_parameters,
+        "all_forecast_parameters": getattr(zamg, "_all_forecast_parameters", None),
+        "forecast_metadata": zamg.forecast_metadata,
+        "station_id": zamg._station_id,
+        "stations": zamg._stations,
+        "registry": None,
+        "timestamp": zamg._timestamp,
+        "data": zamg.data,
+        "timestamps": zamg._timestamps,
+        "payload_hashes": {
+            url: digest.hex() for url, digest in zamg._payload_hashes.items()
+        },
+        "validators": zamg._validators,
+        "forecasts": zamg._forecasts,
+        "forecast_timestamps": zamg._forecast_timestamps,
+        # payloads which are the last forecast of their dataset are not repeated
+        "forecast_urls": {
+            dataset_name: [
+                url,
+                None if zamg._forecasts.get(dataset_name) is payload else payload,
+            ]
+            for dataset_name, (url, payload) in zamg._forecast_urls.items()
+        },
+        "forecast_locations": zamg._forecast_locations,
+        "series": [],
+        "history": {},
+    }
+    if registry is not None:
+        index["registry"] = {
+            "ids": registry.ids,
+            "names": registry.names,
+            "states": registry.states,
+            "lat": arrays.add(registry.lat),
+            "lon": arrays.add(registry.lon),
+            "altitude": arrays.add(registry.altitude),
+        }
+    for (dataset_name, feature), (payload, series) in zamg._series_cache.items():
+        if zamg._forecasts.get(dataset_name) is payload:
+            index["series"].append([dataset_name, feature, arrays.series(series)])
+    for station_id, series in zamg.history.items():
+        if isinstance(series, CompressedSeries):
+            series = series.to_series()
+        index["history"][station_id] = arrays.series(series)
+
+    encoded = zlib.compress(json.dumps(index, separators=(",", ":")).encode())
+    return b"".join(
+        [_HEADER.pack(STATE_MAGIC, STATE_VERSION, len(encoded)), encoded]
+        + arrays.buffers
+    )
+
+
+def load_state(zamg: ZamgData, state: bytes) -> None:
+    """Restore the state of zamg out of dump_state().
+
+    Raise ValueError if state is no state of a supported version.
+    """
+    # pylint: disable=protected-access
+    data = memoryview(state)
+    if len(data) < _HEADER.size:
+        raise ValueError("Truncated state")
+    magic, version, index_size = _HEADER.unpack_from(data)
+    if magic != STATE_MAGIC:
+        raise ValueError("No zamg state")
+    if version != STATE_VERSION:
+        raise ValueError(f"Unsupported state version {version}")
+    try:
+        index = json.loads(
+            zlib.decompress(data[_HEADER.size : _HEADER.size + index_size])
+        )
+    except zlib.error as exc:
+        raise ValueError(f"Corrupt state: {exc}") from exc
+    arrays = _ArrayReader(data[_HEADER.size + index_size :])
+
+    registry = None
+    if index["registry"] is not None:
+        stored = index["registry"]
+        lat, lon, altitude = (
+            arrays.get(stored[key]) for key in ("lat", "lon", "altitude")
+        )
+        registry = StationRegistry(
+            [
+                {
+                    "id": station_id,
+                    "name": name,
+                    "state": state_name,
+                    "lat": lat[idx],
+                    "lon": lon[idx],
+                    "altitude": altitude[idx],
+                }
+                for idx, (station_id, name, state_name) in enumerate(
+                    zip(stored["ids"], stored["names"], stored["states"])
+                )
+            ]
+        )
+    series_cache = {}
+    for dataset_name, feature, stored in index["series"]:
+        series_cache[(dataset_name, feature)] = (
+            index["forecasts"][dataset_name],
+            arrays.series(stored),
+        )
+    history = {
+        station_id: arrays.series(stored)
+        for station_id, stored in index["history"].items()
+    }
+    if zamg.compress_history:
+        history = {
+            station_id: CompressedSeries.from_series(series)
+            for station_id, series in history.items()
+        }
+
+    zamg.station_parameters = index["station_parameters"]
+    zamg.forecast_parameters = index["forecast_parameters"]
+    zamg._all_station_parameters = index["all_station_parameters"]
+    zamg._all_forecast_parameters = index["all_forecast_parameters"]
+    if index["forecast_metadata"] is not None:
+        zamg._forecast_metadata = index["forecast_metadata"]
+    zamg._station_id = index["station_id"]
+    if index["stations"] is not None:
+        zamg._stations = {
+            station_id: tuple(station)
+            for station_id, station in index["stations"].items()
+        }
+    zamg._registry = registry
+    zamg._timestamp = index["timestamp"]
+    zamg.data = index["data"]
+    zamg._timestamps = index["timestamps"]
+    zamg._payload_hashes = {
+        url: bytes.fromhex(digest) for url, digest in index["payload_hashes"].items()
+    }
+    zamg._validators = {
+        url: tuple(validators) for url, validators in index["validators"].items()
+    }
+    zamg._forecasts = index["forecasts"]
+    zamg._forecast_timestamps = index["forecast_timestamps"]
+    zamg._forecast_urls = {
+        dataset_name: (
+            url,
+            index["forecasts"][dataset_name] if payload is None else payload,
+        )
+        for dataset_name, (url, payload) in index.get("forecast_urls", {}).items()
+    }
+    zamg._forecast_locations = index.get("forecast_locations", {})
+    zamg._series_cache = series_cache
+    zamg.history = history
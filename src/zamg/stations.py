@@ -0,0 +1,178 @@
+"""Columnar registry of GeoSphere Austria weather stations."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from collections.abc import Mapping, Sequence
+
+from . import columnar
+
+ORDER_CACHE_SIZE = 256
+"""Number of distance orderings kept by StationRegistry.nearest_order()."""
+
+Polygon = Sequence[tuple[float, float]]
+"""Polygon as a sequence of (lat, lon) vertices."""
+
+
+def _to_float(value) -> float:
+    """Return value as float, NaN if it is not a number."""
+    try:
+        return float(str(value).replace(",", "."))
+    except ValueError:
+        return math.nan
+
+
+def point_in_polygon(lat: float, lon: float, polygon: Polygon) -> bool:
+    """Return True if (lat, lon) is inside polygon (ray casting)."""
+    inside = False
+    count = len(polygon)
+    for idx in range(count):
+        lat1, lon1 = polygon[idx]
+        lat2, lon2 = polygon[idx - 1]
+        if (lat1 > lat) != (lat2 > lat) and lon < (lon2 - lon1) * (lat - lat1) / (
+            lat2 - lat1
+        ) + lon1:
+            inside = not inside
+    return inside
+
+
+def _in_polygon_numpy(numpy, lat, lon, polygon: Polygon):
+    """Return a bool array of the points inside polygon, see point_in_polygon."""
+    inside = numpy.zeros(len(lat), dtype=bool)
+    for idx in range(len(polygon)):
+        lat1, lon1 = polygon[idx]
+        lat2, lon2 = polygon[idx - 1]
+        crosses = (lat1 > lat) != (lat2 > lat)
+        if lat1 == lat2 or not crosses.any():
+            continue
+        edge = (lon2 - lon1) * (lat - lat1) / (lat2 - lat1) + lon1
+        inside ^= crosses & (lon < edge)
+    return inside
+
+
+class StationRegistry:
+    """All stations of the metadata stored column wise.
+
+    Station attributes are arrays in the order of ids, so per station data
+    can be stored in arrays of the same order and processed in one pass,
+    with numpy kernels if numpy is installed.
+    """
+
+    def __init__(self, stations: Sequence[Mapping]):
+        """Initialize the registry out of the metadata station list."""
+        self.ids: tuple[str, ...] = tuple(str(station["id"]) for station in stations)
+        self.index: dict[str, int] = {
+            station_id: idx for idx, station_id in enumerate(self.ids)
+        }
+        self.names: tuple[str, ...] = tuple(
+            str(station.get("name", "")) for station in stations
+        )
+        self.states: tuple[str | None, ...] = tuple(
+            station.get("state") for station in stations
+        )
+        self.lat = array("d", (_to_float(station["lat"]) for station in stations))
+        self.lon = array("d", (_to_float(station["lon"]) for station in stations))
+        self.altitude = array(
+            "d", (_to_float(station.get("altitude")) for station in stations)
+        )
+        self._groups: dict = {}
+        self._orders: dict[tuple[float, float], array] = {}
+
+    def __len__(self) -> int:
+        """Return the number of stations."""
+        return len(self.ids)
+
+    def groups(
+        self, by: str | Mapping[str, Polygon] | None = None
+    ) -> tuple[tuple, array]:
+        """Return (group names, group index per station) for a grouping.
+
+        by is None (one group "all"), "state" or a mapping of
+        {name: polygon}. Stations in no group have the index -1. The first
+        matching polygon wins. The assignment is computed once and cached.
+        """
+        if by is None:
+            key: object = None
+        elif isinstance(by, str):
+            key = by
+        else:
+            key = tuple(
+                (name, tuple(map(tuple, polygon))) for name, polygon in by.items()
+            )
+        cached = self._groups.get(key)
+        if cached is not None:
+            return cached
+
+        if by is None:
+            names: tuple = ("all",)
+            codes = array("i", [0]) * len(self)
+        elif by == "state":
+            names = tuple(sorted({state for state in self.states if state}))
+            positions = {name: idx for idx, name in enumerate(names)}
+            codes = array("i", (positions.get(state, -1) for state in self.states))
+        elif isinstance(by, str):
+            raise ValueError(f"Unknown station grouping {by}")
+        else:
+            names = tuple(by)
+            polygons = list(by.values())
+            codes = array("i", [-1]) * len(self)
+            numpy = columnar.optional_numpy()
+            if numpy is not None:
+                lat = numpy.frombuffer(self.lat, dtype=numpy.float64)
+                lon = numpy.frombuffer(self.lon, dtype=numpy.float64)
+                group = numpy.frombuffer(codes, dtype=f"i{codes.itemsize}")
+                for code, polygon in enumerate(polygons):
+                    inside = _in_polygon_numpy(numpy, lat, lon, polygon)
+                    group[inside & (group < 0)] = code
+            else:
+                for idx, (lat, lon) in enumerate(zip(self.lat, self.lon)):
+                    for code, polygon in enumerate(polygons):
+                        if point_in_polygon(lat, lon, polygon):
+                            codes[idx] = code
+                            break
+        self._groups[key] = (names, codes)
+        return names, codes
+
+    def nearest_order(self, lat: float, lon: float) -> array:
+        """Return all station indices ordered by distance to (lat, lon).
+
+        Uses the same pseudo-distance as ZamgData.closest_station(). The
+        last orderings are cached, so repeated lookups are free.
+        """
+        key = (lat, lon)
+        order = self._orders.get(key)
+        if order is not None:
+            return order
+        numpy = columnar.optional_numpy()
+        if numpy is not None:
+            distances = (lat - numpy.frombuffer(self.lat, dtype=numpy.float64)) ** 2 + (
+                lon - numpy.frombuffer(self.lon, dtype=numpy.float64)
+            ) ** 2
+            ranked = numpy.argsort(distances, kind="stable")
+            order = array("i")
+            order.frombytes(
+                ranked[distances[ranked] == distances[ranked]]
+                .astype(f"i{order.itemsize}")
+                .tobytes()
+            )
+        else:
+            distances = [
+                (lat - station_lat) ** 2 + (lon - station_lon) ** 2
+                for station_lat, station_lon in zip(self.lat, self.lon)
+            ]
+            order = array(
+                "i",
+                sorted(
+                    (
+                        idx
+                        for idx, distance in enumerate(distances)
+                        if distance == distance
+                    ),
+                    key=distances.__getitem__,
+                ),
+            )
+        if len(self._orders) >= ORDER_CACHE_SIZE:
+            del self._orders[next(iter(self._orders))]
+        self._orders[key] = order
+        return order
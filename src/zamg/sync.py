@@ -0,0 +1,260 @@
+"""Blocking, thread-safe GeoSphere Austria client.
+
+All SyncZamgData instances of a process run on one background event loop
+thread, so threads share one aiohttp session, station metadata, cache and
+rate limiter instead of each running asyncio.run() with its own client:
+
+    client = SyncZamgData()
+    client.update("11240")["TL"]["data"]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+from .datasets import ZamgDataset
+from .exceptions import ZamgStationUnknownError
+from .metrics import ZamgMetrics
+from .ratelimit import RateLimiter
+from .series import parse_epoch
+from .snapshot import StationSnapshot
+from .zamg import OBSERVATION_CADENCE, ZamgData
+
+T = TypeVar("T")
+
+
+class BackgroundLoop:
+    """Event loop running forever in a daemon thread."""
+
+    def __init__(self):
+        """Start the loop thread."""
+        self.loop = asyncio.new_event_loop()
+        self.pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="zamg-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the loop thread is alive in this process."""
+        return self.pid == os.getpid() and self._thread.is_alive()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Run coro on the loop and block until it is done.
+
+        On timeout the coroutine is cancelled and TimeoutError is raised.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Blocking call from the event loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Stop the loop and wait for its thread."""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_background_loop: BackgroundLoop | None = None
+_background_lock = threading.Lock()
+
+
+def background_loop() -> BackgroundLoop:
+    """Return the event loop thread of this process, start it if needed.
+
+    A forked child gets its own loop, the parent's thread does not exist in it.
+    """
+    global _background_loop  # pylint: disable=global-statement
+    with _background_lock:
+        if _background_loop is None or not _background_loop.is_running:
+            _background_loop = BackgroundLoop()
+        return _background_loop
+
+
+class SyncZamgData:
+    """Thread-safe blocking facade of ZamgData.
+
+    One instance is meant to be shared by all threads of a process. Every
+    call runs on the background loop, station ids and locations are passed
+    explicitly instead of being instance state, and all calls share the
+    station metadata, the observation and forecast caches and the optional
+    rate limiter of the wrapped client.
+    """
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        rate_limiter: RateLimiter | None = None,
+        metrics: ZamgMetrics | None = None,
+        max_retries: int = 0,
+        timeout: float | None = None,
+        loop: BackgroundLoop | None = None,
+    ):
+        """Initialize the client, timeout limits every blocking call."""
+        self.zamg = ZamgData()
+        if api_url is not None:
+            self.zamg.set_api_url(api_url)
+        self.zamg.rate_limiter = rate_limiter
+        self.zamg.metrics = metrics
+        self.zamg.max_retries = max_retries
+        self.timeout = timeout
+        self._loop = loop or background_loop()
+        self._forecasts: dict[tuple[str, tuple[str, ...]], tuple[float, dict]] = {}
+        self._metadata_lock: asyncio.Lock | None = None
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self._loop.run(coro, self.timeout)
+
+    async def _ensure_stations(self) -> dict:
+        """Load the station metadata once, concurrent callers wait for it."""
+        if self._metadata_lock is None:
+            self._metadata_lock = asyncio.Lock()
+        async with self._metadata_lock:
+            stations = await self.zamg.zamg_stations()
+        if stations is None:
+            raise ZamgStationUnknownError("Failed to load station metadata")
+        return stations
+
+    def zamg_stations(self) -> dict[str, tuple[float, float, str]]:
+        """Return {station_id: (lat, lon, name)} for all public data stations."""
+        return self._run(self._ensure_stations())
+
+    def closest_station(self, lat: float, lon: float) -> str:
+        """Return the station_id of the closest station to lat/lon."""
+
+        async def _closest() -> str:
+            await self._ensure_stations()
+            return await self.zamg.closest_station(lat, lon)
+
+        return self._run(_closest())
+
+    async def _update(self, station_ids: list[str]) -> dict[str, dict]:
+        await self._ensure_stations()
+        # pylint: disable=protected-access
+        timestamps = self.zamg._timestamps
+        expired = time.time() - OBSERVATION_CADENCE.total_seconds()
+        stale = [
+            station_id
+            for station_id in station_ids
+            if station_id not in timestamps
+            or parse_epoch(timestamps[station_id]) <= expired
+        ]
+        if stale:
+            await self.zamg._update_stations(stale)
+        return {
+            station_id: dict(self.zamg.data[station_id])
+            for station_id in station_ids
+            if station_id in self.zamg.data
+        }
+
+    def update(self, station_id: str) -> dict:
+        """Return the current observations of a station.
+
+        The station is only fetched if its newest observation is older than
+        the observation cadence.
+        """
+        return self._run(self._update([station_id])).get(station_id, {})
+
+    def update_stations(self, station_ids: list[str]) -> dict[str, dict]:
+        """Return the current observations of several stations.
+
+        Stale stations are fetched with batched requests, see
+        ZamgData.update_stations().
+        """
+        return self._run(self._update(list(station_ids)))
+
+    def snapshot(
+        self,
+        station_ids: list[str] | None = None,
+        parameters: list[str] | None = None,
+    ) -> StationSnapshot:
+        """Return the observations of several stations column wise."""
+
+        async def _snapshot() -> StationSnapshot:
+            await self._ensure_stations()
+            return await self.zamg.snapshot(station_ids, parameters)
+
+        return self._run(_snapshot())
+
+    def closest_values(
+        self, lat: float, lon: float, parameters: list[str]
+    ) -> dict[str, tuple[str, float] | None]:
+        """Return the value of the closest station reporting it per parameter."""
+
+        async def _closest_values() -> dict[str, tuple[str, float] | None]:
+            await self._ensure_stations()
+            return await self.zamg.closest_values(lat, lon, parameters)
+
+        return self._run(_closest_values())
+
+    def get_forecast(
+        self,
+        lat_lon: str | list[str],
+        current_only: bool = False,
+        dataset: ZamgDataset | None = None,
+    ) -> dict:
+        """Return the forecast of one or more locations from now onward.
+
+        Forecasts are cached per dataset and locations for the dataset
+        refresh interval.
+        """
+        return self._run(self._get_forecast(lat_lon, current_only, dataset))
+
+    def get_nowcast(self, lat_lon: str | list[str], current_only: bool = False) -> dict:
+        """Return the nowcast of one or more locations from now onward."""
+        return self.get_forecast(lat_lon, current_only, self.zamg.nowcast_dataset)
+
+    async def _get_forecast(
+        self,
+        lat_lon: str | list[str],
+        current_only: bool,
+        dataset: ZamgDataset | None,
+    ) -> dict:
+        # pylint: disable=protected-access
+        dataset = dataset or self.zamg.forecast_dataset
+        points = (lat_lon,) if isinstance(lat_lon, str) else tuple(lat_lon)
+        key = (dataset.name, points)
+        cached = self._forecasts.get(key)
+        now = time.monotonic()
+        if (
+            cached is None
+            or cached[0] + dataset.refresh_interval.total_seconds() <= now
+        ):
+            # ZamgData caches one payload per dataset, bypass it for other points
+            self.zamg._forecast_timestamps.pop(dataset.name, None)
+            await self.zamg.get_forecast(list(points), dataset=dataset)
+            for expired in [
+                other
+                for other, (fetched, _) in self._forecasts.items()
+                if fetched + dataset.refresh_interval.total_seconds() <= now
+            ]:
+                del self._forecasts[expired]
+            cached = self._forecasts[key] = (now, self.zamg._forecasts[dataset.name])
+        if current_only:
+            return self.zamg.get_forecast_current(cached[1], dataset=dataset)
+        return self.zamg._get_forecast_from_now(cached[1], dataset)
+
+    def close(self) -> None:
+        """Close the session of the client."""
+        self._loop.run(self.zamg.__aexit__())
+
+    def __enter__(self) -> SyncZamgData:
+        """Enter, returns the client."""
+        return self
+
+    def __exit__(self, *_exc_info) -> None:
+        """Exit, closes the session."""
+        self.close()
@@ -0,0 +1,322 @@
+"""Predictive cache warming of frequently read observations and forecasts.
+
+Assign one CacheWarmer to ZamgData instances and run it in their event
+loop. It counts how often and how recently every instance reads its
+observations with update() and its forecasts with get_forecast(), and
+refreshes the hot ones in the background shortly after new data is
+expected to be published, so readers are served from the cache:
+
+    warmer = CacheWarmer(rate=2.0)
+    for zamg in clients:
+        zamg.warmer = warmer
+    async with warmer:
+        ...
+
+New data is expected one cadence (observations) or one model run interval
+(forecasts) after the data time of the cached data, plus the publication
+lag learned from the previous publications. Until it arrives the warmer
+checks again after retry_interval seconds, doubled for each further
+check. Keys read less often expire as usual.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import statistics
+import time
+import weakref
+from collections import deque
+from typing import TYPE_CHECKING
+
+from .deadline import detached
+from .exceptions import ZamgApiError, ZamgError, ZamgNoDataError
+from .ratelimit import RateLimiter
+from .series import parse_epoch
+from .zamg import _retried_errors
+
+if TYPE_CHECKING:
+    from .datasets import ZamgDataset
+    from .zamg import ZamgData
+
+_LOGGER = logging.getLogger(__name__)
+
+OBSERVATION_INTERVAL = 600.0
+"""Seconds between two observation timestamps."""
+LAG_SAMPLES = 8
+"""Number of publication lags the expected lag is the median of."""
+
+
+def _locations(zamg: ZamgData, lat_lon: str | list[str] | None) -> list[str] | None:
+    """Return the locations a forecast of lat_lon is fetched for.
+
+    None stands for the station location, which is None if it is unknown.
+    """
+    if lat_lon is None:
+        try:
+            lat, lon = zamg.get_station_location
+        except ZamgError:
+            return None
+        return [f"{lat},{lon}"]
+    if isinstance(lat_lon, str):
+        return [lat_lon]
+    return list(lat_lon)
+
+
+class _Access:
+    """Access statistics and warming state of one key of an instance."""
+
+    __slots__ = ("score", "last", "lat_lon", "checked", "retry_at", "misses")
+
+    def __init__(self, now: float):
+        self.score = 0.0
+        """Number of reads, decayed with the half life."""
+        self.last = now
+        self.lat_lon: str | list[str] | None = None
+        self.checked = 0.0
+        """Time the warmer last fetched the key successfully."""
+        self.retry_at = 0.0
+        self.misses = 0
+        """Number of checks since the last publication without new data."""
+
+
+class CacheWarmer:
+    """Refreshes the observations and forecasts read most by its instances.
+
+    The reads of a key (the observations or a forecast dataset of an
+    instance) are counted with exponential decay: a key is hot while its
+    score is at least min_score, e.g. with the defaults it has to be read
+    twice within an hour (the half life). The refreshes are limited to rate requests
+    per second on top of the rate limiters of the instances.
+
+    Hot keys refreshed by a running warmer are served from the cache until
+    their next expected publication, stale keys and cold keys expire as
+    usual.
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        half_life: float = 3600.0,
+        min_score: float = 1.5,
+        retry_interval: float = 60.0,
+        tick: float = 5.0,
+    ):
+        """Initialize the warmer, it has to be started to refresh keys."""
+        self.half_life = half_life
+        self.min_score = min_score
+        self.retry_interval = retry_interval
+        self.tick = tick
+        self.rate_limiter = RateLimiter(rate, burst=max(1, math.ceil(rate)))
+        self.refreshes = 0
+        """Number of refreshes sent."""
+        self.errors = 0
+        """Number of failed refreshes."""
+        self._keys: weakref.WeakKeyDictionary[
+            ZamgData, dict[ZamgDataset | None, _Access]
+        ] = weakref.WeakKeyDictionary()
+        self._lags: dict[str | None, deque[float]] = {}
+        self._run_intervals: dict[str, float] = {}
+        self._task: asyncio.Task | None = None
+
+    def record(
+        self,
+        zamg: ZamgData,
+        dataset: ZamgDataset | None = None,
+        lat_lon: str | list[str] | None = None,
+    ) -> None:
+        """Record a read of the observations (dataset None) or a forecast."""
+        now = time.time()
+        keys = self._keys.setdefault(zamg, {})
+        access = keys.get(dataset)
+        if access is None:
+            access = keys[dataset] = _Access(now)
+        access.score = self._decayed(access, now) + 1.0
+        access.last = now
+        access.lat_lon = lat_lon
+
+    def _decayed(self, access: _Access, now: float) -> float:
+        return access.score * 0.5 ** ((now - access.last) / self.half_life)
+
+    def is_hot(self, zamg: ZamgData, dataset: ZamgDataset | None = None) -> bool:
+        """Return True if the key is read often enough to be warmed."""
+        access = self._keys.get(zamg, {}).get(dataset)
+        return access is not None and (
+            self._decayed(access, time.time()) >= self.min_score
+        )
+
+    def is_warm(
+        self,
+        zamg: ZamgData,
+        dataset: ZamgDataset | None = None,
+        lat_lon: str | list[str] | None = None,
+    ) -> bool:
+        """Return True if the cached data of a key is kept current by the warmer.
+
+        This is the case for hot keys of a running warmer, until the next
+        expected publication or the next check for it is overdue. A cached
+        forecast is only warm for the locations lat_lon it was fetched for.
+        """
+        # pylint: disable=protected-access
+        if not self.is_running or not self.is_hot(zamg, dataset):
+            return False
+        access = self._keys[zamg][dataset]
+        if not access.checked:
+            return False
+        if dataset is not None and zamg._forecast_locations.get(
+            dataset.name
+        ) != _locations(zamg, lat_lon):
+            return False
+        due = max(self._expected(zamg, dataset), access.retry_at)
+        return time.time() < due + 2 * self.tick
+
+    def _data_time(self, zamg: ZamgData, dataset: ZamgDataset | None) -> float | None:
+        """Return the epoch of the cached data of a key, None if there is none."""
+        # pylint: disable=protected-access
+        if dataset is None:
+            timestamp = zamg._timestamps.get(zamg._station_id)
+        else:
+            timestamp = zamg._forecasts.get(dataset.name, {}).get("reference_time")
+        return float(parse_epoch(timestamp)) if timestamp else None
+
+    def _interval(self, dataset: ZamgDataset | None) -> float:
+        """Return the seconds between two publications."""
+        if dataset is None:
+            return OBSERVATION_INTERVAL
+        return self._run_intervals.get(dataset.name, dataset.cadence.total_seconds())
+
+    def _lag(self, dataset: ZamgDataset | None) -> float:
+        """Return the expected delay of a publication after its data time."""
+        lags = self._lags.get(None if dataset is None else dataset.name)
+        return statistics.median(lags) if lags else 0.0
+
+    def _expected(self, zamg: ZamgData, dataset: ZamgDataset | None) -> float:
+        """Return the time the next data of a key is expected, 0 if unknown."""
+        data_time = self._data_time(zamg, dataset)
+        if data_time is None:
+            return 0.0
+        return data_time + self._interval(dataset) + self._lag(dataset)
+
+    def _learn(
+        self,
+        dataset: ZamgDataset | None,
+        previous: float | None,
+        data_time: float,
+        now: float,
+    ) -> None:
+        """Learn the lag and run interval of a new publication.
+
+        Only publications following cached data are used, the first fetch
+        of a key may be long after its publication.
+        """
+        if previous is None or data_time <= previous:
+            return
+        name = None if dataset is None else dataset.name
+        self._lags.setdefault(name, deque(maxlen=LAG_SAMPLES)).append(now - data_time)
+        if name is not None:
+            self._run_intervals[name] = data_time - previous
+
+    def due(self) -> list[tuple[ZamgData, ZamgDataset | None]]:
+        """Return the hot keys to refresh now, hottest first, and forget cold keys."""
+        now = time.time()
+        result = []
+        for zamg, keys in list(self._keys.items()):
+            for dataset, access in list(keys.items()):
+                score = self._decayed(access, now)
+                if score < self.min_score:
+                    if score < self.min_score / 16:
+                        del keys[dataset]
+                    continue
+                if now >= max(self._expected(zamg, dataset), access.retry_at):
+                    result.append((score, zamg, dataset))
+        result.sort(key=lambda item: item[0], reverse=True)
+        return [(zamg, dataset) for _, zamg, dataset in result]
+
+    async def refresh(self, zamg: ZamgData, dataset: ZamgDataset | None) -> None:
+        """Fetch the data of a key and learn from the publication time."""
+        # pylint: disable=protected-access
+        access = self._keys[zamg][dataset]
+        previous = self._data_time(zamg, dataset)
+        await self.rate_limiter.acquire()
+        self.refreshes += 1
+        try:
+            if dataset is None:
+                await zamg.refresh_observations()
+            else:
+                lat_lon = _locations(zamg, access.lat_lon)
+                if lat_lon is None:
+                    raise ZamgApiError("No location to fetch the forecast of")
+                await zamg.fetch_forecast(lat_lon, dataset)
+        except (
+            *_retried_errors(),
+            asyncio.TimeoutError,
+            ZamgApiError,
+            ZamgNoDataError,
+        ):
+            self.errors += 1
+            access.checked = 0.0
+            access.retry_at = time.time() + self.retry_interval
+            return
+        now = time.time()
+        access.checked = now
+        data_time = self._data_time(zamg, dataset)
+        if data_time is not None and data_time != previous:
+            self._learn(dataset, previous, data_time, now)
+            access.retry_at = 0.0
+            access.misses = 0
+        else:
+            access.retry_at = now + min(
+                self.retry_interval * 2**access.misses, self._interval(dataset)
+            )
+            access.misses += 1
+
+    async def run(self) -> None:
+        """Refresh the due keys every tick seconds, until cancelled."""
+        # refreshes serve all readers, not the caller starting the warmer
+        with detached():
+            while True:
+                keys = self.due()
+                results = await asyncio.gather(
+                    *(self.refresh(zamg, dataset) for zamg, dataset in keys),
+                    return_exceptions=True,
+                )
+                for (zamg, dataset), result in zip(keys, results):
+                    if isinstance(result, Exception):
+                        self.errors += 1
+                        _LOGGER.error(
+                            "Refreshing %s of station %s failed",
+                            "observations" if dataset is None else dataset.name,
+                            zamg._station_id,  # pylint: disable=protected-access
+                            exc_info=result,
+                        )
+                await asyncio.sleep(self.tick)
+
+    @property
+    def is_running(self) -> bool:
+        """Return True if the warmer was started and not stopped."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start warming in the running event loop."""
+        if not self.is_running:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop warming."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def __aenter__(self) -> CacheWarmer:
+        """Start the warmer."""
+        self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        """Stop the warmer."""
+        await self.stop()
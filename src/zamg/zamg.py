@@ -1,31 +1,98 @@
 """GeoSphere Austria Weather Data Client."""  # fmt: skip
 from __future__ import annotations
 
-import json
-import zoneinfo
+import functools
+import time
+from array import array
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import replace
 from datetime import datetime, timedelta
+from http import HTTPStatus
 from sys import version_info
-
-import aiohttp
-import async_timeout
-from aiohttp.client_exceptions import (
-    ClientConnectorError,
-    ServerDisconnectedError,
-    ServerTimeoutError,
-)
-from aiohttp.hdrs import USER_AGENT
+from typing import TYPE_CHECKING, TypeVar
 
 from . import __version__
+from .compressed import CompressedSeries
+from .datasets import INCA_NOWCAST, NWP_FORECAST, ZamgDataset
+from .deadline import bounded, remaining, share
 from .exceptions import (
     ZamgApiError,
     ZamgNoDataError,
     ZamgStationNotFoundError,
     ZamgStationUnknownError,
 )
-
+from .metrics import endpoint_name
+from .series import UTC, SeriesWindow, TimeSeries, parse_epoch
+from .stations import StationRegistry
+
+if TYPE_CHECKING:
+    import aiohttp
+
+    from .changes import ZamgChange
+    from .coalesce import UpdateCoalescer
+    from .metrics import ZamgMetrics
+    from .planner import ParameterPlanner
+    from .ratelimit import RateLimiter
+    from .snapshot import StationSnapshot
+    from .warming import CacheWarmer
+
+T = TypeVar("T")
+
+OBSERVATION_CADENCE = timedelta(minutes=10)
+"""Time step of the current station observations."""
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+"""Response statuses which are retried if max_retries is set."""
+MAX_RETRY_DELAY = 60.0
+"""Upper limit of the delay between retries in seconds."""
+HISTORICAL_RESOURCE = "klima-v2-10min"
+"""Default resource of get_historical()."""
+HISTORICAL_TIME_FORMAT = "%Y-%m-%dT%H:%M"
+"""Format of the start and end parameters of historical requests."""
 CLIENT_AGENT = f"Python/{version_info[0]}.{version_info[1]} +https://github.com/killer0071234/python-zamg python-zamg/{__version__}"
 
 
+@functools.cache
+def _connection_errors() -> tuple[type[Exception], ...]:
+    """Return the aiohttp exceptions of failed connections.
+
+    aiohttp is imported by the first request, not by importing zamg.
+    """
+    from aiohttp.client_exceptions import (  # pylint: disable=import-outside-toplevel
+        ClientConnectorError,
+        ServerTimeoutError,
+    )
+
+    return ClientConnectorError, ServerTimeoutError
+
+
+@functools.cache
+def _retried_errors() -> tuple[type[Exception], ...]:
+    """Return _connection_errors() and dropped connections."""
+    from aiohttp.client_exceptions import (  # pylint: disable=import-outside-toplevel
+        ServerDisconnectedError,
+    )
+
+    return (*_connection_errors(), ServerDisconnectedError)
+
+
+async def _gather(*coros: Awaitable[T]) -> list[T]:
+    """Run coros concurrently, cancel the others as soon as one fails.
+
+    The cancelled coroutines are awaited, so their responses are released
+    before the error is raised.
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
 class ZamgData:
     """The class for handling the data retrieval."""
 
@@ -37,17 +104,15 @@ class ZamgData:
         "https://dataset.api.hub.geosphere.at/v1/station/current/tawes-v1-10min?parameters="
     )
     """API url to fetch current conditions of a weather station."""
-    forecast_metadata_url: str = (
-        "https://dataset.api.hub.geosphere.at/v1/grid/forecast/nwp-v1-1h-2500m/metadata"
-    )
-    """API url to fetch possible stations and parameters."""
-    forecast_url: str = (
-        "https://dataset.api.hub.geosphere.at/v1/timeseries/forecast/nwp-v1-1h-2500m?parameters="
-    )
-    """API url to fetch current conditions of a weather station."""
+    historical_url: str = "https://dataset.api.hub.geosphere.at/v1/station/historical/"
+    """API url of the historical station resources."""
+    forecast_dataset: ZamgDataset = NWP_FORECAST
+    """Dataset used by get_forecast()."""
+    nowcast_dataset: ZamgDataset = INCA_NOWCAST
+    """Dataset used by get_nowcast()."""
     request_timeout: float = 8.0
     headers = {
-        USER_AGENT: CLIENT_AGENT,
+        "User-Agent": CLIENT_AGENT,
     }
     session: aiohttp.client.ClientSession | None = None
     _close_session: bool = False
@@ -57,11 +122,31 @@ class ZamgData:
     forecast_parameters: str | None = None
     """Comma separated list of station parameter to get from GeoSphere Austria."""
     _timestamp: str | None = None
-    _timestamp_forecast: str | None = None
     _station_id: str = ""
     _all_station_parameters: str | None = None
     """Comma separated list of all possible station parameters."""
     _stations: tuple | None = None
+    _registry: StationRegistry | None = None
+    max_stations_per_request: int = 100
+    """Maximum number of stations fetched in one request by update_stations()."""
+    metrics: ZamgMetrics | None = None
+    """Metrics hook recording timings, sizes and cache hits, see zamg.metrics."""
+    rate_limiter: RateLimiter | None = None
+    """Optional rate limiter, can be shared between instances."""
+    max_retries: int = 0
+    """Number of retries of connection errors and RETRY_STATUSES responses."""
+    retry_backoff: float = 0.5
+    """Delay before the first retry in seconds, doubled for each further retry."""
+    coalescer: UpdateCoalescer | None = None
+    """Optional coalescer batching update() calls of instances, see zamg.coalesce."""
+    planner: ParameterPlanner | None = None
+    """Optional planner merging the parameters of instances, see zamg.planner."""
+    warmer: CacheWarmer | None = None
+    """Optional warmer refreshing frequently read data, see zamg.warming."""
+    history_size: int = 144
+    """Number of observations per station kept in history (one day of 10 min data)."""
+    compress_history: bool = False
+    """Keep the history in a CompressedSeries, for long history sizes."""
 
     def __init__(
         self,
@@ -70,46 +155,125 @@ class ZamgData:
     ):
         """Initialize the api client."""
         self.data = {}
-        self.data_forecast = {}
+        self._forecasts: dict[str, dict] = {}
+        self._forecast_timestamps: dict[str, str | None] = {}
+        self._timestamps: dict[str, str] = {}
+        self._payload_hashes: dict[str, bytes] = {}
+        self._validators: dict[str, tuple[str | None, str | None]] = {}
+        self._forecast_urls: dict[str, tuple[str, dict]] = {}
+        self._forecast_locations: dict[str, list[str]] = {}
+        self.revalidations = 0
+        """Number of requests answered with 304 Not Modified."""
+        self._series_cache: dict[tuple[str, int], tuple[dict, TimeSeries]] = {}
+        self.history: dict[str, TimeSeries | CompressedSeries] = {}
         self._station_id = default_station_id
         self.session = session
 
+    @property
+    def forecast_metadata_url(self) -> str:
+        """API url to fetch possible forecast parameters."""
+        return self.forecast_dataset.metadata_url
+
+    @forecast_metadata_url.setter
+    def forecast_metadata_url(self, url: str) -> None:
+        self.forecast_dataset = replace(self.forecast_dataset, custom_metadata_url=url)
+
+    @property
+    def forecast_url(self) -> str:
+        """API url to fetch the forecast of a location."""
+        return self.forecast_dataset.data_url
+
+    @forecast_url.setter
+    def forecast_url(self, url: str) -> None:
+        self.forecast_dataset = replace(self.forecast_dataset, custom_data_url=url)
+
+    @property
+    def data_forecast(self) -> dict:
+        """Return the last fetched forecast payload."""
+        return self._forecasts.get(self.forecast_dataset.name, {})
+
+    @data_forecast.setter
+    def data_forecast(self, value: dict) -> None:
+        self._forecasts[self.forecast_dataset.name] = value
+
+    @property
+    def data_nowcast(self) -> dict:
+        """Return the last fetched nowcast payload."""
+        return self._forecasts.get(self.nowcast_dataset.name, {})
+
+    @property
+    def _timestamp_forecast(self) -> str | None:
+        """Return the fetch time of the last forecast payload."""
+        return self._forecast_timestamps.get(self.forecast_dataset.name)
+
+    @_timestamp_forecast.setter
+    def _timestamp_forecast(self, value: str | None) -> None:
+        self._forecast_timestamps[self.forecast_dataset.name] = value
+
+    def _forecast_series(
+        self, dataset: ZamgDataset, data: dict, feature: int = 0
+    ) -> TimeSeries:
+        """Return the parsed series of a forecast payload feature.
+
+        Timestamps are parsed into an epoch index once per payload; the
+        derived rain and wind_speed series are added as columns.
+        """
+        key = (dataset.name, feature)
+        cached = self._series_cache.get(key)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        series = TimeSeries.from_forecast(data, feature)
+        try:
+            parameters = data["features"][feature]["properties"]["parameters"]
+            steps = range(len(series))
+            if dataset.rain_parameter in parameters:
+                rain_data = parameters[dataset.rain_parameter]["data"]
+                series.columns["rain"] = array(
+                    "d", (dataset.rain(rain_data, idx) for idx in steps)
+                )
+            u_name, v_name = dataset.wind_parameters
+            if u_name in parameters and v_name in parameters:
+                u_data = parameters[u_name]["data"]
+                v_data = parameters[v_name]["data"]
+                series.columns["wind_speed"] = array(
+                    "d", (dataset.wind_speed(u_data, v_data, idx) for idx in steps)
+                )
+        except (TypeError, ValueError, IndexError) as exc:
+            raise ZamgNoDataError(exc) from exc
+        self._series_cache[key] = (data, series)
+        return series
+
+    def _forecast_index(self, dataset: ZamgDataset, data: dict) -> int:
+        """Return the index of the current/next timestamp.
+
+        If there is no timestamp equal or after "now", the last one is used.
+        """
+        series = self._forecast_series(dataset, data)
+        now_utc = datetime.now(UTC).replace(second=0, microsecond=0)
+        index, _ = series.bounds(now_utc)
+        return min(index, len(series) - 1)
+
     def get_forecast_current(
         self,
         forecast_data: dict | None = None,
-        parameters: tuple[str, ...] = (
-            "t2m",
-            "rh2m",
-            "u10m",
-            "v10m",
-            "tcc",
-            "sy",
-            "rr_acc",
-        ),
+        parameters: tuple[str, ...] | None = None,
+        dataset: ZamgDataset | None = None,
     ) -> dict:
         """Return selected forecast parameters for the current/next timestamp.
 
         If there is no timestamp equal to "now", the next available one is used.
         """
+        dataset = dataset or self.forecast_dataset
+        if parameters is None:
+            parameters = dataset.current_parameters
         try:
-            data = forecast_data if forecast_data is not None else self.data_forecast
-            timestamps = data["timestamps"]
-            parsed_timestamps = [
-                datetime.strptime(timestamp, "%Y-%m-%dT%H:%M%z")
-                for timestamp in timestamps
-            ]
-
-            now_utc = datetime.now(zoneinfo.ZoneInfo("UTC")).replace(
-                second=0, microsecond=0
-            )
-            index = next(
-                (
-                    idx
-                    for idx, timestamp in enumerate(parsed_timestamps)
-                    if timestamp >= now_utc
-                ),
-                len(parsed_timestamps) - 1,
+            data = (
+                forecast_data
+                if forecast_data is not None
+                else self._forecasts.get(dataset.name, {})
             )
+            timestamps = data["timestamps"]
+            index = self._forecast_index(dataset, data)
 
             forecast_parameters = data["features"][0]["properties"]["parameters"]
 
@@ -120,50 +284,43 @@ class ZamgData:
             for parameter in parameters:
                 result[parameter] = forecast_parameters[parameter]["data"][index]
 
-            # Derive hourly rain from accumulated precipitation.
-            prev_index = max(index - 1, 0)
-            rr_acc = forecast_parameters["rr_acc"]["data"][index]
-            rr_acc_prev = forecast_parameters["rr_acc"]["data"][prev_index]
-            result["rr_acc_prev"] = rr_acc_prev
-            rain = round(rr_acc - rr_acc_prev, 3)
-            result["rain"] = rain if rain >= 0 else rr_acc
-            # Calculate wind speed from u10m and v10m components.
-            u10m = forecast_parameters["u10m"]["data"][index]
-            v10m = forecast_parameters["v10m"]["data"][index]
-            wind_speed = round(
-                (u10m**2 + v10m**2) ** 0.5 * 3.6, 1
-            )  # Convert from m/s to km/h
-            result["wind_speed"] = wind_speed
+            # Derive the rain of this step from the precipitation parameter.
+            rain_data = forecast_parameters[dataset.rain_parameter]["data"]
+            if dataset.rain_accumulated:
+                result[f"{dataset.rain_parameter}_prev"] = rain_data[max(index - 1, 0)]
+            result["rain"] = dataset.rain(rain_data, index)
+            # Calculate wind speed from the wind components.
+            u_name, v_name = dataset.wind_parameters
+            result["wind_speed"] = dataset.wind_speed(
+                forecast_parameters[u_name]["data"],
+                forecast_parameters[v_name]["data"],
+                index,
+            )
 
             return result
         except (TypeError, ValueError, KeyError, IndexError) as exc:
             raise ZamgNoDataError(exc) from exc
 
-    def _get_forecast_from_now(self, forecast_data: dict | None = None) -> dict:
+    def _get_forecast_from_now(
+        self,
+        forecast_data: dict | None = None,
+        dataset: ZamgDataset | None = None,
+    ) -> dict:
         """Return forecast payload trimmed to timestamps from now onward."""
+        dataset = dataset or self.forecast_dataset
         try:
-            data = forecast_data if forecast_data is not None else self.data_forecast
-            timestamps = data["timestamps"]
-            parsed_timestamps = [
-                datetime.strptime(timestamp, "%Y-%m-%dT%H:%M%z")
-                for timestamp in timestamps
-            ]
-
-            now_utc = datetime.now(zoneinfo.ZoneInfo("UTC")).replace(
-                second=0, microsecond=0
-            )
-            index = next(
-                (
-                    idx
-                    for idx, timestamp in enumerate(parsed_timestamps)
-                    if timestamp >= now_utc
-                ),
-                len(parsed_timestamps) - 1,
+            data = (
+                forecast_data
+                if forecast_data is not None
+                else self._forecasts.get(dataset.name, {})
             )
+            timestamps = data["timestamps"]
+            index = self._forecast_index(dataset, data)
 
             trimmed_data = dict(data)
             trimmed_data["timestamps"] = timestamps[index:]
 
+            u_name, v_name = dataset.wind_parameters
             trimmed_features = []
             for feature in data["features"]:
                 trimmed_feature = dict(feature)
@@ -177,30 +334,25 @@ class ZamgData:
                     trimmed_parameters[parameter_name] = trimmed_parameter_values
 
                 # Derive rain and wind_speed for each remaining forecast step.
-                rr_acc_data = parameters["rr_acc"]["data"]
-                rain_data = []
-                for idx in range(index, len(rr_acc_data)):
-                    prev_idx = max(idx - 1, 0)
-                    rr_acc = rr_acc_data[idx]
-                    rr_acc_prev = rr_acc_data[prev_idx]
-                    rain = round(rr_acc - rr_acc_prev, 3)
-                    rain_data.append(rain if rain >= 0 else rr_acc)
+                rain_data = parameters[dataset.rain_parameter]["data"]
                 trimmed_parameters["rain"] = {
-                    "name": "hourly rain",
+                    "name": dataset.rain_name,
                     "unit": "kg m-2",
-                    "data": rain_data,
+                    "data": [
+                        dataset.rain(rain_data, idx)
+                        for idx in range(index, len(rain_data))
+                    ],
                 }
 
-                u10m_data = parameters["u10m"]["data"]
-                v10m_data = parameters["v10m"]["data"]
-                wind_speed_data = [
-                    round((u10m_data[idx] ** 2 + v10m_data[idx] ** 2) ** 0.5 * 3.6, 1)
-                    for idx in range(index, len(u10m_data))
-                ]
+                u_data = parameters[u_name]["data"]
+                v_data = parameters[v_name]["data"]
                 trimmed_parameters["wind_speed"] = {
                     "name": "10m wind speed",
                     "unit": "km h-1",
-                    "data": wind_speed_data,
+                    "data": [
+                        dataset.wind_speed(u_data, v_data, idx)
+                        for idx in range(index, len(u_data))
+                    ],
                 }
 
                 properties["parameters"] = trimmed_parameters
@@ -212,37 +364,176 @@ class ZamgData:
         except (TypeError, ValueError, KeyError, IndexError) as exc:
             raise ZamgNoDataError(exc) from exc
 
-    async def zamg_stations(self) -> dict[str:(float, float, str)]:
-        """Return {station_id: (lat, lon, name)} for all public data stations.
-        In addition we also get all possible readable parameters for a station."""
-
-        def _to_float(val: str) -> str | float:
+    def _cache(self, name: str, hit: bool) -> None:
+        """Report a cache lookup to metrics."""
+        if self.metrics is not None:
+            self.metrics.cache(name, hit)
+
+    def _decode(self, url: str, contents: bytes):
+        """Decode a JSON response body."""
+        import json  # pylint: disable=import-outside-toplevel
+
+        if self.metrics is None:
+            return json.loads(contents)
+        start = time.perf_counter()
+        result = json.loads(contents)
+        self.metrics.decode(endpoint_name(url), time.perf_counter() - start)
+        return result
+
+    def _retry_delay(self, attempt: int, retry_after: str | None = None) -> float:
+        """Return the delay before retry attempt, honoring Retry-After."""
+        if retry_after is not None:
             try:
-                return float(val.replace(",", "."))
+                return min(float(retry_after), MAX_RETRY_DELAY)
             except ValueError:
-                return val
+                pass
+        return min(self.retry_backoff * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+
+    def _attempt_timeout(self, attempt: int) -> float:
+        """Return the timeout of a request attempt.
+
+        Within a deadline the remaining time is split evenly across the
+        attempts left, so a hanging attempt leaves time for the retries.
+        """
+        left = remaining()
+        if left is None:
+            return self.request_timeout
+        return max(
+            min(self.request_timeout, left / (self.max_retries - attempt + 1)), 0
+        )
+
+    def _may_retry(self, attempt: int, delay: float) -> bool:
+        """Return True if a retry after delay is allowed and fits the deadline."""
+        left = remaining()
+        return attempt < self.max_retries and (left is None or delay < left)
+
+    async def _get(self, url: str, revalidate: bool = False) -> tuple[int, bytes]:
+        """Fetch url and return the response status and body.
+
+        The body is only read for successful (200/301) responses. Connection
+        errors, timeouts and RETRY_STATUSES are retried up to max_retries
+        times, within the deadline of the call (see zamg.deadline). The
+        response is released even if the call is cancelled.
+        With revalidate, the ETag and Last-Modified validators of the
+        response are stored and sent with the next request of url, which
+        is answered with 304 and no body if nothing changed; the caller
+        has to reuse its parsed data then.
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        import aiohttp
+        import async_timeout
+
+        if self.session is None:
+            trace_configs = (
+                [self.metrics.trace_config()] if self.metrics is not None else None
+            )
+            self.session = aiohttp.client.ClientSession(trace_configs=trace_configs)
+            self._close_session = True
+
+        metrics = self.metrics
+        headers = self.headers
+        validators = self._validators.get(url) if revalidate else None
+        if validators is not None:
+            headers = dict(headers)
+            etag, last_modified = validators
+            if etag is not None:
+                headers["If-None-Match"] = etag
+            if last_modified is not None:
+                headers["If-Modified-Since"] = last_modified
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                waited = await self.rate_limiter.acquire()
+                if metrics is not None and waited:
+                    metrics.rate_limit_wait(waited)
+            start = time.perf_counter() if metrics is not None else 0.0
+            try:
+                async with async_timeout.timeout(self._attempt_timeout(attempt)):
+                    response = await self.session.get(
+                        url=url,
+                        allow_redirects=True,
+                        headers=headers,
+                        verify_ssl=self.verify_ssl,
+                    )
+            except (*_retried_errors(), asyncio.TimeoutError) as exc:
+                delay = self._retry_delay(attempt + 1)
+                if not self._may_retry(attempt, delay):
+                    raise
+                attempt += 1
+                if metrics is not None:
+                    metrics.retry(endpoint_name(url), attempt, type(exc).__name__)
+                await asyncio.sleep(delay)
+                continue
+            if response.status in RETRY_STATUSES:
+                delay = self._retry_delay(
+                    attempt + 1, response.headers.get("Retry-After")
+                )
+                if self._may_retry(attempt, delay):
+                    response.close()
+                    attempt += 1
+                    if metrics is not None:
+                        metrics.retry(endpoint_name(url), attempt, str(response.status))
+                    await asyncio.sleep(delay)
+                    continue
+            break
+
+        try:
+            contents = b""
+            if response.status in (200, 301):
+                left = remaining()
+                async with async_timeout.timeout(
+                    None if left is None else max(left, 0)
+                ):
+                    contents = await response.read()
+                if revalidate:
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    if etag is not None or last_modified is not None:
+                        self._validators[url] = (etag, last_modified)
+        finally:
+            # a response left unread on cancellation would keep its connection
+            response.close()
+        if validators is not None:
+            not_modified = response.status == HTTPStatus.NOT_MODIFIED
+            if not_modified:
+                self.revalidations += 1
+            self._cache("revalidation", not_modified)
+        if metrics is not None:
+            metrics.request(
+                endpoint_name(url),
+                response.status,
+                time.perf_counter() - start,
+                len(contents),
+            )
+        return response.status, contents
+
+    @bounded
+    async def zamg_stations(
+        self, refresh: bool = False
+    ) -> dict[str:(float, float, str)]:
+        """Return {station_id: (lat, lon, name)} for all public data stations.
+        In addition we also get all possible readable parameters for a station.
+        The metadata is loaded once, with refresh it is revalidated and only
+        downloaded again if it changed."""
 
-        if self._stations is not None:
+        if self._stations is not None and not refresh:
+            self._cache("stations", True)
             return self._stations
+        self._cache("stations", False)
 
         try:
-            if self.session is None:
-                self.session = aiohttp.client.ClientSession()
-                self._close_session = True
-
-            async with async_timeout.timeout(self.request_timeout):
-                response = await self.session.get(
-                    url=self.forecast_metadata_url,
-                    allow_redirects=True,
-                    headers=self.headers,
-                    verify_ssl=self.verify_ssl,
+            with share(0.5):
+                status, contents = await self._get(
+                    self.forecast_metadata_url, revalidate=True
+                )
+            if status in (200, 301):
+                self._forecast_metadata = self._decode(
+                    self.forecast_metadata_url, contents
                 )
-            if response.status in (200, 301):
-                contents = await response.read()
-                response.close()
-                self._forecast_metadata = json.loads(contents)
                 # extract all possible parameters
-                parameter_list = json.loads(contents)["parameters"]
+                parameter_list = self._forecast_metadata["parameters"]
                 station_parameters = ""
                 for parameter in parameter_list:
                     station_parameters += parameter["name"] + ","
@@ -252,50 +543,117 @@ class ZamgData:
                 if self.forecast_parameters is None:
                     self.forecast_parameters = station_parameters
 
-            async with async_timeout.timeout(self.request_timeout):
-                response = await self.session.get(
-                    url=self.dataset_metadata_url,
-                    allow_redirects=True,
-                    headers=self.headers,
-                    verify_ssl=self.verify_ssl,
-                )
-            if response.status in (200, 301):
-                contents = await response.read()
-                response.close()
-                # extract all possible parameters
-                parameter_list = json.loads(contents)["parameters"]
-                station_parameters = ""
-                for parameter in parameter_list:
-                    station_parameters += parameter["name"] + ","
-                station_parameters = station_parameters.rstrip(station_parameters[-1])
-                self._all_station_parameters = station_parameters
-                # also set default station parameter to read
-                if self.station_parameters is None:
-                    self.station_parameters = station_parameters
-                # extract all stations out of parameters
-                station_list = json.loads(contents)["stations"]
-                stations = {}
-                for station in station_list:
-                    stations[station["id"]] = tuple(
-                        _to_float(str(station[coord]))
-                        for coord in ("lat", "lon", "name")
+            status, contents = await self._get(
+                self.dataset_metadata_url, revalidate=True
+            )
+            if status == HTTPStatus.NOT_MODIFIED and self._stations is not None:
+                return self._stations
+            if status in (200, 301):
+                metadata = self._decode(self.dataset_metadata_url, contents)
+                start = time.perf_counter()
+                stations = self._store_station_metadata(metadata)
+                if self.metrics is not None:
+                    self.metrics.process(
+                        endpoint_name(self.dataset_metadata_url),
+                        time.perf_counter() - start,
                     )
-                self._stations = stations
                 return stations
 
-        except (
-            ClientConnectorError,
-            ServerTimeoutError,
-            ServerDisconnectedError,
-        ) as exc:
+        except _retried_errors() as exc:
             raise ZamgApiError(exc) from exc
         except ValueError as exc:
             raise ZamgNoDataError(exc) from exc
 
+    def _store_station_metadata(self, metadata: dict) -> dict:
+        """Store the parameters and stations of a station metadata payload."""
+
+        def _to_float(val: str) -> str | float:
+            try:
+                return float(val.replace(",", "."))
+            except ValueError:
+                return val
+
+        # extract all possible parameters
+        parameter_list = metadata["parameters"]
+        station_parameters = ""
+        for parameter in parameter_list:
+            station_parameters += parameter["name"] + ","
+        station_parameters = station_parameters.rstrip(station_parameters[-1])
+        self._all_station_parameters = station_parameters
+        # also set default station parameter to read
+        if self.station_parameters is None:
+            self.station_parameters = station_parameters
+        # extract all stations out of parameters
+        station_list = metadata["stations"]
+        stations = {}
+        for station in station_list:
+            stations[station["id"]] = tuple(
+                _to_float(str(station[coord])) for coord in ("lat", "lon", "name")
+            )
+        self._stations = stations
+        self._registry = StationRegistry(station_list)
+        return stations
+
+    @property
+    def station_registry(self) -> StationRegistry | None:
+        """Return the columnar registry of all stations, see zamg_stations()."""
+        return self._registry
+
+    @bounded
+    async def snapshot(
+        self,
+        station_ids: list[str] | None = None,
+        parameters: list[str] | None = None,
+    ) -> StationSnapshot:
+        """Update several stations and return their observations column wise.
+
+        Default are all stations of the registry, they are updated with
+        update_stations(). The snapshot offers aggregate queries over all
+        stations, e.g. snapshot.aggregate("FFX", by="state").
+        """
+        if self._registry is None:
+            with share(0.5):
+                await self.zamg_stations()
+        if self._registry is None:
+            raise ZamgStationUnknownError("Failed to load station metadata")
+        if station_ids is None:
+            station_ids = list(self._registry.ids)
+        await self.update_stations(station_ids)
+        from .snapshot import StationSnapshot  # pylint: disable=import-outside-toplevel
+
+        return StationSnapshot.from_data(
+            self._registry,
+            {
+                station_id: self.data[station_id]
+                for station_id in station_ids
+                if station_id in self.data
+            },
+            parameters,
+            {
+                station_id: self._timestamps[station_id]
+                for station_id in station_ids
+                if station_id in self._timestamps
+            },
+        )
+
+    @bounded
+    async def closest_values(
+        self, lat: float, lon: float, parameters: list[str]
+    ) -> dict[str, tuple[str, float] | None]:
+        """Return the value of the closest station reporting it per parameter.
+
+        All stations are updated with batched requests once, see snapshot().
+        Result is {parameter: (station_id, value)}, None if no station
+        reports a parameter.
+        """
+        snapshot = await self.snapshot(parameters=parameters)
+        return snapshot.resolve(lat, lon, parameters)
+
     @property
     def forecast_metadata(self) -> dict | None:
         return getattr(self, "_forecast_metadata", None)
 
+    @bounded
     async def closest_station(self, lat: float, lon: float) -> str:
         """Return the station_id of the closest station to our lat/lon."""
 
@@ -319,6 +677,8 @@ class ZamgData:
         - data: default, data value of parameter
         - name: name of parameter
         - unit: data value unit of parameter"""
+        if self.planner is not None:
+            self.planner.record(self, self._station_id, parameter)
         try:
             return self.data[self._station_id][parameter][data_type]
         except KeyError as exc:
@@ -382,6 +742,49 @@ class ZamgData:
         except (KeyError, TypeError) as exc:
             raise ZamgStationUnknownError(exc) from exc
 
+    def set_api_url(self, api_url: str) -> None:
+        """Use another dataset API, e.g. a local stand-in or proxy.
+
+        api_url is the base url like https://dataset.api.hub.geosphere.at/v1
+        and applies to the station and all forecast datasets.
+        """
+        api_url = api_url.rstrip("/")
+        self.dataset_metadata_url = f"{api_url}/station/current/tawes-v1-10min/metadata"
+        self.dataset_data_url = f"{api_url}/station/current/tawes-v1-10min?parameters="
+        self.historical_url = f"{api_url}/station/historical/"
+        self.forecast_dataset = replace(
+            self.forecast_dataset,
+            api_url=api_url,
+            custom_metadata_url=None,
+            custom_data_url=None,
+        )
+        self.nowcast_dataset = replace(
+            self.nowcast_dataset,
+            api_url=api_url,
+            custom_metadata_url=None,
+            custom_data_url=None,
+        )
+
+    def dump_state(self) -> bytes:
+        """Return metadata, observations, history and forecasts as bytes.
+
+        Restore them with load_state(), e.g. after a restart. The format is
+        a versioned binary format, see zamg.state.
+        """
+        from .state import dump_state  # pylint: disable=import-outside-toplevel
+
+        return dump_state(self)
+
+    def load_state(self, state: bytes) -> None:
+        """Restore the state returned by dump_state().
+
+        The restored timestamps keep their meaning, so update() and
+        get_forecast() only fetch data which is due anyway.
+        """
+        from .state import load_state  # pylint: disable=import-outside-toplevel
+
+        load_state(self, state)
+
     def set_default_station(self, station_id: str):
         """Set the default station_id for update()."""
         self._station_id = station_id
@@ -400,117 +803,448 @@ class ZamgData:
             return datetime.strptime(self._timestamp_forecast, "%Y-%m-%dT%H:%M%z")
         return None
 
+    @bounded
     async def update(self) -> dict | None:
         """Return a list of all current observations of the default station id."""
         if self._station_id == "":
             return None
+        if self.warmer is not None:
+            self.warmer.record(self)
         if self.last_update and (
-            self.last_update + timedelta(minutes=5)
-            > datetime.now(zoneinfo.ZoneInfo("UTC"))
+            self.last_update + timedelta(minutes=5) > datetime.now(UTC)
+            or (self.warmer is not None and self.warmer.is_warm(self))
         ):
+            self._cache("observations", True)
             return (
                 self.data
             )  # Not time to update yet; we are just reading every 5 minutes
+        self._cache("observations", False)
+        return await self.refresh_observations()
+
+    @bounded
+    async def refresh_observations(self) -> dict:
+        """Fetch and return the current observations of the default station id.
+
+        Unlike update() the update interval is not checked.
+        """
         try:
-            # initialize station parameters
-            if self.station_parameters is None:
+            await self._refresh_observations()
+            return self.data
+        except (*_connection_errors(), ZamgApiError) as exc:
+            raise ZamgApiError(exc) from exc
+        except (TypeError, ValueError, KeyError, IndexError) as exc:
+            raise ZamgNoDataError(exc) from exc
+
+    async def _refresh_observations(self) -> None:
+        """Fetch the current observations of the default station."""
+        # initialize station parameters
+        if self.station_parameters is None:
+            with share(0.5):
                 await self.zamg_stations()
+        if self.station_parameters is None:
+            raise ZamgApiError("Failed to initialize station parameters from metadata")
+
+        if self.planner is not None:
+            station_id = self._station_id
+            timestamp, observations = await self.planner.fetch_observations(
+                self, station_id
+            )
+            self._store_observations(
+                station_id,
+                timestamp,
+                self.planner.project(
+                    observations,
+                    self.planner.station_parameters(self, station_id),
+                ),
+            )
+            self._timestamp = timestamp
+        elif self.coalescer is None:
+            await self._fetch_observations([self._station_id])
+        else:
+            station_id = self._station_id
+            timestamp, observations = await self.coalescer.fetch(self, station_id)
+            self._store_observations(station_id, timestamp, observations)
+            self._timestamp = timestamp
+
+    async def _fetch_observations(self, station_ids: list[str]) -> list[str]:
+        """Fetch the current observations of station_ids in one request.
+
+        Return the ids of the parsed stations. If the response body is
+        identical to the previous response of the same request, it is not
+        parsed again and an empty list is returned.
+        """
+        url = self._observations_url(station_ids)
+        status, contents = await self._get(url, revalidate=True)
+        if status == HTTPStatus.NOT_MODIFIED:
+            if all(station_id in self.data for station_id in station_ids):
+                return []
+            status, contents = await self._get(url)
+        if status not in (200, 301):
+            raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+        import hashlib  # pylint: disable=import-outside-toplevel
+
+        digest = hashlib.blake2b(contents, digest_size=16).digest()
+        if self._payload_hashes.get(url) == digest and all(
+            station_id in self.data for station_id in station_ids
+        ):
+            self._cache("observations_payload", True)
+            return []
+        self._cache("observations_payload", False)
+
+        payload = self._decode(url, contents)
+        start = time.perf_counter() if self.metrics is not None else 0.0
+        timestamp, stations = self._parse_observations(payload, station_ids)
+        for station_id, observations in stations.items():
+            self._store_observations(station_id, timestamp, observations)
+        self._timestamp = timestamp
+        self._payload_hashes[url] = digest
+        if self.metrics is not None:
+            self.metrics.process(endpoint_name(url), time.perf_counter() - start)
+        return list(stations)
+
+    def _observations_url(self, station_ids: list[str]) -> str:
+        """Return the url of the current observations of station_ids."""
+        return (
+            self.dataset_data_url
+            + str(self.station_parameters)
+            + "&station_ids="
+            + ",".join(station_ids)
+        )
+
+    @staticmethod
+    def _parse_observations(
+        payload: dict, station_ids: list[str]
+    ) -> tuple[str, dict[str, dict]]:
+        """Return (timestamp, {station_id: observations}) of a payload."""
+        timestamp = payload["timestamps"][0]
+        stations = {}
+        for idx, feature in enumerate(payload["features"]):
+            properties = feature["properties"]
+            station_id = str(properties.get("station", station_ids[idx]))
+            observations = {}
+            for parameter, values in properties["parameters"].items():
+                # only the latest value is requested, so unpack the single slot
+                observations[parameter] = dict(values, data=values["data"][0])
+            stations[station_id] = observations
+        return timestamp, stations
+
+    def _store_observations(
+        self, station_id: str, timestamp: str, observations: dict
+    ) -> None:
+        """Store the parsed observations of a station."""
+        self.data[station_id] = observations
+        self._timestamps[station_id] = timestamp
+        self._record_history(station_id, timestamp)
+
+    async def _update_stations(self, station_ids: list[str]) -> list[str]:
+        """Update station_ids and return the ids of the parsed stations."""
+        station_ids = list(dict.fromkeys(station_ids))
+        try:
+            if self.station_parameters is None:
+                with share(0.5):
+                    await self.zamg_stations()
             if self.station_parameters is None:
                 raise ZamgApiError(
                     "Failed to initialize station parameters from metadata"
                 )
-
-            if self.session is None:
-                self.session = aiohttp.client.ClientSession()
-                self._close_session = True
-
-            async with async_timeout.timeout(self.request_timeout):
-                response = await self.session.get(
-                    url=self.dataset_data_url
-                    + str(self.station_parameters)
-                    + "&station_ids="
-                    + str(self._station_id),
-                    allow_redirects=True,
-                    headers=self.headers,
-                    verify_ssl=self.verify_ssl,
+            size = self.max_stations_per_request
+            results = await _gather(
+                *(
+                    self._fetch_observations(station_ids[idx : idx + size])
+                    for idx in range(0, len(station_ids), size)
                 )
-            if response.status in (200, 301):
-                contents = await response.read()
-                response.close()
+            )
+            return [station_id for parsed in results for station_id in parsed]
+        except (*_connection_errors(), ZamgApiError) as exc:
+            raise ZamgApiError(exc) from exc
+        except (TypeError, ValueError, KeyError, IndexError) as exc:
+            raise ZamgNoDataError(exc) from exc
 
-                observations = json.loads(contents)["features"][0]["properties"][
-                    "parameters"
-                ]
+    @bounded
+    async def update_stations(self, station_ids: list[str]) -> dict:
+        """Update the current observations of several stations.
 
-                self._timestamp = json.loads(contents)["timestamps"][0]
+        Stations are fetched in chunks of max_stations_per_request, the
+        chunks are requested concurrently. Return data, which is keyed by
+        station id.
+        """
+        await self._update_stations(station_ids)
+        return self.data
 
-                self.data[self._station_id] = dict(observations)
+    async def watch(
+        self, station_ids: list[str] | None = None, interval: float = 60.0
+    ) -> AsyncIterator[ZamgChange]:
+        """Poll station_ids every interval seconds and yield changed values.
 
-                for observation in observations:
-                    # hack to put data into one single slot, maybe there are easier solutions, but hey it works ;-)
-                    self.data[self._station_id][observation]["data"] = self.data[
-                        self._station_id
-                    ][observation]["data"][0]
+        The first poll yields every value. No request is sent until the
+        newest data of every station is older than the observation cadence,
+        and a payload identical to the previous one is neither parsed nor
+        diffed. Default is the default station.
 
-                return self.data
-            raise ZamgApiError(f"Got status {response.status} from GeoSphere Austria")
-        except (ClientConnectorError, ServerTimeoutError, ZamgApiError) as exc:
-            raise ZamgApiError(exc) from exc
-        except (TypeError, ValueError, KeyError) as exc:
+            async for change in zamg.watch(["11240", "11035"]):
+                print(change.station_id, change.parameter, change.value)
+        """
+        # pylint: disable=import-outside-toplevel
+        import asyncio
+
+        from .changes import diff_observations
+
+        station_ids = list(station_ids or [self._station_id])
+        previous: dict[str, dict[str, float | None]] = {}
+        first = True
+        while True:
+            now = datetime.now(UTC)
+            if first or any(
+                station_id not in self._timestamps
+                or datetime.strptime(self._timestamps[station_id], "%Y-%m-%dT%H:%M%z")
+                + OBSERVATION_CADENCE
+                <= now
+                for station_id in station_ids
+            ):
+                parsed = await self._update_stations(station_ids)
+                if first:
+                    # data may have been loaded before by update()
+                    parsed = [sid for sid in station_ids if sid in self.data]
+                    first = False
+                current = {
+                    station_id: {
+                        parameter: values["data"]
+                        for parameter, values in self.data[station_id].items()
+                    }
+                    for station_id in parsed
+                }
+                for change in diff_observations(previous, current, self._timestamps):
+                    yield change
+                previous.update(current)
+            await asyncio.sleep(interval)
+
+    def _record_history(self, station_id: str, timestamp: str) -> None:
+        """Append the current observations of a station to its history."""
+        if self.history_size <= 0:
+            return
+        series = self.history.get(station_id)
+        if series is None:
+            series_class = CompressedSeries if self.compress_history else TimeSeries
+            series = self.history[station_id] = series_class(self.history_size)
+        series.append(
+            parse_epoch(timestamp),
+            {
+                parameter: values["data"]
+                for parameter, values in self.data[station_id].items()
+            },
+        )
+
+    def forecast_window(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        parameters: list[str] | tuple[str, ...] | None = None,
+        dataset: ZamgDataset | None = None,
+        feature: int = 0,
+        resample: timedelta | None = None,
+        how: str | dict[str, str] = "mean",
+    ) -> SeriesWindow:
+        """Return the cached forecast between start (incl.) and end (excl.).
+
+        The bounds are found by binary search on the parsed timestamps and
+        the returned series are views on the parsed forecast, not copies.
+        Derived rain and wind_speed series are included. If resample is set,
+        the window is aggregated into buckets of that size using how, e.g.
+        resample=timedelta(hours=3), how={"rain": "sum"}.
+        """
+        dataset = dataset or self.forecast_dataset
+        data = self._forecasts.get(dataset.name)
+        if not data:
+            raise ZamgNoDataError(f"No forecast of {dataset.name} loaded")
+        window = self._forecast_series(dataset, data, feature).window(
+            start, end, parameters
+        )
+        if resample is not None:
+            return window.resample(resample, how)
+        return window
+
+    def history_window(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        parameters: list[str] | tuple[str, ...] | None = None,
+        station_id: str | None = None,
+        resample: timedelta | None = None,
+        how: str | dict[str, str] = "mean",
+    ) -> SeriesWindow:
+        """Return the stored observations between start (incl.) and end (excl.).
+
+        Same as forecast_window(), but for the observation history of a
+        station collected by update(), default is the default station.
+        """
+        station_id = station_id or self._station_id
+        try:
+            series = self.history[station_id]
+        except KeyError as exc:
             raise ZamgNoDataError(exc) from exc
-
+        window = series.window(start, end, parameters)
+        if resample is not None:
+            return window.resample(resample, how)
+        return window
+
+    def _forecast_parameters_for(self, dataset: ZamgDataset) -> str:
+        """Return the comma separated parameter list to request for dataset."""
+        if dataset is self.forecast_dataset and self.forecast_parameters:
+            return self.forecast_parameters
+        return ",".join(dataset.default_parameters)
+
+    @bounded
     async def get_forecast(
-        self, lat_lon: str | None = None, current_only: bool = False
+        self,
+        lat_lon: str | list[str] | None = None,
+        current_only: bool = False,
+        dataset: ZamgDataset | None = None,
     ) -> dict | None:
-        """Return a list of all current observations of the default station id."""
-        if self.last_forecast_update and (
-            self.last_forecast_update + timedelta(minutes=5)
-            > datetime.now(zoneinfo.ZoneInfo("UTC"))
+        """Return the forecast of a location from now onward.
+
+        lat_lon may also be a list of "lat,lon" strings to fetch several
+        locations in one request, each location is one feature of the result.
+        If no dataset is given, forecast_dataset is used.
+        """
+        dataset = dataset or self.forecast_dataset
+        if self.warmer is not None:
+            self.warmer.record(self, dataset, lat_lon)
+        timestamp = self._forecast_timestamps.get(dataset.name)
+        if timestamp and (
+            datetime.strptime(timestamp, "%Y-%m-%dT%H:%M%z") + dataset.refresh_interval
+            > datetime.now(UTC)
+            or (self.warmer is not None and self.warmer.is_warm(self, dataset, lat_lon))
         ):
+            # Not time to update yet; we are just reading every refresh_interval
+            self._cache(f"forecast {dataset.name}", True)
             if current_only:
-                return self.get_forecast_current()
-            return (
-                self._get_forecast_from_now()
-            )  # Not time to update yet; we are just reading every 5 minutes
+                return self.get_forecast_current(dataset=dataset)
+            return self._get_forecast_from_now(dataset=dataset)
+        self._cache(f"forecast {dataset.name}", False)
         try:
+            if lat_lon is None:
+                station_lat, station_lon = self.get_station_location
+                lat_lon = f"{station_lat},{station_lon}"
+            await self.fetch_forecast(lat_lon, dataset)
+            start = time.perf_counter() if self.metrics is not None else 0.0
+            if current_only:
+                result = self.get_forecast_current(dataset=dataset)
+            else:
+                result = self._get_forecast_from_now(dataset=dataset)
+            if self.metrics is not None:
+                self.metrics.process(
+                    endpoint_name(dataset.data_url), time.perf_counter() - start
+                )
+            return result
+        except (*_connection_errors(), ZamgApiError) as exc:
+            raise ZamgApiError(exc) from exc
+        except (TypeError, ValueError, KeyError) as exc:
+            raise ZamgNoDataError(exc) from exc
 
-            if self.session is None:
-                self.session = aiohttp.client.ClientSession()
-                self._close_session = True
+    @bounded
+    async def fetch_forecast(
+        self, lat_lon: str | list[str], dataset: ZamgDataset | None = None
+    ) -> dict:
+        """Fetch and return the complete forecast payload of locations.
 
-            async with async_timeout.timeout(self.request_timeout):
-                forecast_params = (
-                    self.forecast_parameters or "t2m,rr_acc,u10m,v10m,tcc,sy,rh2m"
-                )
-                if lat_lon is None:
-                    station_lat, station_lon = self.get_station_location
-                    lat_lon = f"{station_lat},{station_lon}"
-                response = await self.session.get(
-                    url=self.forecast_url + forecast_params + "&lat_lon=" + lat_lon,
-                    allow_redirects=True,
-                    headers=self.headers,
-                    verify_ssl=self.verify_ssl,
-                )
-            if response.status in (200, 301):
-                contents = await response.read()
-                response.close()
-
-                self.data_forecast = json.loads(contents)
-                self._timestamp_forecast = (
-                    datetime.now(zoneinfo.ZoneInfo("UTC"))
-                    .replace(second=0, microsecond=0)
-                    .strftime("%Y-%m-%dT%H:%M%z")
+        Unlike get_forecast() the refresh interval is not checked and the
+        payload is returned as sent, with one feature per location. It is
+        also stored as the last forecast of the dataset.
+        """
+        dataset = dataset or self.forecast_dataset
+        if isinstance(lat_lon, str):
+            lat_lon = [lat_lon]
+        if self.planner is not None:
+            try:
+                payload = self.planner.project_forecast(
+                    await self.planner.fetch_forecast(self, lat_lon, dataset),
+                    self.planner.forecast_parameters(self, dataset),
                 )
-                if current_only:
-                    return self.get_forecast_current()
-                return self._get_forecast_from_now()
+            except _connection_errors() as exc:
+                raise ZamgApiError(exc) from exc
+            except ValueError as exc:
+                raise ZamgNoDataError(exc) from exc
+            self._store_forecast(dataset, payload, lat_lon)
+            return payload
+        url = (
+            dataset.data_url
+            + self._forecast_parameters_for(dataset)
+            + "".join(f"&lat_lon={point}" for point in lat_lon)
+        )
+        try:
+            status, contents = await self._get(url, revalidate=True)
+            cached = self._forecast_urls.get(dataset.name)
+            if status == HTTPStatus.NOT_MODIFIED:
+                if cached is not None and cached[0] == url:
+                    self._store_forecast(dataset, cached[1], lat_lon)
+                    return cached[1]
+                status, contents = await self._get(url)
+            if status not in (200, 301):
+                raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+            payload = self._decode(url, contents)
+        except _connection_errors() as exc:
+            raise ZamgApiError(exc) from exc
+        except ValueError as exc:
+            raise ZamgNoDataError(exc) from exc
+        self._forecast_urls[dataset.name] = (url, payload)
+        self._store_forecast(dataset, payload, lat_lon)
+        return payload
+
+    def _store_forecast(
+        self, dataset: ZamgDataset, payload: dict, lat_lon: list[str]
+    ) -> None:
+        """Store payload as the last forecast of dataset, of locations lat_lon."""
+        self._forecasts[dataset.name] = payload
+        self._forecast_locations[dataset.name] = lat_lon
+        self._forecast_timestamps[dataset.name] = (
+            datetime.now(UTC)
+            .replace(second=0, microsecond=0)
+            .strftime("%Y-%m-%dT%H:%M%z")
+        )
+
+    @bounded
+    async def get_historical(
+        self,
+        station_ids: list[str],
+        start: datetime,
+        end: datetime,
+        parameters: list[str],
+        resource: str = HISTORICAL_RESOURCE,
+    ) -> dict:
+        """Fetch and return the historical observations of stations.
 
-            raise ZamgApiError(f"Got status {response.status} from GeoSphere Austria")
-        except (ClientConnectorError, ServerTimeoutError, ZamgApiError) as exc:
+        Returns the payload as sent, with the timestamps between start and
+        end and one feature per station. Historical resources use their own
+        parameter names, e.g. "tl" instead of "TL" for klima-v2-10min.
+        """
+        url = (
+            f"{self.historical_url}{resource}?parameters={','.join(parameters)}"
+            f"&station_ids={','.join(station_ids)}"
+            f"&start={start.strftime(HISTORICAL_TIME_FORMAT)}"
+            f"&end={end.strftime(HISTORICAL_TIME_FORMAT)}"
+        )
+        try:
+            status, contents = await self._get(url)
+            if status not in (200, 301):
+                raise ZamgApiError(f"Got status {status} from GeoSphere Austria")
+            return self._decode(url, contents)
+        except _connection_errors() as exc:
             raise ZamgApiError(exc) from exc
-        except (TypeError, ValueError, KeyError) as exc:
+        except ValueError as exc:
             raise ZamgNoDataError(exc) from exc
 
+    @bounded
+    async def get_nowcast(
+        self, lat_lon: str | list[str] | None = None, current_only: bool = False
+    ) -> dict | None:
+        """Return the INCA nowcast of a location from now onward.
+
+        Same as get_forecast(), but using nowcast_dataset.
+        """
+        return await self.get_forecast(
+            lat_lon, current_only=current_only, dataset=self.nowcast_dataset
+        )
+
     async def __aenter__(self) -> ZamgData:
         """Async enter.
 
@@ -0,0 +1,60 @@
+"""Tests GeoSphere Austria update coalescing."""  # fmt: skip
+import asyncio
+
+import aiohttp
+import pytest
+
+from src.zamg.coalesce import UpdateCoalescer
+from src.zamg.exceptions import ZamgApiError, ZamgNoDataError
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+def _clients(session, server, station_ids, coalescer):
+    clients = []
+    for station_id in station_ids:
+        zamg = ZamgData(station_id, session=session)
+        zamg.set_api_url(server.api_url)
+        zamg.set_parameters(["TL", "P"])
+        zamg.coalescer = coalescer
+        clients.append(zamg)
+    return clients
+
+
+@pytest.mark.asyncio
+async def test_coalesce_updates() -> None:
+    """Test concurrent updates of many instances sharing requests."""
+
+    coalescer = UpdateCoalescer(window=0.01, max_stations=4)
+    station_ids = [f"110{idx:02d}" for idx in range(10)]
+    async with StandinServer(stations=10, parameters=5) as server:
+        async with aiohttp.ClientSession() as session:
+            clients = _clients(session, server, station_ids + ["11000"], coalescer)
+            await asyncio.gather(*(zamg.update() for zamg in clients))
+            assert server.requests == coalescer.requests == 3
+            for zamg, station_id in zip(clients, station_ids):
+                assert set(zamg.data) == {station_id}
+                assert zamg.last_update is not None
+                assert len(zamg.history[station_id]) == 1
+            assert clients[-1].get_data("TL") == clients[0].get_data("TL")
+
+            # a station missing in the response
+            unknown = _clients(session, server, ["11000"], coalescer)[0]
+            unknown._parse_observations = lambda payload, ids: ("", {})
+            with pytest.raises(ZamgNoDataError):
+                await unknown.update()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_errors() -> None:
+    """Test a failing batch request reaching every caller."""
+
+    coalescer = UpdateCoalescer()
+    async with StandinServer(stations=5, parameters=5, error_rate=1.0) as server:
+        async with aiohttp.ClientSession() as session:
+            clients = _clients(session, server, ["11000", "11001"], coalescer)
+            results = await asyncio.gather(
+                *(zamg.update() for zamg in clients), return_exceptions=True
+            )
+    assert all(isinstance(result, ZamgApiError) for result in results)
+    assert server.requests == 1
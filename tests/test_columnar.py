@@ -0,0 +1,113 @@
+"""Tests GeoSphere Austria columnar exports."""  # fmt: skip
+import math
+import sys
+from array import array
+from datetime import datetime, timezone
+
+import pytest
+
+from src.zamg.series import TimeSeries
+from src.zamg.snapshot import StationSnapshot
+from src.zamg.stations import StationRegistry
+
+START = int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _series() -> TimeSeries:
+    series = TimeSeries()
+    for idx in range(4):
+        series.append(START + 600 * idx, {"TL": None if idx == 1 else float(idx)})
+    return series
+
+
+def _snapshot() -> StationSnapshot:
+    registry = StationRegistry(
+        [
+            {"id": "11240", "lat": 47.0, "lon": 15.4, "altitude": 340},
+            {"id": "11035", "lat": 48.2, "lon": 16.4, "altitude": 200},
+        ]
+    )
+    return StationSnapshot(registry, {"TL": array("d", [8.5, math.nan])})
+
+
+def test_missing_dependency(monkeypatch) -> None:
+    """Test the extra to install is named if a dependency is missing."""
+
+    for module in ("numpy", "pyarrow", "pandas"):
+        monkeypatch.setitem(sys.modules, module, None)
+    window = _series().window()
+    with pytest.raises(ImportError, match=r"zamg\[numpy\]"):
+        window.to_numpy()
+    with pytest.raises(ImportError, match=r"zamg\[arrow\]"):
+        _snapshot().to_arrow()
+    with pytest.raises(ImportError, match=r"zamg\[pandas\]"):
+        window.to_pandas()
+
+
+def test_to_numpy() -> None:
+    """Test NumPy arrays share the buffers of the series."""
+
+    numpy = pytest.importorskip("numpy")
+    series = _series()
+    arrays = series.window(START + 600).to_numpy()
+    assert arrays["time"][0] == numpy.datetime64(START + 600, "s")
+    assert numpy.isnan(arrays["TL"][0])
+    assert arrays["TL"][1:].tolist() == [2.0, 3.0]
+    assert numpy.shares_memory(arrays["TL"], numpy.frombuffer(series.columns["TL"]))
+
+    arrays = _snapshot().to_numpy()
+    assert arrays["station"].tolist() == ["11240", "11035"]
+    assert arrays["altitude"].tolist() == [340.0, 200.0]
+    assert arrays["TL"][0] == 8.5
+
+
+def test_exports_survive_append() -> None:
+    """Test exported columns and the series staying intact after appending."""
+
+    numpy = pytest.importorskip("numpy")
+    series = _series()
+    column = series.window().to_numpy()["TL"]
+    series.append(START + 2400, {"TL": 4.0})
+    assert column.tolist()[2:] == [2.0, 3.0]
+    assert series.epochs.tolist() == [START + 600 * idx for idx in range(5)]
+    arrays = series.window(START + 1200).to_numpy()
+    assert arrays["TL"].tolist() == [2.0, 3.0, 4.0]
+    assert not numpy.shares_memory(column, arrays["TL"])
+
+
+def test_arrow_export_survives_append() -> None:
+    """Test an exported Arrow column staying intact after appending."""
+
+    pytest.importorskip("pyarrow")
+    series = _series()
+    column = series.window().to_arrow().column("TL")
+    series.append(START + 2400, {"TL": 4.0})
+    assert column.to_pylist()[2:] == [2.0, 3.0]
+    assert series.window(START + 1800).data["TL"].tolist() == [3.0, 4.0]
+    assert len(series.columns["TL"]) == len(series.epochs) == 5
+
+
+def test_to_arrow() -> None:
+    """Test Arrow tables of windows and snapshots."""
+
+    pytest.importorskip("pyarrow")
+    table = _series().window().to_arrow()
+    assert table.column_names == ["time", "TL"]
+    assert table.column("TL").to_pylist()[2:] == [2.0, 3.0]
+    assert table.column("time")[0].as_py() == datetime.fromtimestamp(
+        START, timezone.utc
+    )
+    table = _snapshot().to_arrow()
+    assert table.column("station").to_pylist() == ["11240", "11035"]
+
+
+def test_to_pandas() -> None:
+    """Test pandas frames of windows and snapshots."""
+
+    pytest.importorskip("pandas")
+    frame = _series().window().to_pandas()
+    assert list(frame.columns) == ["TL"]
+    assert str(frame.index.tz) == "UTC"
+    assert frame["TL"].iloc[3] == 3.0
+    frame = _snapshot().to_pandas()
+    assert frame.loc["11240", "TL"] == 8.5
@@ -0,0 +1,168 @@
+"""Tests GeoSphere Austria compressed time series."""  # fmt: skip
+import math
+import random
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.zamg.compressed import (
+    CompressedSeries,
+    decode_epochs,
+    decode_values,
+    encode_epochs,
+    encode_values,
+)
+from src.zamg.exceptions import ZamgNoDataError
+from src.zamg.series import TIMESTAMP_FORMAT, TimeSeries
+from src.zamg.zamg import ZamgData
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _same(first, second) -> bool:
+    return len(first) == len(second) and all(
+        a == b or (math.isnan(a) and math.isnan(b)) for a, b in zip(first, second)
+    )
+
+
+def _observations(length: int, seed: int = 0) -> list[tuple[int, dict]]:
+    rnd = random.Random(seed)
+    epoch = int(START.timestamp())
+    temperature = 5.0
+    result = []
+    for _ in range(length):
+        epoch += 600 if rnd.random() > 0.02 else 1200
+        temperature = round(temperature + rnd.gauss(0.0, 0.2), 1)
+        result.append(
+            (
+                epoch,
+                {
+                    "TL": None if rnd.random() < 0.05 else temperature,
+                    "RR": 0.0 if rnd.random() < 0.9 else round(rnd.uniform(0, 2), 1),
+                    "SO": rnd.choice((0, 600)),
+                },
+            )
+        )
+    return result
+
+
+def test_encode_epochs() -> None:
+    """Test delta-of-delta encoding of regular and irregular timestamps."""
+
+    regular = array("q", range(0, 600 * 256, 600))
+    encoded = encode_epochs(regular)
+    assert len(encoded) <= 256 // 8 + 3
+    assert decode_epochs(0, encoded, len(regular)) == regular
+
+    irregular = array("q", [-5, 0, 600, 601, 10**12, 10**12 + 1, -(2**40)])
+    encoded = encode_epochs(irregular)
+    assert decode_epochs(-5, encoded, len(irregular)) == irregular
+
+
+def test_encode_values() -> None:
+    """Test XOR encoding of decimals, arbitrary floats and nulls."""
+
+    for values in (
+        [12.3, 12.3, 12.4, -3.1, None, 0.0, 1013.25],
+        [math.pi, 1e300, None, -2.5, 5e-324],
+        [None, None, None],
+        [],
+    ):
+        column = array("d", (math.nan if value is None else value for value in values))
+        decimals, bitmap, data = encode_values(column)
+        assert _same(decode_values(decimals, bitmap, data, len(column)), column)
+
+    decimals, _, data = encode_values(array("d", [4.0] * 100))
+    assert decimals == 0
+    assert len(data) <= 21  # 64 bits for the first value, one bit per repeat
+    assert encode_values(array("d", [math.pi]))[0] == -1
+
+
+@pytest.mark.parametrize("max_length", [None, 300, 1000])
+def test_compressed_series(max_length: int | None) -> None:
+    """Test a compressed series holds the same data as a TimeSeries."""
+
+    compressed = CompressedSeries(max_length, block_size=64)
+    plain = TimeSeries(max_length)
+    observations = _observations(1000)
+    for epoch, values in observations:
+        compressed.append(epoch, values)
+        plain.append(epoch, values)
+    compressed.append(observations[-1][0], {"TL": 99.0})
+    assert len(compressed) == len(plain)
+
+    start = observations[-250][0]
+    end = observations[-30][0]
+    for bounds in ((None, None), (start, end), (start, None)):
+        window = compressed.window(*bounds)
+        expected = plain.window(*bounds)
+        assert window.epochs.tolist() == expected.epochs.tolist()
+        for name in ("TL", "RR", "SO"):
+            assert _same(window.data[name], expected.data[name])
+    assert len(compressed.window(end=observations[0][0])) == 0
+    with pytest.raises(ZamgNoDataError):
+        compressed.window(parameters=["XX"])
+
+    restored = compressed.to_series()
+    assert restored.epochs == plain.epochs
+    assert _same(restored.columns["TL"], plain.columns["TL"])
+
+
+def test_compressed_series_size() -> None:
+    """Test the compression of typical observations."""
+
+    compressed = CompressedSeries()
+    observations = _observations(6 * 24 * 28)
+    for epoch, values in observations:
+        compressed.append(epoch, values)
+    uncompressed = len(observations) * 8 * 4
+    assert compressed.nbytes * 5 < uncompressed
+
+    epochs, columns = compressed.decode_block(0)
+    assert epochs.tolist() == [epoch for epoch, _ in observations[:256]]
+    assert columns["SO"].tolist() == [
+        float(values["SO"]) for _, values in observations[:256]
+    ]
+
+
+def test_compressed_new_parameters() -> None:
+    """Test parameters appearing after the first blocks."""
+
+    compressed = CompressedSeries(block_size=4)
+    for idx in range(10):
+        values = {"TL": float(idx)}
+        if idx >= 6:
+            values["P"] = 1000.0 + idx
+        compressed.append(
+            int((START + timedelta(minutes=10 * idx)).timestamp()), values
+        )
+    window = compressed.window(parameters=["P"])
+    assert all(math.isnan(value) for value in window.data["P"][:6])
+    assert window.data["P"][6:].tolist() == [1006.0, 1007.0, 1008.0, 1009.0]
+    with pytest.raises(ValueError):
+        CompressedSeries(block_size=1)
+
+
+def test_compressed_default_history() -> None:
+    """Test the default history size being compressed."""
+
+    zamg = ZamgData("11240")
+    zamg.compress_history = True
+    observations = _observations(zamg.history_size)
+    for epoch, values in observations:
+        zamg.data["11240"] = {
+            name: {"name": name, "unit": "", "data": value}
+            for name, value in values.items()
+        }
+        timestamp = datetime.fromtimestamp(epoch, timezone.utc)
+        zamg._record_history(  # pylint: disable=protected-access
+            "11240", timestamp.strftime(TIMESTAMP_FORMAT)
+        )
+    history = zamg.history["11240"]
+    assert isinstance(history, CompressedSeries)
+    assert history.block_size == zamg.history_size // 2
+    assert len(history.blocks) == 2 and len(history) == zamg.history_size
+    assert history.nbytes * 3 < len(observations) * 8 * 4
+    assert CompressedSeries().block_size == 256
+    assert CompressedSeries(10_000).block_size == 256
@@ -0,0 +1,67 @@
+"""Tests GeoSphere Austria deadlines."""  # fmt: skip
+import asyncio
+import time
+
+import pytest
+
+from src.zamg.deadline import deadline, detached, remaining, share
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+def test_deadline_nesting() -> None:
+    """Test nested deadlines only getting shorter."""
+
+    assert remaining() is None
+    with deadline(10.0):
+        assert 9.0 < remaining() <= 10.0
+        with deadline(20.0):
+            assert remaining() <= 10.0
+        with deadline(None), share(0.5):
+            assert 4.0 < remaining() <= 5.0
+        with detached():
+            assert remaining() is None
+        with deadline(1.0):
+            assert remaining() <= 1.0
+    assert remaining() is None
+
+
+@pytest.mark.asyncio
+async def test_call_timeout() -> None:
+    """Test a call exceeding its timeout releasing its connection."""
+
+    async with StandinServer(stations=5, latency=0.2) as server:
+        async with ZamgData("11000") as zamg:
+            zamg.set_api_url(server.api_url)
+            start = time.perf_counter()
+            with pytest.raises(asyncio.TimeoutError):
+                await zamg.zamg_stations(timeout=0.05)
+            assert time.perf_counter() - start < 0.15
+            connector = zamg.session.connector
+            assert not connector._acquired  # pylint: disable=protected-access
+
+            # the session stays usable
+            server.latency = 0.0
+            await zamg.zamg_stations(timeout=5.0)
+            assert zamg.station_registry is not None
+
+
+@pytest.mark.asyncio
+async def test_inherited_deadline() -> None:
+    """Test calls sharing the deadline of their context."""
+
+    async with StandinServer(stations=5, latency=0.03) as server:
+        async with ZamgData("11000") as zamg:
+            zamg.set_api_url(server.api_url)
+            with deadline(1.0):
+                await zamg.zamg_stations()
+                await zamg.update()
+            assert "11000" in zamg.data
+
+        async with ZamgData("11000") as zamg:
+            zamg.set_api_url(server.api_url)
+            with pytest.raises(asyncio.TimeoutError), deadline(0.08):
+                # metadata (two requests) and observations do not fit
+                await zamg.update()
+            connector = zamg.session.connector
+            assert not connector._acquired  # pylint: disable=protected-access
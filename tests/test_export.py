@@ -0,0 +1,147 @@
+"""Tests GeoSphere Austria bulk export."""  # fmt: skip
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.zamg.export import (
+    RowWriter,
+    _read_points,
+    export_forecast,
+    export_history,
+    main,
+    ordered,
+)
+from src.zamg.standin import StandinServer
+from src.zamg.sync import background_loop
+from src.zamg.zamg import ZamgData
+
+
+@pytest.mark.asyncio
+async def test_export_forecast() -> None:
+    """Test exporting forecasts of several points as CSV."""
+
+    points = [f"47.{idx},15.{idx}" for idx in range(5)]
+    stream = io.StringIO()
+    async with StandinServer(stations=5, parameters=5, forecast_steps=4) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            writer = RowWriter(stream, "csv")
+            await export_forecast(
+                zamg, writer, points, zamg.nowcast_dataset, points_per_request=2
+            )
+        assert server.requests == 3
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert writer.rows == len(rows) == 5 * 4
+    assert [row["lat_lon"] for row in rows[::4]] == points
+    assert {"timestamp", "t2m", "rain", "wind_speed"} <= set(rows[0])
+
+
+@pytest.mark.asyncio
+async def test_export_history() -> None:
+    """Test exporting a historical range in chunks."""
+
+    stream = io.StringIO()
+    async with StandinServer(stations=5, parameters=5) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            zamg.max_stations_per_request = 1
+            await export_history(
+                zamg,
+                RowWriter(stream),
+                ["11000", "11001"],
+                ["tl", "rr"],
+                datetime(2024, 1, 1, tzinfo=timezone.utc),
+                datetime(2024, 1, 1, 1, tzinfo=timezone.utc),
+                chunk=datetime(2024, 1, 1, 0, 30) - datetime(2024, 1, 1),
+                concurrency=2,
+            )
+        assert server.requests == 4
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(rows) == 2 * 6
+    assert [row["timestamp"][11:16] for row in rows if row["station"] == "11000"] == [
+        "00:00",
+        "00:10",
+        "00:20",
+        "00:30",
+        "00:40",
+        "00:50",
+    ]
+    assert set(rows[0]) == {"station", "timestamp", "tl", "rr"}
+
+
+def test_export_cli(capsys) -> None:
+    """Test the command line export of current observations."""
+    loop = background_loop()
+    server = StandinServer(stations=250, parameters=5)
+    loop.run(server.start())
+    try:
+        main(["--api-url", server.api_url, "current", "--parameters", "TL,P"])
+    finally:
+        loop.run(server.stop())
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(rows) == 250
+    assert set(rows[0]) == {"station", "timestamp", "TL", "P"}
+    # metadata and three chunks of at most 100 stations
+    assert server.requests == 2 + 3
+
+
+@pytest.mark.parametrize("chunk_days", ["0", "-1", "nan"])
+def test_export_cli_rejects_chunk_days(capsys, chunk_days: str) -> None:
+    """Test history chunks which are not positive being rejected."""
+    with pytest.raises(SystemExit):
+        main(
+            [
+                "history",
+                "--stations=11240",
+                "--parameters=tl",
+                "--start=2024-01-01",
+                "--end=2024-01-02",
+                f"--chunk-days={chunk_days}",
+            ]
+        )
+    assert "is not positive" in capsys.readouterr().err
+    with pytest.raises(ValueError):
+        asyncio.run(
+            export_history(
+                ZamgData(),
+                RowWriter(io.StringIO(), "ndjson"),
+                ["11240"],
+                ["tl"],
+                datetime(2024, 1, 1, tzinfo=timezone.utc),
+                datetime(2024, 1, 2, tzinfo=timezone.utc),
+                chunk=timedelta(0),
+            )
+        )
+
+
+@pytest.mark.asyncio
+async def test_ordered_window() -> None:
+    """Test results in order with a bounded number of scheduled requests."""
+    started = []
+    head = asyncio.Event()
+
+    async def _request(idx: int) -> list[dict]:
+        started.append(idx)
+        if idx == 0:
+            await head.wait()  # a slow head of line request
+        return [{"idx": idx}]
+
+    results = ordered((_request(idx) for idx in range(100)), concurrency=3)
+    first = asyncio.ensure_future(results.__anext__())
+    await asyncio.sleep(0.01)
+    assert len(started) == 6  # 2 * concurrency scheduled, not all 100
+    head.set()
+    rows = [await first] + [rows async for rows in results]
+    assert [row["idx"] for row, in rows] == list(range(100))
+
+
+def test_read_points_from_stdin(monkeypatch) -> None:
+    """Test reading points from stdin without closing it."""
+    stdin = io.StringIO("# lat,lon\n47.0, 15.4, Graz\n\n48.2,16.3\n")
+    monkeypatch.setattr("sys.stdin", stdin)
+    assert _read_points("-") == ["47.0,15.4", "48.2,16.3"]
+    assert not stdin.closed
@@ -0,0 +1,63 @@
+"""Tests GeoSphere Austria load driver."""  # fmt: skip
+import aiohttp
+import pytest
+
+from src.zamg.loadtest import percentile, run_load
+from src.zamg.replay import RecordingSession, ReplaySession
+from src.zamg.standin import StandinServer
+
+
+def test_percentile() -> None:
+    """Test percentile calculation."""
+
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 50) is None
+
+
+@pytest.mark.asyncio
+async def test_run_load() -> None:
+    """Test a short load test against the stand-in."""
+
+    async with StandinServer(stations=10, parameters=5, error_rate=0.5) as server:
+        report = await run_load(server.api_url, clients=3, duration=0.3)
+    result = report.as_dict()
+    assert result["clients"] == 3
+    assert result["requests"] > 0
+    assert result["latency_s"]["p50"] is not None
+    assert result["loop_lag_s"]["max"] is not None
+    assert report.requests == len(report.latencies) + sum(report.errors.values())
+    with pytest.raises(ValueError):
+        await run_load(server.api_url, scenario="nope")
+
+
+@pytest.mark.asyncio
+async def test_replayed_load() -> None:
+    """Test replaying the responses of a recorded load test."""
+
+    async with StandinServer(stations=3, parameters=5) as server:
+        recorder = RecordingSession(aiohttp.ClientSession())
+        report = await run_load(
+            server.api_url, clients=2, duration=0.2, session=recorder
+        )
+        await recorder.close()
+    assert not report.errors
+
+    replay = ReplaySession(recorder.dump(), latency_scale=0.0)
+    report = await run_load(server.api_url, clients=2, duration=0.2, session=replay)
+    assert report.requests > 0 and not report.errors
+
+
+@pytest.mark.asyncio
+async def test_revalidate_scenario() -> None:
+    """Test only the revalidate scenario sending conditional requests."""
+
+    async with StandinServer(stations=3, parameters=5) as server:
+        await run_load(server.api_url, clients=2, duration=0.2, scenario="mixed")
+        assert server.statuses[304] == 0
+        report = await run_load(
+            server.api_url, clients=2, duration=0.2, scenario="revalidate"
+        )
+    assert not report.errors
+    assert server.statuses[304] > 0
@@ -0,0 +1,132 @@
+"""Tests GeoSphere Austria metrics."""  # fmt: skip
+import asyncio
+import json
+import pathlib
+
+import pytest
+
+from src.zamg.exceptions import ZamgApiError
+from src.zamg.metrics import (
+    Histogram,
+    InMemoryMetrics,
+    OpenTelemetryMetrics,
+    PrometheusMetrics,
+    endpoint_name,
+)
+from src.zamg.ratelimit import RateLimiter
+from src.zamg.zamg import ZamgData
+
+DATA_STATION = json.loads(
+    pathlib.Path(__file__)
+    .parent.joinpath("data_station.json")
+    .read_text(encoding="utf-8")
+)
+
+
+def test_endpoint_name() -> None:
+    """Test endpoint names of API urls."""
+
+    assert (
+        endpoint_name(
+            "https://dataset.api.hub.geosphere.at/v1/station/current/tawes-v1-10min"
+            "?parameters=TL&station_ids=11240"
+        )
+        == "station/current/tawes-v1-10min"
+    )
+
+
+def test_histogram() -> None:
+    """Test histogram buckets."""
+
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.as_dict() == {
+        "count": 4,
+        "sum": 3.65,
+        "buckets": {"0.1": 2, "1.0": 1, "+Inf": 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_metrics_update(aresponses) -> None:
+    """Test metrics of requests, retries and cache lookups."""
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        aresponses.Response(text="busy", status=503, headers={"Retry-After": "0"}),
+    )
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        response=DATA_STATION,
+    )
+
+    metrics = InMemoryMetrics()
+    async with ZamgData("11240") as zamg:
+        zamg.metrics = metrics
+        zamg.max_retries = 1
+        zamg.set_parameters(["TL", "P"])
+        await zamg.update()
+        zamg._timestamp = None
+        zamg._payload_hashes.clear()
+        assert zamg.get_data("TL") == 8.6
+
+    result = metrics.as_dict()
+    endpoint = "station/current/tawes-v1-10min"
+    assert result["retries"] == {endpoint: 1}
+    assert result["statuses"] == {f"{endpoint} 200": 1}
+    assert result["latency"][endpoint]["count"] == 1
+    assert result["bytes_received"][endpoint] > 0
+    assert result["decode_time"][endpoint]["count"] == 1
+    assert result["process_time"][endpoint]["count"] == 1
+    assert result["cache_misses"] == {"observations": 1, "observations_payload": 1}
+    assert result["connections"]["create"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted(aresponses) -> None:
+    """Test a failing request after all retries."""
+    for _ in range(2):
+        aresponses.add(
+            "dataset.api.hub.geosphere.at",
+            "/v1/station/current/tawes-v1-10min",
+            "GET",
+            aresponses.Response(text="error", status=500),
+        )
+
+    async with ZamgData("11240") as zamg:
+        zamg.max_retries = 1
+        zamg.retry_backoff = 0.0
+        zamg.set_parameters(["TL"])
+        with pytest.raises(ZamgApiError):
+            await zamg.update()
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter() -> None:
+    """Test waiting for the rate limiter."""
+
+    limiter = RateLimiter(rate=100.0, burst=1)
+    assert await limiter.acquire() == 0.0
+    assert await limiter.acquire() > 0.0
+
+    # the time queued behind other callers counts as waiting
+    limiter = RateLimiter(rate=20.0, burst=1)
+    waits = await asyncio.gather(*(limiter.acquire() for _ in range(3)))
+    assert waits[0] == 0.0
+    assert waits[2] >= 0.09 and waits[2] > waits[1] >= 0.04
+    with pytest.raises(ValueError):
+        RateLimiter(rate=0)
+
+
+def test_optional_adapters() -> None:
+    """Test adapters without their optional dependencies."""
+
+    for adapter in (PrometheusMetrics, OpenTelemetryMetrics):
+        try:
+            adapter()
+        except ImportError:
+            pass
@@ -0,0 +1,72 @@
+"""Tests GeoSphere Austria parameter planning."""  # fmt: skip
+import asyncio
+
+import aiohttp
+import pytest
+
+from src.zamg.planner import ParameterPlanner
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+@pytest.mark.asyncio
+async def test_planner_observations() -> None:
+    """Test merging and narrowing the parameters of consumers."""
+
+    planner = ParameterPlanner()
+    async with StandinServer(stations=5, parameters=10) as server:
+        async with aiohttp.ClientSession() as session:
+            first, second = ZamgData("11000", session), ZamgData("11000", session)
+            for zamg, parameters in (
+                (first, ["TL", "P", "RR"]),
+                (second, ["TL", "SO"]),
+            ):
+                zamg.set_api_url(server.api_url)
+                zamg.set_parameters(parameters)
+                zamg.planner = planner
+            await asyncio.gather(first.update(), second.update())
+            assert server.requests == planner.requests == 1
+            assert set(first.data["11000"]) == {"TL", "P", "RR"}
+            assert set(second.data["11000"]) == {"TL", "SO"}
+
+            first.get_data("TL")
+            second.get_data("SO")
+            assert planner.plan(("station", "11000", first.dataset_data_url)) == {
+                "TL",
+                "SO",
+            }
+            # a fresh response holding all parameters is reused
+            first._timestamp = None
+            await first.update()
+            assert server.requests == 1
+
+            planner.max_age = 0
+            first._timestamp = second._timestamp = None
+            await first.update()
+            await second.update()
+            assert planner.requests == 3
+            assert set(first.data["11000"]) == {"TL"}
+            assert set(second.data["11000"]) == {"SO"}
+
+
+@pytest.mark.asyncio
+async def test_planner_forecast() -> None:
+    """Test one forecast request for consumers of the same location."""
+
+    planner = ParameterPlanner()
+    async with StandinServer(stations=5, parameters=10) as server:
+        async with aiohttp.ClientSession() as session:
+            first, second = ZamgData(session=session), ZamgData(session=session)
+            for zamg, parameters in ((first, ["t2m"]), (second, ["tcc", "t2m"])):
+                zamg.set_api_url(server.api_url)
+                zamg.set_forecast_parameters(parameters)
+                zamg.planner = planner
+            results = await asyncio.gather(
+                first.get_forecast("47.0,15.4"), second.get_forecast("47.0,15.4")
+            )
+            assert server.requests == 1
+            first_parameters, second_parameters = (
+                result["features"][0]["properties"]["parameters"] for result in results
+            )
+            assert "tcc" not in first_parameters
+            assert {"t2m", "tcc", "rain", "wind_speed"} <= set(second_parameters)
@@ -0,0 +1,84 @@
+"""Tests GeoSphere Austria record and replay."""  # fmt: skip
+import time
+from datetime import datetime, timezone
+
+import aiohttp
+import pytest
+
+from src.zamg.exceptions import ZamgApiError
+from src.zamg.replay import (
+    RecordingSession,
+    ReplaySession,
+    load_archive,
+    request_key,
+)
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+async def _session_run(zamg: ZamgData) -> tuple:
+    """Run a few client calls and return their results."""
+    stations = await zamg.zamg_stations()
+    zamg.set_default_station("11001")
+    await zamg.update()
+    zamg._timestamp = None  # pylint: disable=protected-access
+    observations = await zamg.update()
+    forecast = await zamg.get_forecast(current_only=True)
+    return stations, observations, forecast
+
+
+def test_request_key() -> None:
+    """Test matching requests independent of the api url."""
+
+    assert request_key("http://127.0.0.1:1234/v1/a?b=1") == "/v1/a?b=1"
+    assert request_key("https://dataset.api.hub.geosphere.at/v1/a") == "/v1/a"
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay() -> None:
+    """Test replaying a recorded session without the server."""
+
+    async with StandinServer(stations=10, parameters=5, latency=0.01) as server:
+        recorder = RecordingSession(aiohttp.ClientSession())
+        zamg = ZamgData(session=recorder)
+        zamg.set_api_url(server.api_url)
+        recorded = await _session_run(zamg)
+        await recorder.close()
+        assert recorder.closed
+    assert server.statuses[304] == 1
+    archive = recorder.dump()
+    responses, bodies = load_archive(archive)
+    assert len(responses) == server.requests
+    assert len(bodies) < len(responses)  # the 304 response has no body
+
+    replay = ReplaySession(archive, latency_scale=0.0)
+    zamg = ZamgData(session=replay)  # the public api url, matched by path
+    assert await _session_run(zamg) == recorded
+    assert replay.requests == len(responses)
+    now = datetime.now(timezone.utc)
+    with pytest.raises(ZamgApiError):
+        await zamg.get_historical(["11001"], now, now, ["tl"])
+
+    replay = ReplaySession(archive)
+    start = time.perf_counter()
+    await ZamgData(session=replay).zamg_stations()
+    assert time.perf_counter() - start >= 0.02  # two metadata requests
+
+
+def test_load_archive_errors() -> None:
+    """Test rejecting foreign and corrupt archives."""
+
+    with pytest.raises(ValueError):
+        load_archive(b"")
+    with pytest.raises(ValueError):
+        load_archive(b"ZAMGSTAT" + bytes(6))
+    archive = RecordingSession(None).dump()
+    assert load_archive(archive) == ([], [])
+    recorder = RecordingSession(None)
+    for _ in range(2):
+        recorder.add("/v1/a", False, 200, [("ETag", '"1"')], b"{}", 0.1, 0.0)
+    responses, bodies = load_archive(recorder.dump())
+    assert [response.body for response in responses] == [0, 0]
+    assert bodies == [b"{}"]
+    with pytest.raises(ValueError):
+        load_archive(archive[:-2])
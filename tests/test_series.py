@@ -0,0 +1,86 @@
+"""Tests GeoSphere Austria time series."""  # fmt: skip
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.zamg.exceptions import ZamgNoDataError
+from src.zamg.series import TimeSeries
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _series(length: int = 6, max_length: int | None = None) -> TimeSeries:
+    series = TimeSeries(max_length)
+    for idx in range(length):
+        epoch = int((START + timedelta(hours=idx)).timestamp())
+        series.append(epoch, {"rr": float(idx), "t2m": None if idx == 2 else 10.0})
+    return series
+
+
+def test_window_bounds() -> None:
+    """Test window uses [start, end) bounds."""
+
+    series = _series()
+    window = series.window(START + timedelta(hours=1), START + timedelta(hours=4))
+    assert len(window) == 3
+    assert window.data["rr"].tolist() == [1.0, 2.0, 3.0]
+    assert window.timestamps[0] == START + timedelta(hours=1)
+    assert math.isnan(window.data["t2m"][1])
+
+
+def test_window_is_view() -> None:
+    """Test window returns views which survive appending to the series."""
+
+    series = _series()
+    window = series.window(parameters=["rr"])
+    assert window.data["rr"].obj is series.columns["rr"]
+    series.append(int((START + timedelta(hours=6)).timestamp()), {"rr": 6.0})
+    assert len(window) == 6
+    assert len(series) == 7
+
+
+def test_window_unknown_parameter() -> None:
+    """Test window with unknown parameter."""
+
+    with pytest.raises(ZamgNoDataError):
+        _series().window(parameters=["nope"])
+
+
+def test_append_max_length_and_new_column() -> None:
+    """Test appending trims the series and pads new parameters."""
+
+    series = _series(max_length=4)
+    series.append(int((START + timedelta(hours=6)).timestamp()), {"sy": 1.0})
+    assert len(series) == 4
+    assert series.columns["rr"].tolist()[:3] == [3.0, 4.0, 5.0]
+    assert math.isnan(series.columns["sy"][0])
+    assert series.columns["sy"][-1] == 1.0
+
+
+def test_resample() -> None:
+    """Test resampling to 3 hour buckets."""
+
+    window = _series().window().resample(timedelta(hours=3), {"rr": "sum"})
+    assert window.epochs.tolist() == [
+        int(START.timestamp()),
+        int((START + timedelta(hours=3)).timestamp()),
+    ]
+    assert window.data["rr"].tolist() == [3.0, 12.0]
+    assert window.data["t2m"].tolist() == [10.0, 10.0]
+    with pytest.raises(ValueError):
+        _series().window().resample(timedelta(hours=3), "median")
+
+
+def test_append_with_exported_column() -> None:
+    """Test appending while only a column view of a window is kept."""
+
+    series = _series(length=3)
+    column = series.window().data["t2m"]
+    series.append(int((START + timedelta(hours=3)).timestamp()), {"rr": 3.0})
+    series.append(int((START + timedelta(hours=4)).timestamp()), {"sy": 1.0})
+    assert len(series.epochs) == 5
+    assert all(len(values) == 5 for values in series.columns.values())
+    assert series.columns["rr"].tolist()[:4] == [0.0, 1.0, 2.0, 3.0]
+    assert math.isnan(series.columns["rr"][4]) and series.columns["sy"][4] == 1.0
+    assert len(column) == 3 and column[0] == 10.0
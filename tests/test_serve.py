@@ -0,0 +1,182 @@
+"""Tests GeoSphere Austria caching proxy."""  # fmt: skip
+# pylint: disable=protected-access
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from src.zamg.serve import SWEEP_INTERVAL, ZamgProxy, normalize_point
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+def test_normalize_point() -> None:
+    """Test rounding of locations."""
+
+    assert normalize_point("47.00004, 15.4") == "47.0,15.4"
+    assert normalize_point("47.12345,15.98765") == "47.123,15.988"
+    with pytest.raises(ValueError):
+        normalize_point("47.0")
+
+
+@pytest.mark.asyncio
+async def test_proxy_serves_clients() -> None:
+    """Test clients using the proxy as their api url."""
+
+    async with StandinServer(stations=20, parameters=10) as server:
+        upstream = ZamgData()
+        upstream.set_api_url(server.api_url)
+        async with ZamgProxy(upstream) as proxy:
+            async with ZamgData() as zamg:
+                zamg.set_api_url(proxy.api_url)
+                stations = await zamg.zamg_stations()
+                assert len(stations) == 20
+                assert len(zamg.get_all_parameters()) == 10
+
+                station_ids = list(stations)[:5]
+                await zamg.update_stations(station_ids)
+                assert set(station_ids) <= set(zamg.data)
+                assert set(zamg.data[station_ids[0]]) == set(zamg.get_parameters())
+
+                zamg.set_default_station(station_ids[0])
+                forecast = await zamg.get_forecast(current_only=True)
+                assert "t2m" in forecast
+                payload = await zamg.fetch_forecast(["47.0,15.4", "48.2,16.3"])
+                assert len(payload["features"]) == 2
+                nowcast = await zamg.get_nowcast("47.0,15.4")
+                assert nowcast
+            requests = server.requests
+
+            # a second client is served out of the cache
+            async with ZamgData() as zamg:
+                zamg.set_api_url(proxy.api_url)
+                await zamg.zamg_stations()
+                await zamg.update_stations(station_ids)
+                await zamg.fetch_forecast(["48.2,16.3", "47.0,15.4"])
+            assert server.requests == requests
+
+
+@pytest.mark.asyncio
+async def test_proxy_batches_concurrent_clients() -> None:
+    """Test concurrent clients causing one upstream request per resource."""
+
+    async with StandinServer(stations=30, parameters=5, latency=0.01) as server:
+        upstream = ZamgData()
+        upstream.set_api_url(server.api_url)
+        async with ZamgProxy(upstream, coalesce_window=0.05) as proxy:
+            clients = [ZamgData() for _ in range(10)]
+            for idx, zamg in enumerate(clients):
+                zamg.set_api_url(proxy.api_url)
+                zamg.set_default_station(str(11000 + idx))
+            await asyncio.gather(*(zamg.zamg_stations() for zamg in clients))
+            assert server.statuses[200] == 2  # station and forecast metadata
+
+            results = await asyncio.gather(*(zamg.update() for zamg in clients))
+            for idx, data in enumerate(results):
+                assert str(11000 + idx) in data
+            assert upstream.coalescer.requests == 1
+
+            forecasts = await asyncio.gather(
+                *(zamg.fetch_forecast("47.0,15.4") for zamg in clients)
+            )
+            assert all(forecast == forecasts[0] for forecast in forecasts)
+            assert server.requests == 4
+            for zamg in clients:
+                await zamg.__aexit__(None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_proxy_lookup_and_errors() -> None:
+    """Test station lookup, parameter projection, errors and revalidation."""
+
+    async with StandinServer(stations=20, parameters=10) as server:
+        upstream = ZamgData()
+        upstream.set_api_url(server.api_url)
+        async with ZamgProxy(upstream) as proxy:
+            async with aiohttp.ClientSession() as session:
+                url = f"{proxy.api_url}/station/closest?lat=47.0&lon=15.4&count=3"
+                async with session.get(url) as response:
+                    closest = (await response.json())["stations"]
+                assert len(closest) == 3
+                registry = upstream.station_registry
+                assert (
+                    closest[0]["id"]
+                    == registry.ids[registry.nearest_order(47.0, 15.4)[0]]
+                )
+
+                url = (
+                    f"{proxy.api_url}/station/current/tawes-v1-10min"
+                    f"?parameters=TL,P&station_ids={closest[0]['id']}"
+                )
+                async with session.get(url) as response:
+                    payload = await response.json()
+                    etag = response.headers["ETag"]
+                parameters = payload["features"][0]["properties"]["parameters"]
+                assert set(parameters) == {"TL", "P"}
+                async with session.get(
+                    url, headers={"If-None-Match": etag}
+                ) as response:
+                    assert response.status == 304
+
+                url = f"{proxy.api_url}/station/current/tawes-v1-10min?station_ids=1"
+                async with session.get(url) as response:
+                    assert response.status == 400
+                url = f"{proxy.api_url}/timeseries/forecast/unknown?lat_lon=47,15"
+                async with session.get(url) as response:
+                    assert response.status == 404
+                url = f"{proxy.api_url}/timeseries/forecast/nwp-v1-1h-2500m?lat_lon=x"
+                async with session.get(url) as response:
+                    assert response.status == 400
+
+    async with StandinServer(stations=5, error_rate=1.0) as server:
+        upstream = ZamgData()
+        upstream.set_api_url(server.api_url)
+        async with ZamgProxy(upstream) as proxy:
+            async with aiohttp.ClientSession() as session:
+                url = f"{proxy.api_url}/station/current/tawes-v1-10min/metadata"
+                async with session.get(url) as response:
+                    assert response.status == 502
+
+
+@pytest.mark.asyncio
+async def test_proxy_bounds_caches(monkeypatch) -> None:
+    """Test evicting forecast locations and remembering stations without data."""
+
+    async with StandinServer(stations=5, parameters=5) as server:
+        upstream = ZamgData()
+        upstream.set_api_url(server.api_url)
+        async with ZamgProxy(upstream, max_forecast_points=3) as proxy:
+            dataset = upstream.forecast_dataset
+            points = [f"47.{idx},15.4" for idx in range(5)]
+            for point in points:
+                payload = await proxy.forecast(dataset, [point], [])
+                assert len(payload["features"]) == 1
+            await proxy.forecast(dataset, points[2:4], [])  # used most recently
+            payload = await proxy.forecast(dataset, points[:2], [])
+            assert len(payload["features"]) == 2
+            assert list(proxy._forecasts) == [
+                (dataset.name, point) for point in points[3:4] + points[:2]
+            ]
+
+            # expired entries are swept
+            proxy._swept -= 2 * SWEEP_INTERVAL
+            monkeypatch.setattr(proxy, "observation_max_age", 0.0)
+            proxy._observed["11000"] = 0.0
+            proxy._sweep(time.monotonic())
+            assert "11000" not in proxy._observed
+
+            # a station without observations is not requested again
+            calls = []
+
+            async def _no_observations(_zamg, station_id):
+                calls.append(station_id)
+                raise KeyError(station_id)
+
+            monkeypatch.setattr(proxy, "observation_max_age", 60.0)
+            monkeypatch.setattr(upstream.coalescer, "fetch", _no_observations)
+            station_id = server.metadata["stations"][0]["id"]
+            for _ in range(2):
+                payload = await proxy.observations([station_id])
+                assert payload["features"] == []
+            assert calls == [station_id]
@@ -0,0 +1,154 @@
+"""Tests GeoSphere Austria sharded forecasts."""  # fmt: skip
+# pylint: disable=protected-access
+import asyncio
+import json
+import math
+import time
+from array import array
+
+import pytest
+from aiohttp import ServerDisconnectedError
+
+from src.zamg import sharded
+from src.zamg.datasets import NWP_FORECAST
+from src.zamg.exceptions import ZamgApiError
+from src.zamg.sharded import ShardedForecaster
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+
+@pytest.mark.asyncio
+async def test_sharded_forecast() -> None:
+    """Test worker processes fetching the same forecasts as one client."""
+
+    points = [f"{47 + idx / 100:.2f},{13 + idx / 100:.2f}" for idx in range(23)]
+    async with StandinServer(stations=5) as server:
+        with ShardedForecaster(
+            workers=2, rate=100.0, api_url=server.api_url, points_per_request=4
+        ) as forecaster:
+            forecast = await forecaster.forecast(points + points[:3])
+            requests = server.requests
+        assert requests == 6  # duplicates are fetched once
+        assert len(forecast) == 26 and forecast.failed == []
+        assert "rain" in forecast.values and "wind_speed" in forecast.values
+
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            payload = await zamg.fetch_forecast(points, zamg.forecast_dataset)
+            start = int(time.time()) // 60 * 60
+            for idx in (0, 5, 22):
+                series = zamg._forecast_series(zamg.forecast_dataset, payload, idx)
+                index, _ = series.bounds(start)
+                assert forecast.epochs == series.epochs[index:]
+                window = forecast.window(idx)
+                for name, column in series.columns.items():
+                    assert window.data[name].tolist() == column[index:].tolist()
+            assert forecast.window(23).data["t2m"] == forecast.window(0).data["t2m"]
+
+
+@pytest.mark.asyncio
+async def test_worker_closes_session() -> None:
+    """Test a worker closing its session and event loop on exit."""
+
+    def _worker_lifetime(api_url: str) -> tuple:
+        sharded._init_worker(None, 0, 10.0)
+        worker = sharded._worker
+        worker.zamg.set_api_url(api_url)
+        dataset = worker.zamg.forecast_dataset
+        blocks, failed = sharded._run_shard(
+            ["47.00,13.00"], dataset, ",".join(dataset.default_parameters), 0, 1, 1
+        )
+        assert len(blocks) == 1 and failed == []
+        session = worker.zamg.session
+        sharded._close_worker()
+        return session, worker.loop
+
+    async with StandinServer(stations=5) as server:
+        session, loop = await asyncio.get_running_loop().run_in_executor(
+            None, _worker_lifetime, server.api_url
+        )
+    assert sharded._worker is None
+    assert session.closed and loop.is_closed()
+
+
+def _in_worker(function, *args):
+    """Run function in a worker state of this process."""
+    sharded._init_worker(None, 0, 10.0)
+    try:
+        return function(sharded._worker, *args)
+    finally:
+        sharded._close_worker()
+
+
+def _disconnecting_shard(worker: sharded._Worker) -> tuple:
+    async def _fetch(points, *_args):
+        if points == ["b"]:
+            raise ServerDisconnectedError()
+        return array("q", [0]).tobytes(), {"t2m": array("d", [1.0]).tobytes()}
+
+    worker._fetch = _fetch
+    return sharded._run_shard(["a", "b", "c"], NWP_FORECAST, "t2m", 0, 1, 2)
+
+
+def _fetch_features(worker: sharded._Worker, features: list[dict]) -> tuple:
+    payload = {
+        "timestamps": ["2024-01-01T00:00+00:00", "2024-01-01T01:00+00:00"],
+        "features": [{"properties": {"parameters": f}} for f in features],
+    }
+
+    async def _get(*_args, **_kwargs):
+        return 200, json.dumps(payload).encode()
+
+    worker.zamg._get = _get
+    points = [f"47.0,{13 + idx}.0" for idx in range(len(features))]
+    return worker.loop.run_until_complete(
+        worker._fetch(points, NWP_FORECAST, "t2m,rh2m", 0)
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_failed_chunks() -> None:
+    """Test dropped connections and malformed features failing their chunk."""
+
+    loop = asyncio.get_running_loop()
+    blocks, failed = await loop.run_in_executor(None, _in_worker, _disconnecting_shard)
+    assert sorted(block[0] for block in blocks) == [0, 2] and failed == ["b"]
+
+    complete = {"t2m": {"data": [1.0, 2.0]}, "rh2m": {"data": [80.0, 81.0]}}
+    epochs, columns = await loop.run_in_executor(
+        None, _in_worker, _fetch_features, [complete, complete]
+    )
+    assert array("d", columns["t2m"]).tolist() == [1.0, 2.0, 1.0, 2.0]
+    assert len(array("q", epochs)) == 2
+    for other in (
+        {"t2m": {"data": [1.0, 2.0]}},
+        {"t2m": {"data": [1.0]}, "rh2m": {"data": [80.0, 81.0]}},
+    ):
+        with pytest.raises(ZamgApiError):
+            await loop.run_in_executor(
+                None, _in_worker, _fetch_features, [complete, other]
+            )
+
+
+def test_merge_aligns_blocks() -> None:
+    """Test blocks of different model runs and failed points being merged."""
+
+    points = ["a", "b", "c"]
+    shards = [(0, 1), (1, 3)]
+    results = [
+        (
+            [(0, 1, array("q", [1, 2]).tobytes(), {"t": array("d", [1, 2]).tobytes()})],
+            [],
+        ),
+        (
+            [(0, 1, array("q", [2, 3]).tobytes(), {"t": array("d", [5, 6]).tobytes()})],
+            ["c"],
+        ),
+    ]
+    forecast = ShardedForecaster._merge(points, points, shards, results)
+    assert forecast.epochs.tolist() == [1, 2, 3]
+    values = [None if math.isnan(value) else value for value in forecast.values["t"]]
+    assert values == [1.0, 2.0, None, None, 5.0, 6.0, None, None, None]
+    assert forecast.failed == ["c"]
+    with pytest.raises(ValueError):
+        ShardedForecaster(points_per_request=0)
@@ -0,0 +1,240 @@
+"""Tests GeoSphere Austria shared snapshots."""  # fmt: skip
+import asyncio
+import multiprocessing
+import os
+from array import array
+
+import pytest
+
+from src.zamg import shared
+from src.zamg.exceptions import ZamgApiError, ZamgNoDataError
+from src.zamg.shared import SharedSnapshotPublisher, SharedZamgData
+from src.zamg.standin import StandinServer
+from src.zamg.zamg import ZamgData
+
+PUBLISHES = 200
+
+
+def _read_in_child(name: str, station_id: str, queue) -> None:
+    async def _read():
+        reader = SharedZamgData(name, station_id)
+        await reader.update()
+        queue.put((reader.get_data("TL"), reader.get_station_name))
+        reader.close()
+
+    asyncio.run(_read())
+
+
+def _publish_in_child(name: str, count: int, published, done) -> None:
+    """Publish count snapshots whose values all equal their generation."""
+    zamg = ZamgData()
+    zamg.data = {
+        str(idx): {parameter: {"data": 0.0} for parameter in ("TL", "P", "RF", "FF")}
+        for idx in range(2000)
+    }
+    with SharedSnapshotPublisher(zamg, name, size=1 << 20) as publisher:
+        for generation in range(1, count + 1):
+            for observations in zamg.data.values():
+                for values in observations.values():
+                    values["data"] = float(generation)
+            zamg._timestamp = str(generation)
+            publisher.publish()
+            published.set()
+        done.wait(30)
+
+
+def _check_in_child(name: str, published, queue) -> None:
+    """Read snapshots until the last one, report inconsistent ones."""
+    published.wait(30)
+    reader = SharedZamgData(name)
+    seen = torn = 0
+    while reader.generation < PUBLISHES:
+        if not reader.refresh():
+            continue
+        seen += 1
+        expected = float(reader.generation)
+        if reader._timestamp != str(reader.generation) or any(
+            value != expected for value in reader._values
+        ):
+            torn += 1
+    reader.close()
+    queue.put((seen, torn))
+
+
+@pytest.mark.asyncio
+async def test_shared_snapshot() -> None:
+    """Test publishing and reading a snapshot."""
+
+    async with StandinServer(stations=20, parameters=10) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            stations = await zamg.zamg_stations()
+            station_ids = list(stations)[:5]
+            await zamg.update_stations(station_ids)
+            forecast = await zamg.get_forecast(["47.0,15.4", "48.2,16.3"])
+
+            with SharedSnapshotPublisher(zamg, size=1 << 20) as publisher:
+                reader = SharedZamgData(publisher.name, station_ids[0])
+                with pytest.raises(ZamgNoDataError):
+                    await reader.update()
+
+                assert publisher.publish() == 1
+                requests = server.requests
+                await reader.update()
+                assert reader.generation == 1
+                assert set(reader.data) == set(station_ids)
+                for parameter in ("TL", "P"):
+                    assert (
+                        reader.get_data(parameter)
+                        == zamg.data[station_ids[0]][parameter]["data"]
+                    )
+                assert reader.get_data("TL", "unit") == "1"
+                assert reader.get_station_name == zamg._stations[station_ids[0]][2]
+                assert await reader.closest_station(47.0, 15.4) == (
+                    await zamg.closest_station(47.0, 15.4)
+                )
+
+                shared_forecast = await reader.get_forecast()
+                assert shared_forecast["timestamps"] == forecast["timestamps"]
+                assert len(shared_forecast["features"]) == 2
+                for shared_feature, feature in zip(
+                    shared_forecast["features"], forecast["features"]
+                ):
+                    for parameter in ("t2m", "rain", "wind_speed"):
+                        assert (
+                            shared_feature["properties"]["parameters"][parameter]
+                            == feature["properties"]["parameters"][parameter]
+                        )
+                assert await reader.get_forecast(current_only=True) == (
+                    zamg.get_forecast_current()
+                )
+                with pytest.raises(ZamgNoDataError):
+                    await reader.get_nowcast()
+                with pytest.raises(ZamgApiError):
+                    await reader._get(server.api_url)
+
+                # network wide queries use the published registry
+                assert reader.station_registry.ids == zamg.station_registry.ids
+                snapshot = await reader.snapshot(parameters=["TL"])
+                assert snapshot.values("TL").tolist()[:5] == [
+                    zamg.data[station_id]["TL"]["data"] for station_id in station_ids
+                ]
+                assert await reader.closest_values(47.0, 15.4, ["TL"]) == (
+                    snapshot.resolve(47.0, 15.4, ["TL"])
+                )
+                assert server.requests == requests
+
+                # readers switch to the latest snapshot, twice to reuse slot 1
+                name = zamg.forecast_dataset.name
+                feature = reader._forecasts[name]["features"][0]
+                view = feature["properties"]["parameters"]["t2m"]["data"]
+                before = view.tolist()
+                zamg.data[station_ids[0]]["TL"] = {
+                    "name": "TL",
+                    "unit": "1",
+                    "data": None,
+                }
+                await zamg.update_stations(list(stations)[5:8])
+                publisher.publish()
+                publisher.publish()
+                reader.set_default_station(station_ids[0])
+                assert reader.get_data("TL") is None
+                assert reader.generation == 3
+                assert len(reader.data) == 8
+                assert view.tolist() == before  # views are not overwritten
+
+                queue = multiprocessing.get_context("spawn").Queue()
+                process = multiprocessing.get_context("spawn").Process(
+                    target=_read_in_child,
+                    args=(publisher.name, station_ids[1], queue),
+                )
+                process.start()
+                value, name = queue.get(timeout=30)
+                process.join()
+                assert value == zamg.data[station_ids[1]]["TL"]["data"]
+                assert name == zamg._stations[station_ids[1]][2]
+                reader.close()
+
+
+def test_publish_too_large() -> None:
+    """Test a snapshot which does not fit the segment."""
+
+    zamg = ZamgData()
+    zamg.data = {
+        str(idx): {"TL": {"name": "TL", "unit": "1", "data": 1.0}} for idx in range(100)
+    }
+    with SharedSnapshotPublisher(zamg, size=1024) as publisher:
+        with pytest.raises(ValueError):
+            publisher.publish()
+
+
+def test_concurrent_publisher_and_reader() -> None:
+    """Test a reader process never seeing a partly written snapshot."""
+
+    context = multiprocessing.get_context("spawn")
+    name = f"zamg-test-{os.getpid()}"
+    published, done = context.Event(), context.Event()
+    queue = context.Queue()
+    publisher = context.Process(
+        target=_publish_in_child, args=(name, PUBLISHES, published, done)
+    )
+    reader = context.Process(target=_check_in_child, args=(name, published, queue))
+    publisher.start()
+    reader.start()
+    try:
+        seen, torn = queue.get(timeout=60)
+    finally:
+        done.set()
+        publisher.join(30)
+        reader.join(30)
+    assert torn == 0
+    assert seen > 1
+
+
+@pytest.mark.parametrize("publishes", [1, 2])
+def test_publish_during_read(monkeypatch, publishes) -> None:
+    """Test a read overlapped by publishes being kept or retried."""
+
+    zamg = ZamgData()
+    zamg.data = {"11240": {"TL": {"data": 1.0}}}
+    with SharedSnapshotPublisher(zamg, size=1 << 16) as publisher:
+        reader = SharedZamgData(publisher.name)
+        publisher.publish()
+
+        class _Overlapped(array):
+            """Values copied while the publisher publishes."""
+
+            overlapped = False
+
+            def frombytes(self, buffer) -> None:
+                if not _Overlapped.overlapped:
+                    _Overlapped.overlapped = True
+                    for _ in range(publishes):
+                        zamg.data["11240"]["TL"]["data"] += 1.0
+                        publisher.publish()
+                super().frombytes(buffer)
+
+        monkeypatch.setattr(shared, "array", _Overlapped)
+        assert reader.refresh()
+        # one publish writes the other slot, the second one overwrites the copy
+        assert reader.generation == 1 + 2 * (publishes - 1)
+        assert reader.data["11240"]["TL"]["data"] == float(reader.generation)
+        reader.close()
+
+
+def test_forecast_without_geometry() -> None:
+    """Test publishing forecast features without a geometry."""
+
+    zamg = ZamgData()
+    zamg._forecasts[zamg.forecast_dataset.name] = {
+        "timestamps": ["2024-01-01T00:00+00:00"],
+        "features": [{"properties": {"parameters": {"t2m": {"data": [1.5]}}}}],
+    }
+    with SharedSnapshotPublisher(zamg, size=1 << 16) as publisher:
+        publisher.publish()
+        reader = SharedZamgData(publisher.name)
+        reader.refresh()
+        feature = reader._forecasts[zamg.forecast_dataset.name]["features"][0]
+        assert feature["properties"]["parameters"]["t2m"]["data"].tolist() == [1.5]
+        assert reader.station_registry is None
+        reader.close()
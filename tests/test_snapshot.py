@@ -0,0 +1,202 @@
+"""Tests GeoSphere Austria station snapshots."""  # fmt: skip
+import json
+import math
+import pathlib
+import random
+
+import pytest
+
+from src.zamg import columnar
+from src.zamg.exceptions import ZamgNoDataError
+from src.zamg.interpolate import StationInterpolator
+from src.zamg.snapshot import StationSnapshot
+from src.zamg.stations import StationRegistry
+
+GUSTS = {"11266": 12.0, "11125": 20.5, "11150": 8.0, "11240": 3.1, "11035": None}
+
+
+@pytest.fixture
+def snapshot() -> StationSnapshot:
+    """Fixture of a snapshot of a few stations of the metadata."""
+    stations = json.loads(
+        pathlib.Path(__file__)
+        .parent.joinpath("data_metadata.json")
+        .read_text(encoding="utf-8")
+    )["stations"]
+    data = {station_id: {"FFX": {"data": value}} for station_id, value in GUSTS.items()}
+    data["unknown"] = {"FFX": {"data": 99.0}}
+    return StationSnapshot.from_data(StationRegistry(stations), data)
+
+
+def test_aggregate_all(snapshot) -> None:
+    """Test aggregating all stations."""
+
+    result = snapshot.aggregate("FFX")
+    assert result == {
+        "all": {"min": 3.1, "max": 20.5, "mean": 10.9, "sum": 43.6, "count": 4}
+    }
+
+
+def test_aggregate_by_state(snapshot) -> None:
+    """Test aggregating by state."""
+
+    result = snapshot.aggregate("FFX", by="state", reductions=("max", "count"))
+    assert result["Tirol"] == {"max": 20.5, "count": 2}
+    assert result["Steiermark"] == {"max": 3.1, "count": 1}
+    assert "Wien" not in result
+    with pytest.raises(ValueError):
+        snapshot.aggregate("FFX", reductions=("median",))
+    with pytest.raises(ValueError):
+        snapshot.aggregate("FFX", by="district")
+
+
+def test_aggregate_by_polygon(snapshot) -> None:
+    """Test aggregating by polygons and caching the assignment."""
+
+    west = {"west": [(46.0, 9.0), (48.0, 9.0), (48.0, 12.5), (46.0, 12.5)]}
+    result = snapshot.aggregate("FFX", by=west)
+    assert result == {
+        "west": {"min": 12.0, "max": 20.5, "mean": 16.25, "sum": 32.5, "count": 2}
+    }
+    assert snapshot.registry.groups(west) is snapshot.registry.groups(dict(west))
+
+
+def test_count_above_and_top(snapshot) -> None:
+    """Test threshold counts and ranking."""
+
+    assert snapshot.count_above("FFX", 10.0) == {"all": 2}
+    assert snapshot.count_above("FFX", 10.0, by="state")["Tirol"] == 2
+    assert snapshot.top("FFX", 2) == [("11125", 20.5), ("11266", 12.0)]
+    assert snapshot.top("FFX", 1, largest=False) == [("11240", 3.1)]
+    with pytest.raises(ZamgNoDataError):
+        snapshot.top("TL")
+
+
+def test_resolve(snapshot) -> None:
+    """Test resolving the closest station with data per parameter."""
+
+    registry = snapshot.registry
+    data = {
+        "11240": {"TL": {"data": 8.6}, "SO": {"data": None}},
+        "11150": {"TL": {"data": 5.0}, "SO": {"data": 600.0}},
+    }
+    snapshot = StationSnapshot.from_data(registry, data)
+    result = snapshot.resolve(46.98, 15.44, ["TL", "SO", "FFX"])
+    assert result == {"TL": ("11240", 8.6), "SO": ("11150", 600.0), "FFX": None}
+    assert snapshot.availability("SO") == 1 << registry.index["11150"]
+    assert registry.nearest_order(46.98, 15.44) is registry.nearest_order(46.98, 15.44)
+
+
+def test_interpolate(snapshot) -> None:
+    """Test inverse distance weighting with neighbours and lapse rate."""
+
+    registry = snapshot.registry
+    graz = registry.index["11240"]
+    points = [
+        (registry.lat[graz], registry.lon[graz]),
+        (47.5, 14.0),
+        (46.0, 8.0),
+    ]
+    result = snapshot.interpolate("FFX", points, neighbours=2)
+    assert result[0] == 3.1  # a station at the point gets all weight
+    values = [value for value in GUSTS.values() if value is not None]
+    for value in result[1:]:
+        assert min(values) <= value <= max(values)
+
+    interpolator = StationInterpolator(registry, points, [0.0, 1000.0, None], 1)
+    nearest = interpolator.interpolate(snapshot, "FFX")
+    assert nearest[0] == 3.1
+    order = registry.nearest_order(46.0, 8.0)
+    available = [
+        idx
+        for idx in order
+        if snapshot.columns["FFX"][idx] == snapshot.columns["FFX"][idx]
+    ]
+    assert nearest[2] == snapshot.columns["FFX"][available[0]]
+
+    corrected = interpolator.interpolate(snapshot, "FFX", lapse_rate=-0.01)
+    offset = (
+        1000.0
+        - registry.altitude[interpolator.plan(snapshot.availability("FFX")).indices[1]]
+    )
+    assert corrected[1] == pytest.approx(nearest[1] - 0.01 * offset)
+    assert math.isnan(corrected[2])
+
+    empty = StationSnapshot.from_data(registry, {}, ["TL"])
+    assert math.isnan(empty.interpolate("TL", points)[1])
+    with pytest.raises(ValueError):
+        StationInterpolator(registry, points).interpolate(snapshot, "FFX", -0.01)
+    with pytest.raises(ValueError):
+        StationInterpolator(StationRegistry([]), points).interpolate(snapshot, "FFX")
+    with pytest.raises(ZamgNoDataError):
+        interpolator.interpolate(snapshot, "TL")
+
+
+def test_interpolate_unlocated_stations() -> None:
+    """Test stations without coordinates never being neighbours."""
+
+    registry = StationRegistry(
+        [
+            {"id": "a", "lat": 47.0, "lon": 15.0},
+            {"id": "b", "lat": None, "lon": None},
+            {"id": "c", "lat": 48.0, "lon": 16.0},
+        ]
+    )
+    snapshot = StationSnapshot.from_data(
+        registry,
+        {
+            station_id: {"TL": {"data": value}}
+            for station_id, value in zip("abc", (1.0, 2.0, 4.0))
+        },
+    )
+    points = [(47.0, 15.0), (48.0, 16.0), (47.5, 15.5)]
+    interpolator = StationInterpolator(registry, points, neighbours=3)
+    plan = interpolator.plan(snapshot.availability("TL"))
+    assert plan.count == 2 and len(plan.indices) == len(plan.weights) == 6
+    result = interpolator.interpolate(snapshot, "TL")
+    assert result[:2].tolist() == [1.0, 4.0]
+    assert 1.0 < result[2] < 4.0
+
+    unlocated = StationRegistry([{"id": "b", "lat": None, "lon": None}])
+    empty = StationSnapshot.from_data(unlocated, {"b": {"TL": {"data": 2.0}}})
+    assert math.isnan(empty.interpolate("TL", points)[0])
+
+
+def _queries(seed: int) -> tuple:
+    """Run all snapshot queries on random stations with ties and gaps."""
+    rnd = random.Random(seed)
+    stations = [
+        {
+            "id": str(idx),
+            "lat": round(rnd.uniform(46.0, 49.0), 1),
+            "lon": round(rnd.uniform(9.0, 17.0), 1),
+            "state": rnd.choice(["Tirol", "Wien", None]),
+        }
+        for idx in range(500)
+    ]
+    data = {
+        station["id"]: {"TL": {"data": rnd.choice([None, float(rnd.randint(0, 20))])}}
+        for station in stations
+    }
+    snapshot = StationSnapshot.from_data(StationRegistry(stations), data)
+    polygons = {
+        "triangle": [(46.0, 9.0), (49.0, 13.0), (46.0, 17.0)],
+        "west": [(46.0, 9.0), (49.0, 9.0), (49.0, 12.0), (46.0, 12.0)],
+    }
+    return (
+        [snapshot.aggregate("TL", by) for by in (None, "state", polygons)],
+        snapshot.count_above("TL", 10.0, by="state"),
+        [snapshot.top("TL", k, largest) for k in (1, 7, 600) for largest in (1, 0)],
+        snapshot.availability("TL"),
+        snapshot.resolve(47.5, 13.0, ["TL", "SO"]),
+        snapshot.registry.nearest_order(47.5, 13.0).tolist(),
+    )
+
+
+def test_numpy_queries(monkeypatch) -> None:
+    """Test the numpy kernels returning the results of the Python loops."""
+
+    pytest.importorskip("numpy")
+    with_numpy = _queries(1)
+    monkeypatch.setattr(columnar, "optional_numpy", lambda: None)
+    assert _queries(1) == with_numpy
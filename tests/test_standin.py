@@ -0,0 +1,80 @@
+"""Tests GeoSphere Austria API stand-in."""  # fmt: skip
+import pytest
+
+from src.zamg.datasets import NWP_FORECAST
+from src.zamg.exceptions import ZamgApiError
+from src.zamg.standin import StandinServer, synthetic_forecast, synthetic_metadata
+from src.zamg.zamg import ZamgData
+
+
+def test_synthetic_payloads() -> None:
+    """Test size and shape of synthetic payloads."""
+
+    metadata = synthetic_metadata(stations=50, parameters=30)
+    assert len(metadata["stations"]) == 50
+    assert len(metadata["parameters"]) == 30
+    assert metadata["parameters"][0]["name"] == "TL"
+
+    forecast = synthetic_forecast(NWP_FORECAST, ["47.0,15.4", "48.2,16.3"], ["rr_acc"])
+    assert len(forecast["timestamps"]) == 73
+    assert len(forecast["features"]) == 2
+    rain = forecast["features"][0]["properties"]["parameters"]["rr_acc"]["data"]
+    assert rain == sorted(rain)
+
+
+@pytest.mark.asyncio
+async def test_standin_server() -> None:
+    """Test the client against the stand-in server."""
+
+    async with StandinServer(stations=20, parameters=40) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url + "/")
+            stations = await zamg.zamg_stations()
+            assert len(stations) == 20
+            assert len(zamg.get_all_parameters()) == 40
+
+            station_ids = list(stations)[:5]
+            await zamg.update_stations(station_ids)
+            assert set(station_ids) <= set(zamg.data)
+
+            result = await zamg.get_forecast("47.0,15.4", current_only=True)
+            assert "wind_speed" in result
+    assert server.requests == 4
+
+
+@pytest.mark.asyncio
+async def test_standin_errors_and_rate_limit() -> None:
+    """Test injected errors and rate limiting of the stand-in server."""
+
+    async with StandinServer(stations=5, parameters=5, error_rate=1.0) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            zamg.set_default_station("11000")
+            zamg.set_parameters(["TL"])
+            with pytest.raises(ZamgApiError):
+                await zamg.update()
+    assert sum(server.statuses[status] for status in (500, 502, 503)) == 1
+
+    async with StandinServer(
+        stations=5, parameters=5, rate_limit=0.001, burst=1
+    ) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            await zamg.zamg_stations()
+            assert zamg.station_registry is None
+    assert server.statuses == {200: 1, 429: 1}
+
+
+@pytest.mark.asyncio
+async def test_standin_conditional_requests() -> None:
+    """Test metadata and forecasts revalidated against the stand-in server."""
+
+    async with StandinServer(stations=5, parameters=5) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            stations = await zamg.zamg_stations()
+            forecast = await zamg.fetch_forecast("47.0,15.4")
+            assert await zamg.zamg_stations(refresh=True) is stations
+            assert await zamg.fetch_forecast("47.0,15.4") is forecast
+            assert zamg.revalidations == 3
+    assert server.statuses == {200: 3, 304: 3}
@@ -0,0 +1,34 @@
+"""Tests GeoSphere Austria lazy imports."""  # fmt: skip
+import pathlib
+import subprocess
+import sys
+
+LAZY_MODULES = ("aiohttp", "async_timeout", "zoneinfo", "json", "asyncio", "yarl")
+"""Modules which must not be loaded before the first request."""
+
+IMPORT_CODE = """
+import sys
+
+from zamg import ZamgData, ZamgNoDataError
+
+zamg = ZamgData("11240")
+zamg.set_api_url("http://localhost:1/v1")
+try:
+    zamg.get_data("TL")
+except ZamgNoDataError:
+    pass
+print(*(module for module in %r if module in sys.modules))
+"""
+
+
+def test_import_is_lazy() -> None:
+    """Test importing and using a client without loading the network modules."""
+
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_CODE % (LAZY_MODULES,)],
+        cwd=pathlib.Path(__file__).resolve().parent.parent / "src",
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.split() == []
@@ -0,0 +1,96 @@
+"""Tests GeoSphere Austria state snapshots."""  # fmt: skip
+import pytest
+
+from src.zamg.compressed import CompressedSeries
+from src.zamg.standin import StandinServer
+from src.zamg.state import STATE_MAGIC
+from src.zamg.zamg import ZamgData
+
+
+@pytest.mark.asyncio
+async def test_dump_and_load_state() -> None:
+    """Test restoring a client without new requests."""
+
+    async with StandinServer(stations=20, parameters=10) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            station_id = await zamg.closest_station(47.0, 15.4)
+            await zamg.update_stations([station_id, "11001"])
+            await zamg.update()
+            forecast = await zamg.get_forecast("47.0,15.4")
+            window = zamg.forecast_window(parameters=["t2m", "rain"])
+            state = zamg.dump_state()
+        assert state.startswith(STATE_MAGIC)
+        requests = server.requests
+
+        async with ZamgData() as restored:
+            restored.set_api_url(server.api_url)
+            restored.load_state(state)
+            assert await restored.zamg_stations() == zamg._stations
+            assert restored.get_station_name == zamg.get_station_name
+            assert restored.station_registry.ids == zamg.station_registry.ids
+            assert list(restored.station_registry.lat) == list(
+                zamg.station_registry.lat
+            )
+            assert restored.get_data("TL") == zamg.get_data("TL")
+            assert restored.last_update == zamg.last_update
+            assert await restored.get_forecast("47.0,15.4") == forecast
+            restored_window = restored.forecast_window(parameters=["t2m", "rain"])
+            assert list(restored_window.epochs) == list(window.epochs)
+            assert list(restored_window.data["rain"]) == list(window.data["rain"])
+            assert len(restored.history_window(station_id="11001").epochs) == 1
+            assert server.requests == requests
+
+            # identical payloads are still recognized and not parsed again
+            data = restored.data[station_id]
+            await restored.update_stations([station_id, "11001"])
+            assert restored.data[station_id] is data
+            assert server.requests == requests + 1
+
+            # an unchanged forecast is revalidated with a single request
+            assert restored._forecast_locations == zamg._forecast_locations
+            restored._forecast_timestamps.clear()
+            revalidations = restored.revalidations
+            assert await restored.get_forecast("47.0,15.4") == forecast
+            assert restored.revalidations == revalidations + 1
+        assert server.requests == requests + 2
+
+
+@pytest.mark.asyncio
+async def test_compressed_history_state() -> None:
+    """Test a compressed history is collected and restored."""
+
+    async with StandinServer(stations=5, parameters=5) as server:
+        async with ZamgData() as zamg:
+            zamg.set_api_url(server.api_url)
+            zamg.compress_history = True
+            await zamg.update_stations(["11001", "11002"])
+            assert isinstance(zamg.history["11001"], CompressedSeries)
+            window = zamg.history_window(station_id="11001")
+            assert len(window) == 1
+            state = zamg.dump_state()
+
+    restored = ZamgData()
+    restored.compress_history = True
+    restored.load_state(state)
+    assert isinstance(restored.history["11001"], CompressedSeries)
+    assert list(restored.history_window(station_id="11001").epochs) == list(
+        window.epochs
+    )
+    plain = ZamgData()
+    plain.load_state(state)
+    assert len(plain.history["11002"]) == 1
+
+
+def test_load_invalid_state() -> None:
+    """Test loading data which is no supported state."""
+
+    zamg = ZamgData()
+    state = zamg.dump_state()
+    ZamgData().load_state(state)
+    with pytest.raises(ValueError):
+        zamg.load_state(b"no state")
+    with pytest.raises(ValueError):
+        zamg.load_state(STATE_MAGIC + b"\x09\x00" + state[10:])
+    with pytest.raises(ValueError):
+        zamg.load_state(state[:-3])
@@ -0,0 +1,66 @@
+"""Tests GeoSphere Austria blocking client."""  # fmt: skip
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.zamg.standin import StandinServer
+from src.zamg.sync import SyncZamgData, background_loop
+
+
+@pytest.fixture
+def server():
+    """Run a stand-in server on the background loop."""
+    loop = background_loop()
+    standin = StandinServer(stations=20, parameters=10)
+    loop.run(standin.start())
+    yield standin
+    loop.run(standin.stop())
+
+
+def test_sync_client(server) -> None:
+    """Test blocking calls sharing one client."""
+
+    with SyncZamgData(api_url=server.api_url, timeout=10) as client:
+        assert len(client.zamg_stations()) == 20
+        station_id = client.closest_station(47.0, 15.4)
+        assert client.update(station_id)["TL"]["name"] == "TL"
+        requests = server.requests
+        # fresh observations are served from the cache
+        assert client.update(station_id)
+        assert server.requests == requests
+
+        data = client.update_stations(["11000", "11001", station_id])
+        assert set(data) == {"11000", "11001", station_id}
+        assert server.requests == requests + 1
+
+        first = client.get_forecast("47.0,15.4", current_only=True)
+        second = client.get_forecast("48.2,16.3", current_only=True)
+        assert "wind_speed" in first and "wind_speed" in second
+        assert client.get_forecast("47.0,15.4", current_only=True) == first
+        assert server.requests == requests + 3
+        assert client.snapshot(parameters=["TL"]).aggregate("TL")["all"]["count"]
+
+
+def test_sync_client_threads(server) -> None:
+    """Test concurrent calls of many threads."""
+
+    with SyncZamgData(api_url=server.api_url, timeout=10) as client:
+        with ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(client.update, [f"110{idx:02d}" for idx in range(16)])
+            )
+        assert all("TL" in result for result in results)
+        # the metadata is only fetched once (forecast and station metadata)
+        assert server.requests == 2 + 16
+        assert len(client.zamg.data) == 16
+
+
+def test_blocking_call_on_loop() -> None:
+    """Test blocking the loop thread is refused."""
+    loop = background_loop()
+
+    async def nested():
+        return loop.run(nested())
+
+    with pytest.raises(RuntimeError):
+        loop.run(nested())
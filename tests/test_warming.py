@@ -0,0 +1,148 @@
+"""Tests GeoSphere Austria cache warming."""  # fmt: skip
+# pylint: disable=protected-access
+import asyncio
+
+import pytest
+from aiohttp import ServerDisconnectedError
+
+from src.zamg.standin import StandinServer
+from src.zamg.warming import CacheWarmer
+from src.zamg.zamg import ZamgData
+
+OLD_TIMESTAMP = "2024-01-01T00:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_warmer_refreshes_hot_keys() -> None:
+    """Test hot keys being refreshed after their expected publication."""
+
+    async with StandinServer(stations=5) as server:
+        warmer = CacheWarmer(rate=100.0, tick=0.01)
+        hot = ZamgData("11000")
+        cold = ZamgData("11001")
+        for zamg in (hot, cold):
+            zamg.set_api_url(server.api_url)
+            zamg.warmer = warmer
+        await hot.update()
+        await hot.update()
+        await hot.get_forecast(current_only=True)
+        await hot.get_forecast(current_only=True)
+        await cold.update()
+        forecast = hot.forecast_dataset
+        assert warmer.is_hot(hot) and warmer.is_hot(hot, forecast)
+        assert not warmer.is_hot(cold)
+        assert warmer.due() == []
+
+        # the cached data is older than the next expected publication
+        hot._timestamps["11000"] = OLD_TIMESTAMP
+        hot._payload_hashes.clear()
+        hot._validators.clear()
+        hot._forecasts[forecast.name]["reference_time"] = OLD_TIMESTAMP
+        cold._timestamps["11001"] = OLD_TIMESTAMP
+        assert set(warmer.due()) == {(hot, None), (hot, forecast)}
+        assert not warmer.is_warm(hot)
+        for zamg in (hot, cold):
+            await zamg.__aexit__(None, None, None)
+
+        async with warmer:
+            for _ in range(100):
+                if not warmer.due():
+                    break
+                await asyncio.sleep(0.01)
+            assert warmer.due() == []
+            assert warmer.refreshes == 2 and warmer.errors == 0
+            assert hot._timestamps["11000"] != OLD_TIMESTAMP
+            assert warmer.is_warm(hot) and warmer.is_warm(hot, forecast)
+            assert not warmer.is_warm(cold)
+            assert warmer._run_intervals[forecast.name] > 0
+
+            # readers of warm keys are served from the cache
+            requests = server.requests
+            await hot.update()
+            await hot.get_forecast(current_only=True)
+            assert server.requests == requests
+        assert not warmer.is_warm(hot)
+        for zamg in (hot, cold):
+            await zamg.__aexit__(None, None, None)
+
+
+@pytest.mark.asyncio
+async def test_warmer_backs_off() -> None:
+    """Test checks for unpublished data backing off."""
+
+    async with StandinServer(stations=5) as server:
+        warmer = CacheWarmer(rate=100.0, retry_interval=30.0)
+        async with ZamgData("11000") as zamg:
+            zamg.set_api_url(server.api_url)
+            zamg.warmer = warmer
+            await zamg.update()
+            warmer.record(zamg)
+            # the data is current, but expected to be replaced already
+            warmer._lags[None] = [-600.0]
+            assert warmer.due() == [(zamg, None)]
+            await warmer.refresh(zamg, None)
+            await warmer.refresh(zamg, None)
+            access = warmer._keys[zamg][None]
+            assert access.misses == 2
+            assert warmer.due() == []
+
+
+@pytest.mark.asyncio
+async def test_warm_forecast_of_other_location() -> None:
+    """Test a warm forecast not being served for another location."""
+
+    async with StandinServer(stations=5) as server:
+        warmer = CacheWarmer(rate=100.0)
+        async with ZamgData("11000") as zamg:
+            zamg.set_api_url(server.api_url)
+            zamg.warmer = warmer
+            forecast = zamg.forecast_dataset
+            point, other = "47.1,15.4", "48.2,16.3"
+            await zamg.get_forecast(point)
+            await zamg.get_forecast(point)
+            async with warmer:
+                await warmer.refresh(zamg, forecast)
+                assert warmer.is_warm(zamg, forecast, point)
+                assert not warmer.is_warm(zamg, forecast, other)
+                assert not warmer.is_warm(zamg, forecast)
+
+                # the refresh interval passed, only the warm location is cached
+                zamg._forecast_timestamps[forecast.name] = OLD_TIMESTAMP
+                requests = server.requests
+                await zamg.get_forecast(point)
+                assert server.requests == requests
+                await zamg.get_forecast(other)
+                assert server.requests == requests + 1
+                assert zamg._forecast_locations[forecast.name] == [other]
+
+
+@pytest.mark.asyncio
+async def test_warmer_survives_failed_refreshes(monkeypatch, caplog) -> None:
+    """Test failed refreshes being counted and logged without stopping."""
+
+    async def _disconnect() -> None:
+        raise ServerDisconnectedError()
+
+    async def _fail(*_args) -> None:
+        raise RuntimeError("refresh failed")
+
+    warmer = CacheWarmer(rate=100.0, tick=0.01)
+    zamg = ZamgData("11000")
+    warmer.record(zamg)
+    warmer.record(zamg)
+    monkeypatch.setattr(zamg, "refresh_observations", _disconnect)
+    await warmer.refresh(zamg, None)
+    assert warmer.errors == 1
+    assert warmer._keys[zamg][None].retry_at > 0
+
+    warmer._keys[zamg][None].retry_at = 0.0
+    monkeypatch.setattr(warmer, "refresh", _fail)
+    async with warmer:
+        for _ in range(100):
+            if warmer.errors > 1:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.03)
+        assert warmer.is_running
+    assert warmer.errors > 2
+    assert "Refreshing observations of station 11000 failed" in caplog.text
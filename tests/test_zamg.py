@@ -14,6 +14,7 @@ from src.zamg.exceptions import (
     ZamgStationNotFoundError,
     ZamgStationUnknownError,
 )
+from src.zamg.metrics import InMemoryMetrics
 from src.zamg.zamg import ZamgData
 
 
@@ -502,6 +503,280 @@ async def test_get_forecast_trims_past_data() -> None:
     assert result["features"][0]["properties"]["parameters"]["sy"]["data"] == [2.0, 3.0]
 
 
+@pytest.mark.asyncio
+async def test_get_nowcast(aresponses) -> None:
+    """Test get_nowcast uses the INCA dataset and its derived series."""
+
+    now_utc = datetime.utcnow().replace(
+        tzinfo=zoneinfo.ZoneInfo("UTC"), second=0, microsecond=0
+    )
+    timestamps = [
+        (now_utc + timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M%z"),
+        (now_utc + timedelta(minutes=16)).strftime("%Y-%m-%dT%H:%M%z"),
+    ]
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/timeseries/forecast/nowcast-v1-15min-1km",
+        "GET",
+        response={
+            "reference_time": timestamps[0],
+            "timestamps": timestamps,
+            "features": [
+                {
+                    "properties": {
+                        "parameters": {
+                            "t2m": {"data": [5.0, 5.5]},
+                            "rh2m": {"data": [90.0, 91.0]},
+                            "ugrd": {"data": [3.0, 0.0]},
+                            "vgrd": {"data": [4.0, 1.0]},
+                            "rr": {"data": [0.2, 0.1]},
+                        }
+                    }
+                }
+            ],
+        },
+    )
+
+    async with ZamgData() as zamg:
+        result = await zamg.get_nowcast("46.99,15.499")
+        # second call is served from the cached payload
+        current = await zamg.get_nowcast("46.99,15.499", current_only=True)
+
+    parameters = result["features"][0]["properties"]["parameters"]
+    assert parameters["rain"]["data"] == [0.2, 0.1]
+    assert parameters["rain"]["name"] == "15 minute rain"
+    assert parameters["wind_speed"]["data"] == [18.0, 3.6]
+    assert current["t2m"] == 5.0
+    assert current["rain"] == 0.2
+    assert zamg.data_forecast == {}
+    assert zamg.data_nowcast["timestamps"] == timestamps
+
+
+@pytest.mark.asyncio
+async def test_assign_forecast_url(aresponses) -> None:
+    """Test assigning the forecast urls of the forecast dataset."""
+
+    aresponses.add(
+        "forecast.example.org",
+        "/nwp",
+        "GET",
+        response={"timestamps": [], "features": [{"properties": {}}]},
+    )
+
+    async with ZamgData() as zamg:
+        zamg.forecast_url = "https://forecast.example.org/nwp?parameters="
+        zamg.forecast_metadata_url = "https://forecast.example.org/nwp/metadata"
+        assert zamg.forecast_dataset.data_url == zamg.forecast_url
+        assert zamg.forecast_metadata_url.endswith("/nwp/metadata")
+        payload = await zamg.fetch_forecast("46.99,15.499")
+        assert payload["features"] == [{"properties": {}}]
+        zamg.set_api_url("http://127.0.0.1:8080/v1")
+        assert zamg.forecast_url.startswith("http://127.0.0.1:8080/v1/timeseries")
+
+
+def test_forecast_window() -> None:
+    """Test slicing the cached forecast by timestamps."""
+
+    zamg = ZamgData()
+    start = datetime(2024, 1, 1, tzinfo=zoneinfo.ZoneInfo("UTC"))
+    timestamps = [
+        (start + timedelta(hours=idx)).strftime("%Y-%m-%dT%H:%M%z") for idx in range(6)
+    ]
+    zamg.data_forecast = {
+        "timestamps": timestamps,
+        "features": [
+            {
+                "properties": {
+                    "parameters": {
+                        "t2m": {"data": [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]},
+                        "u10m": {"data": [1.0] * 6},
+                        "v10m": {"data": [0.0] * 6},
+                        "rr_acc": {"data": [0.0, 1.0, 1.5, 1.5, 2.0, 4.0]},
+                    }
+                }
+            }
+        ],
+    }
+
+    window = zamg.forecast_window(
+        start + timedelta(hours=1), start + timedelta(hours=3), ["t2m", "rain"]
+    )
+    assert window.data["t2m"].tolist() == [1.0, 2.0]
+    assert window.data["rain"].tolist() == [1.0, 0.5]
+
+    window = zamg.forecast_window(
+        parameters=["rain", "wind_speed"],
+        resample=timedelta(hours=3),
+        how={"rain": "sum"},
+    )
+    assert window.data["rain"].tolist() == [1.5, 2.5]
+    assert window.data["wind_speed"].tolist() == [3.6, 3.6]
+    with pytest.raises(ZamgNoDataError):
+        zamg.forecast_window(dataset=zamg.nowcast_dataset)
+
+
+@pytest.mark.asyncio
+async def test_history_window(fix_data, fix_metadata) -> None:
+    """Test observations of update() are kept in the history."""
+
+    zamg = ZamgData()
+    zamg.set_default_station("11240")
+    await zamg.update()
+    window = zamg.history_window(parameters=["TL", "P"])
+    assert window.data["TL"].tolist() == [8.6]
+    assert window.timestamps == [zamg.last_update]
+    with pytest.raises(ZamgNoDataError):
+        zamg.history_window(station_id="0")
+
+
+def _station_payload(values: dict[str, dict[str, float | None]]) -> dict:
+    """Return a tawes payload with one feature per station."""
+    return {
+        "timestamps": ["2022-11-13T10:20+00:00"],
+        "features": [
+            {
+                "properties": {
+                    "station": station_id,
+                    "parameters": {
+                        parameter: {"name": parameter, "unit": "", "data": [value]}
+                        for parameter, value in parameters.items()
+                    },
+                }
+            }
+            for station_id, parameters in values.items()
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_stations(aresponses) -> None:
+    """Test updating several stations with one request."""
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        response=_station_payload(
+            {"11240": {"TL": 8.6, "P": None}, "11035": {"TL": 3.2, "P": 990.1}}
+        ),
+    )
+
+    async with ZamgData() as zamg:
+        zamg.set_parameters(["TL", "P"])
+        data = await zamg.update_stations(["11240", "11035", "11240"])
+    assert data["11240"]["TL"]["data"] == 8.6
+    assert data["11035"]["P"]["data"] == 990.1
+    assert zamg.history["11035"].columns["TL"].tolist() == [3.2]
+
+
+@pytest.mark.asyncio
+async def test_conditional_requests(aresponses) -> None:
+    """Test revalidating unchanged observations and metadata."""
+    payload = json.dumps(_station_payload({"11240": {"TL": 8.6}}))
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        aresponses.Response(
+            text=payload,
+            content_type="application/json",
+            headers={"ETag": '"v1"', "Last-Modified": "Tue, 01 Oct 2024 10:00:00 GMT"},
+        ),
+    )
+
+    def _not_modified(request):
+        assert request.headers["If-None-Match"] == '"v1"'
+        assert request.headers["If-Modified-Since"] == "Tue, 01 Oct 2024 10:00:00 GMT"
+        return aresponses.Response(status=304)
+
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        _not_modified,
+    )
+
+    metrics = InMemoryMetrics()
+    async with ZamgData() as zamg:
+        zamg.metrics = metrics
+        zamg.set_parameters(["TL"])
+        data = await zamg.update_stations(["11240"])
+        observations = data["11240"]
+        data = await zamg.update_stations(["11240"])
+    assert data["11240"] is observations
+    assert zamg.revalidations == 1
+    assert metrics.cache_hits["revalidation"] == 1
+    assert metrics.decode_time["station/current/tawes-v1-10min"].count == 1
+
+
+@pytest.mark.asyncio
+async def test_watch(aresponses) -> None:
+    """Test watch yields only changed values."""
+    for values in (
+        {"11240": {"TL": 8.6, "P": 987.3}},
+        {"11240": {"TL": 8.6, "P": 987.3}},
+        {"11240": {"TL": 9.1, "P": 987.3}},
+    ):
+        aresponses.add(
+            "dataset.api.hub.geosphere.at",
+            "/v1/station/current/tawes-v1-10min",
+            "GET",
+            response=_station_payload(values),
+        )
+
+    changes = []
+    async with ZamgData() as zamg:
+        zamg.set_parameters(["TL", "P"])
+        async for change in zamg.watch(["11240"], interval=0):
+            changes.append(change)
+            if len(changes) == 3:
+                break
+    assert [(change.parameter, change.value) for change in changes] == [
+        ("TL", 8.6),
+        ("P", 987.3),
+        ("TL", 9.1),
+    ]
+    assert changes[2].previous == 8.6
+    assert changes[2].timestamp == "2022-11-13T10:20+00:00"
+
+
+@pytest.mark.asyncio
+async def test_snapshot(fix_metadata, aresponses) -> None:
+    """Test building a snapshot of several stations."""
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        response=_station_payload({"11240": {"TL": 8.6}, "11035": {"TL": 3.2}}),
+    )
+
+    async with ZamgData() as zamg:
+        snapshot = await zamg.snapshot(["11240", "11035"])
+    assert zamg.station_registry is snapshot.registry
+    assert snapshot.aggregate("TL", by="state", reductions=["max"]) == {
+        "Steiermark": {"max": 8.6},
+        "Wien": {"max": 3.2},
+    }
+    assert snapshot.timestamps["11035"] == "2022-11-13T10:20+00:00"
+
+
+@pytest.mark.asyncio
+async def test_closest_values(fix_metadata, aresponses) -> None:
+    """Test resolving parameters from the closest station reporting them."""
+    aresponses.add(
+        "dataset.api.hub.geosphere.at",
+        "/v1/station/current/tawes-v1-10min",
+        "GET",
+        response=_station_payload(
+            {"11240": {"SO": None, "TL": 8.6}, "11035": {"SO": 540.0, "TL": 3.2}}
+        ),
+    )
+
+    async with ZamgData() as zamg:
+        zamg.max_stations_per_request = 1000
+        result = await zamg.closest_values(46.9, 15.4, ["TL", "SO"])
+    assert result == {"TL": ("11240", 8.6), "SO": ("11035", 540.0)}
+
+
 @pytest.fixture
 def fix_metadata(aresponses):
     """Fixture to get metadata."""